@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure the cost of eager debug message formatting."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+import io
+import os
+import time
+
+import click
+import yaml
+
+from tzparse.tzdata import tzdata
+
+# Config of the repository, naming the files of a release
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.yml")
+
+lazyPout = tzdata.pout
+
+def eagerPout(msg=None, Verbose=0, level=tzdata.Level.INFO, newline=True, **kwargs):
+    """pout as it was called before, with the message built up front"""
+    if callable(msg):
+        msg = msg()
+    elif kwargs:
+        msg = msg.format(**kwargs)
+    lazyPout(str(msg), Verbose, level, newline)
+
+def run(conf, tzdir, repeat):
+    """Time the best of repeat runs of loadDB at the default verbosity
+
+    Args:
+        conf (Dict): configuration naming the input files
+        tzdir (Str): extracted tzdata directory
+        repeat (Int): number of runs
+
+    Returns:
+        Float: best time in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            tzdata.loadDB(conf, tzdir, 0)
+            elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+@click.command()
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+)
+@click.option(
+    '--config', '-c', default=CONFIG,
+    type=click.Path(exists=True, dir_okay=False),
+    help='config file naming the input files'
+)
+@click.option(
+    '--repeat', '-n', default=10, show_default=True,
+    help='number of runs, the best one is reported'
+)
+def main(tzdir, config, repeat):
+    """Compare a default (-v 0) parse of TZDIR with and without building
+    the dropped debug messages."""
+    with open(config) as cnf:
+        conf = yaml.safe_load(cnf)
+    conf['cache'] = {}
+    tzdata.pout = eagerPout
+    try:
+        eager = run(conf, tzdir, repeat)
+    finally:
+        tzdata.pout = lazyPout
+    lazy = run(conf, tzdir, repeat)
+    click.echo("eager : {t:8.2f} ms".format(t=eager * 1000))
+    click.echo("lazy  : {t:8.2f} ms".format(t=lazy * 1000))
+    click.echo("saved : {s:8.2f} x".format(s=eager / lazy))
+
+if __name__ == '__main__':
+    main()
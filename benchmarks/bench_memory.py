@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure the memory saved by sharing the parsed records."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import click
+import yaml
+
+from tzparse.tzdata import tzdata
+from tzparse.tzdata.model import ZoneEra, DaySpec, Rule, parseOffset, parseTime, parseSave, parseYear, parseOn
+
+# Config of the repository, naming the files of a release
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.yml")
+
+def fresh(value):
+    """Copy a string or integer into a new object, as it was when every
+    column was split out of its own line"""
+    if isinstance(value, str):
+        return value[:1] + value[1:]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int(str(value))
+    return value
+
+def unshare(db):
+    """Copy the records of a database without any sharing between them,
+    links holding a copy of their zone
+
+    Args:
+        db (Dict): database returned by loadDB
+
+    Returns:
+        Tuple: (zinfos, rules, zones)
+    """
+    zinfos = {
+        name: {
+            "STDOFF": fresh(zinfo["STDOFF"]),
+            "Rule": fresh(zinfo["Rule"]),
+            "History": tuple(ZoneEra(*map(fresh, era)) for era in zinfo["History"]),
+        }
+        for name, zinfo in db["zinfos"].items()
+    }
+    rules = [
+        Rule(*map(fresh, rule[:4]), DaySpec(*map(fresh, rule.on)), *map(fresh, rule[5:10]),
+             tuple(map(fresh, rule.fields)))
+        for rule in db["rules"]
+    ]
+    zones = {
+        name: dict(info, Countries=list(map(fresh, info["Countries"])), Codes=list(map(fresh, info["Codes"])))
+        for name, info in db["zones"].items()
+    }
+    return zinfos, rules, zones
+
+def retained(func):
+    """Get the memory still allocated after calling func, and its result
+
+    Args:
+        func (Callable): function to measure
+
+    Returns:
+        Tuple: (bytes, result)
+    """
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] - before, result
+
+def clearCaches():
+    """Empty the memoised parse functions, so a measure includes them"""
+    for func in (parseOffset, parseTime, parseSave, parseYear, parseOn):
+        func.cache_clear()
+
+def measure(conf, tzdir):
+    """Get the memory held by the database loaded with conf, and by a copy
+    of it sharing nothing
+
+    loadDB is run once before measuring, so the modules it imports, the
+    worker processes and the cache entries are not counted.
+
+    Args:
+        conf (Dict): config naming the input files, the jobs and the cache
+        tzdir (Str): database directory
+
+    Returns:
+        Tuple: (shared bytes, unshared bytes)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        tzdata.loadDB(conf, tzdir, 0)
+        clearCaches()
+        shared, db = retained(lambda: tzdata.loadDB(conf, tzdir, 0))
+    copied, _ = retained(lambda: unshare(db))
+    # the copy does not hold the countries, links and aliases of the database
+    rest, _ = retained(lambda: (dict(db["countries"]), dict(db["links"]), dict(db["aliases"])))
+    return shared, copied + rest
+
+@click.command()
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+)
+@click.option(
+    '--config', '-c', default=CONFIG,
+    type=click.Path(exists=True, dir_okay=False),
+    help='config file naming the input files'
+)
+@click.option(
+    '--jobs', '-j', default=2, show_default=True,
+    help='worker processes of the parallel case'
+)
+def main(tzdir, config, jobs):
+    """Compare the memory held by the database of TZDIR with that of a
+    copy sharing nothing between its records.
+
+    The database is loaded by parsing the files, from the parsed file cache
+    and by parsing in worker processes.
+    """
+    with open(config) as cnf:
+        conf = yaml.safe_load(cnf)
+    failed = False
+    click.echo("{p:<10} {u:>12} {s:>12} {d:>12}".format(p="load", u="unshared", s="shared", d="saved"))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [
+            ("parsed", dict(conf, jobs=1, cache={})),
+            ("cached", dict(conf, jobs=1, cache={"dir": tmp})),
+            ("parallel", dict(conf, jobs=jobs, cache={})),
+        ]
+        tracemalloc.start()
+        try:
+            for label, pconf in paths:
+                shared, copied = measure(pconf, tzdir)
+                if shared < copied:
+                    saved = "{m:8.2f} MiB".format(m=(copied - shared) / 2**20)
+                else:
+                    saved = "none"
+                    failed = True
+                click.echo("{p:<10} {u:8.2f} MiB {s:8.2f} MiB {d:>12}".format(
+                    p=label, u=copied / 2**20, s=shared / 2**20, d=saved))
+        finally:
+            tracemalloc.stop()
+    if failed:
+        click.echo("the database held more than its unshared copy", err=True)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Check the start-up time of the command line against a budget."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+import yaml
+
+import tzparse
+import synth
+
+# Modules that must not be imported by each case, as they are only needed
+# by other outputs or commands
+VERSION_FORBIDDEN = ("openpyxl", "pyarrow", "yaml", "asyncio", "pprint")
+CSV_FORBIDDEN = ("openpyxl", "pyarrow", "asyncio")
+
+def command(args):
+    """Get the command line running tzparse with args"""
+    return [sys.executable, "-m", "tzparse.cli"] + args
+
+def environment():
+    """Get the environment of the runs, tzparse being importable from
+    this tree"""
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(tzparse.__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    return env
+
+def wallTime(args, repeat, cwd):
+    """Get the best wall time of repeat runs of the command line
+
+    Args:
+        args (Array): command line arguments
+        repeat (Int): number of runs
+        cwd (Str): working directory
+
+    Returns:
+        Float: best time in seconds
+    """
+    env = environment()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command(args), cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def importedModules(args, cwd):
+    """Get the top level packages imported by the command line, as
+    reported by python -X importtime
+
+    Args:
+        args (Array): command line arguments
+        cwd (Str): working directory
+
+    Returns:
+        Set: package names
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + command(args)[1:], cwd=cwd,
+                          env=environment(), check=True, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    return {
+        line.rsplit("|", 1)[1].strip().split(".")[0]
+        for line in proc.stderr.splitlines() if line.startswith("import time:")
+    }
+
+def check(name, args, budget, forbidden, repeat, cwd):
+    """Time a case and check it against its budget and forbidden imports
+
+    Returns:
+        Bool: True when the case passes
+    """
+    elapsed = wallTime(args, repeat, cwd)
+    loaded = sorted(importedModules(args, cwd).intersection(forbidden))
+    ok = elapsed * 1000 <= budget and not loaded
+    click.echo("{n:<10} {t:8.1f} ms  budget {b:6.0f} ms  {s}{m}".format(
+        n=name, t=elapsed * 1000, b=budget, s="ok" if ok else "FAILED",
+        m="  imports " + ", ".join(loaded) if loaded else ""))
+    return ok
+
+@click.command()
+@click.option(
+    '--version-budget', default=150.0, show_default=True,
+    help='budget of tzparse --version in milliseconds'
+)
+@click.option(
+    '--csv-budget', default=250.0, show_default=True,
+    help='budget of a CSV only parse of the vendored sample in milliseconds'
+)
+@click.option(
+    '--repeat', '-n', default=5, show_default=True,
+    help='number of runs, the best one is compared with the budget'
+)
+def main(version_budget, csv_budget, repeat):
+    """Time tzparse --version and a parse of the vendored sample writing
+    only the CSV files, and check that neither imports the modules of the
+    workbook, columnar and server outputs.
+
+    Exits with status 1 when a case is over its budget or imports one of
+    those modules.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        conf = {
+            "zones": "zone1970.tab",
+            "countrylist": "iso3166.tab",
+            "tzdata": ["africa", "antarctica", "asia", "australasia", "europe", "northamerica", "southamerica"],
+            "output": {"zonecsv": "zones.csv", "rulescsv": "rules.csv"},
+        }
+        with open(os.path.join(tmp, "config.yml"), "w") as cnf:
+            yaml.safe_dump(conf, cnf)
+        csvArgs = ["parse", synth.SAMPLE, "-c", "config.yml", "--no-cache", "-o"]
+        results = [
+            check("--version", ["--version"], version_budget, VERSION_FORBIDDEN, repeat, tmp),
+            check("csv", csvArgs, csv_budget, CSV_FORBIDDEN, repeat, tmp),
+        ]
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark the tokenizer against the original per-line regex loop."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import re
+import sys
+import time
+
+import click
+
+from tzparse.tzdata import tzdata
+from tzparse.tzdata.tokenizer import tokenize, ZoneEntry, RuleEntry, LinkEntry
+
+TZDATA = [
+    "africa",
+    "antarctica",
+    "asia",
+    "australasia",
+    "europe",
+    "northamerica",
+    "southamerica",
+]
+
+def legacyParseTZDB(fpath):
+    """The per-line regex loop parseTZDB used before the tokenizer.
+
+    Args:
+        fpath (Str): file path to the database file
+
+    Returns:
+        Tuple: (zinfos, zlinks, rules)
+    """
+    zinfos = {}
+    zlinks = {}
+    rules = []
+    with open(fpath, 'r', encoding="utf-8") as db:
+        line = db.readline()
+        while line:
+            line = re.sub(r'^(.*)#.*', '\\1', line).rstrip()
+            if re.match(r'Zone.*',line):
+                lines = [line]
+                line = db.readline()
+                while re.match(r'[\t\#]',line):
+                    if re.match(r'\t',line):
+                        line = re.sub(r'^(.*)#.*', '\\1', line).rstrip()
+                        lines.extend([line])
+                    line = db.readline()
+                firstLine = re.split(r'[\t ]', lines.pop(0))
+                zinfo = {"STDOFF": firstLine[2], "Rule": firstLine[3]}
+                if len(lines) > 0:
+                    lastLine = re.split(r'[\t ]', lines[-1].lstrip())
+                    zinfo = {"STDOFF": lastLine[0], "Rule": lastLine[1]}
+                zinfos[firstLine[1]] = zinfo
+            elif re.match(r'Link.*',line):
+                line = re.split(r'[\t ]', line)
+                zlinks[line[2]] = line[1]
+                line = db.readline()
+            elif re.match(r'Rule.*',line):
+                rule = line.split()
+                rule.pop(0)
+                rules.append(rule)
+                line = db.readline()
+            else:
+                line = db.readline()
+    return zinfos, zlinks, rules
+
+def tokenizerParseTZDB(fpath):
+    """parseTZDB minus link expansion, built on the tokenizer.
+
+    Args:
+        fpath (Str): file path to the database file
+
+    Returns:
+        Tuple: (zinfos, zlinks, rules)
+    """
+    zinfos = {}
+    zlinks = {}
+    rules = []
+    with open(fpath, 'r', encoding="utf-8") as db:
+        for entry in tokenize(db):
+            if isinstance(entry, ZoneEntry):
+                zinfos.update(tzdata.parseZone(entry, 0))
+            elif isinstance(entry, LinkEntry):
+                zlinks.update(tzdata.parseLink(entry, 0))
+            elif isinstance(entry, RuleEntry):
+                rules.append(tzdata.parseRule(entry, 0))
+    return zinfos, zlinks, rules
+
+def legacyView(result):
+    """Keep the parts of a tokenizer result the legacy loop produces
+
+    The tokenizer result also holds the History of every Zone and typed
+    Rule records, which the legacy loop knows nothing of.
+
+    Args:
+        result (Tuple): (zinfos, zlinks, rules) of tokenizerParseTZDB
+
+    Returns:
+        Tuple: (zinfos, zlinks, rules) shaped like legacyParseTZDB
+    """
+    zinfos, zlinks, rules = result
+    return (
+        {zone: {"STDOFF": zinfo["STDOFF"], "Rule": zinfo["Rule"]} for zone, zinfo in zinfos.items()},
+        zlinks,
+        [list(rule.fields) for rule in rules],
+    )
+
+def run(func, fpaths, repeat):
+    """Time the best of repeat runs of func over all files
+
+    Args:
+        func (Callable): parser to time
+        fpaths (Array): database files to parse
+        repeat (Int): number of runs
+
+    Returns:
+        Tuple: (best time in seconds, results of the last run)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(fpath) for fpath in fpaths]
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, results
+
+@click.command()
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+)
+@click.option(
+    '--repeat', '-n', default=20, show_default=True,
+    help='number of runs, the best one is reported'
+)
+def main(tzdir, repeat):
+    """Compare the tokenizer against the legacy regex loop on TZDIR.
+
+    Exits with status 1 when the STDOFF and Rule of a Zone, a Link or the
+    columns of a Rule line differ between the two.
+    """
+    fpaths = [os.path.join(tzdir, db) for db in TZDATA]
+    legacyTime, legacy = run(legacyParseTZDB, fpaths, repeat)
+    tokenTime, token = run(tokenizerParseTZDB, fpaths, repeat)
+    differ = False
+    for fpath, old, new in zip(fpaths, legacy, token):
+        if old != legacyView(new):
+            differ = True
+            click.echo("results differ for {path}".format(path=fpath), err=True)
+    click.echo("legacy    : {t:8.2f} ms".format(t=legacyTime * 1000))
+    click.echo("tokenizer : {t:8.2f} ms".format(t=tokenTime * 1000))
+    click.echo("speedup   : {s:8.2f} x".format(s=legacyTime / tokenTime))
+    if differ:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure the lookup rate of TzIndex."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import random
+import time
+
+import click
+import yaml
+
+from tzparse.tzdata import tzdata
+from tzparse.tzdata.tzindex import TzIndex
+
+# Config of the repository, naming the files of a release
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.yml")
+
+def loadIndex(tzdir, config):
+    """Parse tzdir and build the index over its zones and links
+
+    Args:
+        tzdir (Str): extracted tzdata directory
+        config (Str): config file naming the input files
+
+    Returns:
+        TzIndex: the index
+    """
+    with open(config) as cnf:
+        conf = yaml.safe_load(cnf)
+    zinfos, zlinks, rules = tzdata.readTZDBs(conf['tzdata'], tzdir, 0)
+    aliases = tzdata.resolveLinks(zlinks, zinfos, 0)
+    return TzIndex.fromParse({"zinfos": zinfos, "rules": rules, "aliases": aliases})
+
+@click.command()
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+)
+@click.option(
+    '--config', '-c', default=CONFIG,
+    type=click.Path(exists=True, dir_okay=False),
+    help='config file naming the input files'
+)
+@click.option(
+    '--count', '-n', default=1000000, show_default=True,
+    help='number of random (zone, instant) pairs'
+)
+def main(tzdir, config, count):
+    """Time single and bulk TzIndex lookups on TZDIR."""
+    index = loadIndex(tzdir, config)
+    rand = random.Random(0)
+    pairs = [(rand.randrange(len(index)), rand.randrange(0, 1 << 31)) for _ in range(count)]
+    start = time.perf_counter()
+    for zone, instant in pairs:
+        index.lookup(zone, instant)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    index.lookupMany(pairs)
+    bulk = time.perf_counter() - start
+    zones, instants = zip(*pairs)
+    start = time.perf_counter()
+    index.offsetsOf(zones, instants)
+    columns = time.perf_counter() - start
+    click.echo("{z} zones, {n} lookups".format(z=len(index), n=count))
+    click.echo("lookup     : {r:12,.0f} /s".format(r=count / single))
+    click.echo("lookupMany : {r:12,.0f} /s".format(r=count / bulk))
+    click.echo("offsetsOf  : {r:12,.0f} /s".format(r=count / columns))
+
+if __name__ == '__main__':
+    main()
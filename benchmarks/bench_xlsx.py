@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark the normal and the write-only workbook of createWB."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+import click
+import yaml
+
+from tzparse.tzdata import tzdata
+
+# Config of the repository, naming the files of a release
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.yml")
+
+def scaleDB(db, scale):
+    """Repeat the zones and rules to emulate a larger database
+
+    Args:
+        db (Dict): database returned by tzdata.loadDB
+        scale (Int): number of copies
+
+    Returns:
+        Dict: zones and rules of the larger database
+    """
+    zlist = db["zones"]
+    scaled = {}
+    for i in range(scale):
+        for zone in zlist:
+            scaled["{zone}/{i}".format(zone=zone, i=i)] = zlist[zone]
+    return {"zones": scaled, "rules": db["rules"] * scale}
+
+def measure(db, rows, writeOnly):
+    """Build and save the workbook, timed once and traced once
+
+    Args:
+        db (Dict): zones and rules of the database
+        rows (OutputRows): rows returned by tzdata.outputRows
+        writeOnly (Bool): workbook mode
+
+    Returns:
+        Tuple: (seconds, peak traced memory in bytes)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        fpath = os.path.join(tmp, "tzdata.xlsx")
+        start = time.perf_counter()
+        tzdata.createWB(db["zones"], db["rules"], 0, writeOnly, rows=rows).save(fpath)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        tzdata.createWB(db["zones"], db["rules"], 0, writeOnly, rows=rows).save(fpath)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+@click.command()
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+)
+@click.option(
+    '--config', '-c', default=CONFIG,
+    type=click.Path(exists=True, dir_okay=False),
+    help='config file naming the input files'
+)
+@click.option(
+    '--scale', '-s', default=1, show_default=True,
+    help='repeat the database to emulate larger outputs'
+)
+def main(tzdir, config, scale):
+    """Compare the normal and write-only createWB on TZDIR."""
+    with open(config) as cnf:
+        conf = yaml.safe_load(cnf)
+    db = scaleDB(tzdata.loadDB(conf, tzdir, 0), scale)
+    rows = tzdata.outputRows(db)
+    click.echo("{z} zones, {r} rules".format(z=len(db["zones"]), r=len(db["rules"])))
+    for label, writeOnly in (("normal    ", False), ("write-only", True)):
+        elapsed, peak = measure(db, rows, writeOnly)
+        click.echo("{l}: {t:8.2f} ms {m:8.2f} MiB peak".format(
+            l=label, t=elapsed * 1000, m=peak / 1024 / 1024))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark suite over the vendored sample and synthetic databases."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+
+import click
+import yaml
+
+from tzparse.tzdata import tzdata
+from tzparse.tzdata.check import indexDB
+from tzparse.tzdata.convert import Converter, CSVCodec
+from tzparse.tzdata.geo import ZoneLocator
+from tzparse.tzdata.output import Sink, OutputData, WRITERS, writeSinks
+from tzparse.tzdata.transitions import buildTransitions
+from tzparse.tzdata.tzindex import TzIndex
+from tzparse.version import __version__
+
+import synth
+
+CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.yml")
+
+def timeit(func, repeat):
+    """Time repeat calls of func, its output discarded
+
+    Args:
+        func (Callable): function to time
+        repeat (Int): number of calls
+
+    Returns:
+        Dict: min, median and mean in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "repeat": repeat,
+    }
+
+def writeAll(sinks):
+    """Write sinks through writeSinks like the outputs of a parse
+
+    Args:
+        sinks (Array): Sink of each output
+
+    Raises:
+        Exception: the error of the first sink that failed
+    """
+    for sink, records, wall, cpu, error in writeSinks(sinks):
+        if error is not None:
+            raise error
+
+def cases(tzdir, conf, tmp):
+    """Get the benchmark cases over a database
+
+    The database is read by loadDB and every registered writer is timed on
+    its own, then all of them together, from the rows shared by a parse.
+
+    Args:
+        tzdir (Str): database directory
+        conf (Dict): config naming the input files
+        tmp (Str): directory for the outputs
+
+    Returns:
+        Array: (name, function) pairs
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = tzdata.loadDB(conf, tzdir, 0)
+    clist = db["countries"]
+    zlist = db["zones"]
+    table = buildTransitions(db["zinfos"], db["rules"], db["aliases"])
+    data = OutputData(db, tzdata.outputRows(db, True), table, {})
+    sinks = [
+        Sink(name, os.path.join(tmp, name), partial(writer.write, os.path.join(tmp, name), 'w', data))
+        for name, writer in WRITERS.items()
+        if name != "columnar" or importlib.util.find_spec("pyarrow") is not None
+    ]
+    locator = ZoneLocator.fromZones(zlist)
+    rnd = random.Random(0)
+    coords = [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(1000)]
+    converter = Converter(TzIndex(table, db["aliases"]))
+    codec = CSVCodec()
+    codec.records(io.StringIO("timestamp,zone\n"))
+    names = sorted(zlist)
+    events = [
+        ["{y}-{m:02d}-{d:02d} {H:02d}:{M:02d}:00".format(
+            y=rnd.randint(1990, 2030), m=rnd.randint(1, 12), d=rnd.randint(1, 28),
+            H=rnd.randint(0, 23), M=rnd.randint(0, 59)
+        ), rnd.choice(names)]
+        for _ in range(10000)
+    ]
+    largest = max(
+        (os.path.join(tzdir, db) for db in conf['tzdata']), key=os.path.getsize
+    )
+    return [
+        ("getCountry", lambda: tzdata.getCountry(conf['countrylist'], tzdir, 0)),
+        ("getZones", lambda: tzdata.getZones(conf['zones'], tzdir, clist, 0)),
+        ("parseTZDB", lambda: tzdata.parseTZDB(largest, 0)),
+        ("parseTZDBs", lambda: tzdata.parseTZDBs(conf['tzdata'], tzdir, 0)),
+        ("check", lambda: indexDB(conf, tzdir, 0).check()),
+        ("nearest", lambda: [locator.nearest(lat, lon) for lat, lon in coords]),
+        ("convert", lambda: codec.convertChunk(converter, [list(row) for row in events])),
+    ] + [
+        (sink.name, partial(writeAll, [sink])) for sink in sinks
+    ] + [
+        ("outputs", partial(writeAll, sinks)),
+    ]
+
+def runCorpus(label, tzdir, conf, repeat, selected):
+    """Run the cases over a database
+
+    Args:
+        label (Str): corpus name for the results
+        tzdir (Str): database directory
+        conf (Dict): config naming the input files
+        repeat (Int): number of runs per case
+        selected (Array): case names to run, all when empty
+
+    Returns:
+        Array: result per case
+    """
+    size = sum(os.path.getsize(os.path.join(tzdir, db)) for db in conf['tzdata'])
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, func in cases(tzdir, conf, tmp):
+            if selected and name not in selected:
+                continue
+            result = {"corpus": label, "case": name, "bytes": size}
+            result.update(timeit(func, repeat))
+            click.echo("{c:<16} {n:<14} {t:10.2f} ms".format(c=label, n=name, t=result["min"] * 1000))
+            results.append(result)
+    return results
+
+def compare(baseline, results, threshold):
+    """Print the change of the best time of each case against a baseline
+
+    Args:
+        baseline (Dict): results of an earlier run
+        results (Array): results of this run
+        threshold (Float): relative slowdown reported as a regression
+
+    Returns:
+        Int: number of regressions
+    """
+    old = {(r["corpus"], r["case"]): r for r in baseline["results"]}
+    regressions = 0
+    click.echo("")
+    click.echo("{c:<16} {n:<14} {o:>10} {m:>10} {r:>7}".format(
+        c="corpus", n="case", o="old ms", m="new ms", r="ratio"))
+    for result in results:
+        before = old.get((result["corpus"], result["case"]))
+        if before is None:
+            continue
+        ratio = result["min"] / before["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions += 1
+        click.echo("{c:<16} {n:<14} {o:10.2f} {m:10.2f} {r:7.2f}{f}".format(
+            c=result["corpus"], n=result["case"], o=before["min"] * 1000,
+            m=result["min"] * 1000, r=ratio, f=flag))
+    return regressions
+
+@click.command()
+@click.option(
+    '--scale', '-s', multiple=True, type=int, default=[10, 100], show_default=True,
+    help='sizes of the synthetic databases relative to a release'
+)
+@click.option(
+    '--tzdir', '-t', multiple=True,
+    type=click.Path(exists=True, file_okay=False, resolve_path=True),
+    help='also run over an extracted tzdata release'
+)
+@click.option(
+    '--case', '-k', multiple=True,
+    help='run only the named cases'
+)
+@click.option(
+    '--repeat', '-n', default=5, show_default=True,
+    help='number of runs per case'
+)
+@click.option(
+    '--output', '-o', default="bench.json", show_default=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help='JSON results file'
+)
+@click.option(
+    '--compare', '-c', 'baseline',
+    type=click.Path(exists=True, dir_okay=False),
+    help='JSON results of an earlier run to compare with'
+)
+@click.option(
+    '--threshold', default=0.1, show_default=True,
+    help='relative slowdown reported as a regression'
+)
+def main(scale, tzdir, case, repeat, output, baseline, threshold):
+    """Time the parser and writers over the vendored excerpt, synthetic
+    databases and optionally real releases, and write the results as JSON.
+
+    Exits with status 1 when --compare finds a regression.
+    """
+    with open(CONFIG) as cnf:
+        conf = yaml.safe_load(cnf)
+    click.echo("sample-excerpt: heavily abridged excerpt of a release, not comparable with one")
+    results = runCorpus("sample-excerpt", synth.SAMPLE, conf, repeat, case)
+    for path in tzdir:
+        results += runCorpus(os.path.basename(path), path, conf, repeat, case)
+    for factor in scale:
+        with tempfile.TemporaryDirectory() as tmp:
+            synth.generate(tmp, factor)
+            results += runCorpus("synthetic-{s}x".format(s=factor), tmp, conf, repeat, case)
+
+    report = {
+        "meta": {
+            "tzparse": __version__,
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=1)
+    click.echo("results written to {path}".format(path=output))
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as fp:
+            regressions = compare(json.load(fp), results, threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Generate synthetic tz databases larger than a real release."""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import random
+import shutil
+
+import click
+
+# Files written, named as in the default config
+REGIONS = [
+    ("africa", "Africa"),
+    ("antarctica", "Antarctica"),
+    ("asia", "Asia"),
+    ("australasia", "Australia"),
+    ("europe", "Europe"),
+    ("northamerica", "America"),
+    ("southamerica", "America"),
+]
+
+# Size of a scale 1 database, close to a current release
+ZONES = 350
+RULE_SETS = 130
+RULES_PER_SET = 16
+LINKS = 250
+MAX_ERAS = 20
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+DAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample")
+
+def offset(rand):
+    """Get a random STDOFF
+
+    Args:
+        rand (Random): random generator
+
+    Returns:
+        Str: [-]h:mm
+    """
+    minutes = rand.randrange(-12 * 60, 14 * 60 + 1, 15)
+    sign = "-" if minutes < 0 else ""
+    return "{s}{h}:{m:02d}".format(s=sign, h=abs(minutes) // 60, m=abs(minutes) % 60)
+
+def ruleLine(rand, name, year):
+    """Get a random Rule line starting in year
+
+    Args:
+        rand (Random): random generator
+        name (Str): rule name
+        year (Int): FROM year
+
+    Returns:
+        Str: Rule line
+    """
+    span = rand.choice(["only", str(year + rand.randrange(1, 12)), "max"])
+    on = rand.choice([
+        str(rand.randrange(1, 29)),
+        "last" + rand.choice(DAYS),
+        "{d}>={n}".format(d=rand.choice(DAYS), n=rand.randrange(1, 23)),
+        "{d}<={n}".format(d=rand.choice(DAYS), n=rand.randrange(8, 29)),
+    ])
+    at = "{h}:00{k}".format(h=rand.randrange(0, 4), k=rand.choice(["", "s", "u"]))
+    save, letters = rand.choice([("1:00", "D"), ("0", "S"), ("0:30", "-"), ("0", "-")])
+    return "Rule\t{n}\t{y}\t{t}\t-\t{m}\t{on}\t{at}\t{s}\t{l}".format(
+        n=name, y=year, t=span, m=rand.choice(MONTHS), on=on, at=at, s=save, l=letters)
+
+def zoneLines(rand, name, ruleNames):
+    """Get a random Zone entry with a deep history
+
+    Args:
+        rand (Random): random generator
+        name (Str): zone name
+        ruleNames (Array): rule names to refer to
+
+    Returns:
+        Array: lines of the Zone entry
+    """
+    year = rand.randrange(1850, 1900)
+    eras = rand.randrange(2, MAX_ERAS + 1)
+    lines = []
+    for i in range(eras):
+        rules = rand.choice(ruleNames + ["-", "-", "1:00"])
+        fmt = rand.choice(["%s", "+%z", "LMT", "STD/DST", "X%sT"])
+        if fmt == "+%z":
+            fmt = "%z"
+        fields = [offset(rand), rules, fmt]
+        if i < eras - 1:
+            year += rand.randrange(1, 8)
+            fields.append("{y} {m} {d} {h}:00{k}".format(
+                y=year, m=rand.choice(MONTHS), d=rand.randrange(1, 29),
+                h=rand.randrange(0, 4), k=rand.choice(["", "s", "u"])))
+        if i == 0:
+            lines.append("Zone\t{name}\t{f}".format(name=name, f="\t".join(fields)))
+        else:
+            lines.append("\t\t\t{f}".format(f="\t".join(fields)))
+    return lines
+
+def countryCodes():
+    """Get the country codes of the vendored iso3166.tab
+
+    Returns:
+        Array: iso3166 country codes
+    """
+    with open(os.path.join(SAMPLE, "iso3166.tab"), encoding="utf-8") as fp:
+        return [line.split("\t")[0] for line in fp if line[:1] != "#" and line.strip()]
+
+def generate(outdir, scale=10, seed=0):
+    """Write a synthetic database scale times the size of a release
+
+    The tzdata files, iso3166.tab and zone1970.tab are named as in the
+    default config.  The same seed gives the same files.
+
+    Args:
+        outdir (Str): output directory
+        scale (Int): size relative to a release (default: {10})
+        seed (Int): random seed (default: {0})
+
+    Returns:
+        Dict: number of zones, rule lines and links written
+    """
+    rand = random.Random(seed)
+    os.makedirs(outdir, exist_ok=True)
+    shutil.copy(os.path.join(SAMPLE, "iso3166.tab"), outdir)
+    codes = countryCodes()
+    files = {fname: [] for fname, _ in REGIONS}
+    ruleNames = []
+    nrules = 0
+    for i in range(RULE_SETS * scale):
+        name = "R{i}".format(i=i)
+        ruleNames.append(name)
+        fname = REGIONS[i % len(REGIONS)][0]
+        year = rand.randrange(1900, 1980)
+        for _ in range(rand.randrange(2, 2 * RULES_PER_SET)):
+            files[fname].append(ruleLine(rand, name, year))
+            year += rand.randrange(0, 4)
+            nrules += 1
+    zones = []
+    for i in range(ZONES * scale):
+        fname, area = REGIONS[i % len(REGIONS)]
+        name = "{a}/Zone{i}".format(a=area, i=i)
+        zones.append(name)
+        files[fname].extend(zoneLines(rand, name, ruleNames))
+    for i in range(LINKS * scale):
+        fname = REGIONS[i % len(REGIONS)][0]
+        files[fname].append("Link\t{t}\tLinks/Link{i}".format(t=rand.choice(zones), i=i))
+    for fname, lines in files.items():
+        with open(os.path.join(outdir, fname), "w", encoding="utf-8") as fp:
+            fp.write("# synthetic tzdata for benchmarks\n")
+            fp.write("\n".join(lines))
+            fp.write("\n")
+    with open(os.path.join(outdir, "zone1970.tab"), "w", encoding="utf-8") as fp:
+        fp.write("# synthetic zone1970.tab for benchmarks\n")
+        for name in zones:
+            fp.write("{c}\t{lat:+03d}{lm:02d}{lon:+04d}{om:02d}\t{z}\t{note}\n".format(
+                c=",".join(rand.sample(codes, rand.randrange(1, 3))),
+                lat=rand.randrange(-89, 90), lm=rand.randrange(60),
+                lon=rand.randrange(-179, 180), om=rand.randrange(60),
+                z=name, note=rand.choice(["", "synthetic"])))
+    return {"zones": len(zones), "rules": nrules, "links": LINKS * scale}
+
+@click.command()
+@click.argument('outdir', type=click.Path(file_okay=False))
+@click.option('--scale', '-s', default=10, show_default=True, help='size relative to a release')
+@click.option('--seed', default=0, show_default=True, help='random seed')
+def main(outdir, scale, seed):
+    """Write a synthetic tz database into OUTDIR."""
+    counts = generate(outdir, scale, seed)
+    click.echo("{zones} zones, {rules} rule lines, {links} links".format(**counts))
+
+if __name__ == '__main__':
+    main()
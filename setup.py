@@ -78,6 +78,11 @@ setup(
         'openpyxl>=3,<4'
     ],
 
+    # optional outputs
+    extras_require={
+        'arrow': ['pyarrow>=1'],
+    },
+
     entry_points={
         'console_scripts': [
             'tzparse=tzparse.cli:main',
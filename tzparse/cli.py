@@ -30,14 +30,61 @@
 
 from __future__ import absolute_import, division, print_function
 
+import os
+
 # Import the main click library
 import click
-# Import the sub-command implementations
+# Import the parse implementation, the other sub-commands are imported when run
 from tzparse.tzdata import tzdata
+from tzparse.tzdata.output import WRITERS
 # Import the version information
 from tzparse.version import __version__
 
-@click.command()
+class DefaultGroup(click.Group):
+    """Command group running the parse command when no command is named,
+    so 'tzparse TZDIR' keeps working."""
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names + ['--version']:
+            args.insert(0, 'parse')
+        return super().parse_args(ctx, args)
+
+@click.group(cls=DefaultGroup)
+@click.version_option(version=__version__)
+def cli():
+    """IANA timezone database parser.
+    Parse data available at https://www.iana.org/time-zones
+
+    The parse command is run when no command is given.
+    """
+    pass
+
+def parseLatLon(ctx, param, value):
+    """Convert a 'lat,lon' option value to a pair of degrees"""
+    if value is None:
+        return None
+    try:
+        lat, lon = (float(v) for v in value.split(','))
+    except ValueError:
+        raise click.BadParameter("expected <lat,lon> in degrees, such as 35.68,139.77")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise click.BadParameter("latitude or longitude out of range")
+    return (lat, lon)
+
+def parseOutputs(ctx, param, value):
+    """Convert '<name>=<file>' option values to (name, absolute path) pairs"""
+    outputs = []
+    for item in value:
+        name, sep, fpath = item.partition('=')
+        if not sep or not fpath:
+            raise click.BadParameter("expected <name>=<file>, such as ndjson=tzdata.ndjson")
+        if name not in WRITERS:
+            raise click.BadParameter("unknown output {name}, expected one of {names}".format(
+                name=name, names=", ".join(WRITERS)))
+        outputs.append((name, os.path.abspath(fpath)))
+    return outputs
+
+@cli.command()
 @click.option(
     '--config', '-c', default="./config.yml",
     type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
@@ -46,7 +93,7 @@ from tzparse.version import __version__
     )
 @click.argument(
     'tzdir',
-    type=click.Path(exists=True, file_okay=False, readable=True, resolve_path=True),
+    type=click.Path(exists=True, readable=True, resolve_path=True),
 )
 @click.option(
     '--zones', '-z',
@@ -66,6 +113,80 @@ from tzparse.version import __version__
     metavar='<tzxl>',
     help='timezone data xlsx output file'
     )
+@click.option(
+    '--history', '-H',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<hist>',
+    help='zone history csv output file'
+    )
+@click.option(
+    '--transitions', '-T',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<trans>',
+    help='UTC transition table csv output file'
+    )
+@click.option(
+    '--binary', '-b',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<bin>',
+    help='binary zones, rules and countries output file'
+    )
+@click.option(
+    '--columnar', '-C',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    metavar='<dir>',
+    help='typed columnar output directory, needs pyarrow'
+    )
+@click.option(
+    '--columnar-format',
+    type=click.Choice(['arrow', 'parquet']),
+    metavar='<fmt>',
+    help='arrow or parquet columnar output (default: arrow)'
+    )
+@click.option(
+    '--output', '-O', 'outputs', multiple=True, callback=parseOutputs,
+    metavar='<name=file>',
+    help='write the output <name> to <file>, <name> being one of ' + ", ".join(WRITERS)
+    )
+@click.option(
+    '--jobs', '-j', type=click.IntRange(min=0),
+    metavar='<n>',
+    help='number of processes parsing tzdata files and writing outputs, 0 for one per CPU'
+    )
+@click.option(
+    '--cache-dir',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    metavar='<dir>',
+    help='cache parsed tzdata files in <dir>'
+    )
+@click.option(
+    '--no-cache', is_flag=True,
+    help='do not use the parsed tzdata cache'
+    )
+@click.option(
+    '--stats', is_flag=True,
+    help='report time, memory and record counts per phase and file'
+    )
+@click.option(
+    '--profile',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<prof>',
+    help='write cProfile data of the run to <prof>'
+    )
+@click.option(
+    '--nearest', callback=parseLatLon,
+    metavar='<lat,lon>',
+    help='print the zone closest to <lat,lon> instead of writing outputs'
+    )
+@click.option(
+    '--count', '-n', type=click.IntRange(min=1), default=1,
+    metavar='<n>',
+    help='number of zones printed by --nearest (default: 1)'
+    )
+@click.option(
+    '--check', is_flag=True,
+    help='check the integrity of the database instead of writing outputs, exit with 1 on errors'
+    )
 @click.option(
     '--overwrite', '-o', is_flag=True,
     help='overwrite output files (default: False)'
@@ -74,12 +195,11 @@ from tzparse.version import __version__
     '--verbose', '-v', count=True,
     help='output in verbose mode'
     )
-@click.version_option(version=__version__)
-def cli(**kwargs):
-    """IANA timezone database parser.
-    Parse data available at https://www.iana.org/time-zones
+def parse(**kwargs):
+    """Parse a release into the CSV and xlsx outputs.
 
-    Download tzdataXXXX.tar.gz file and extract contents to parse.
+    Download tzdataXXXX.tar.gz file and give it as TZDIR, or extract the
+    contents and give the directory.
 
     Config file must be provided to define input files.
     See example config.yml below:
@@ -95,14 +215,288 @@ def cli(**kwargs):
             - europe
             - northamerica
             - southamerica
+        jobs: 1
+        cache:
+            dir: .tzcache
+            maxage: 30
+            maxsize: 64
+        transitions:
+            start: 1970
+            end: 2037
+            cachesize: 65536
+            warmup: [1970, 2037]
         output:
             zonecsv: zones.csv
             rulescsv: rules.csv
             tzdataxls: tzdata.xlsx
+            zonehistorycsv: zonehistory.csv
+            transitionscsv: transitions.csv
+            binary: tzdata.bin
+            columnar: columns
+            columnarformat: arrow
+            ndjson: tzdata.ndjson
 
     Command line options takes precedance over the command line option
+
+    With --check, undefined zones, rules, links and country codes, names
+    defined twice and overlapping Rule lines are reported, and the exit
+    status is 1 when any of them is an error.
+    """
+    result = tzdata.parse(kwargs)
+    if result["problems"] and any(problem.level >= tzdata.Level.ERROR for problem in result["problems"]):
+        click.get_current_context().exit(1)
+
+@cli.command()
+@click.option(
+    '--config', '-c', default="./config.yml",
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<cfg>',
+    help='Configuration File (default: config.yml)'
+    )
+@click.argument(
+    'old',
+    type=click.Path(exists=True, readable=True, resolve_path=True),
+)
+@click.argument(
+    'new',
+    type=click.Path(exists=True, readable=True, resolve_path=True),
+)
+@click.option(
+    '--output', '-O',
+    type=click.Path(exists=False, dir_okay=False, writable=True, allow_dash=True),
+    metavar='<delta>',
+    help='delta output file, - for stdout (default: delta.csv or delta.json)'
+    )
+@click.option(
+    '--format', '-f', 'format', default='csv',
+    type=click.Choice(['csv', 'json']),
+    help='delta output format (default: csv)'
+    )
+@click.option(
+    '--patch', '-p', is_flag=True,
+    help='patch the zone and rule csv files in place'
+    )
+@click.option(
+    '--zones', '-z',
+    type=click.Path(exists=True, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<zones>',
+    help='zone csv file to patch'
+    )
+@click.option(
+    '--rules', '-r',
+    type=click.Path(exists=True, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<rules>',
+    help='rule csv file to patch'
+    )
+@click.option(
+    '--overwrite', '-o', is_flag=True,
+    help='overwrite the delta file (default: False)'
+)
+@click.option(
+    '--jobs', '-j', type=click.IntRange(min=0),
+    metavar='<n>',
+    help='number of processes parsing tzdata files, 0 for one per CPU'
+    )
+@click.option(
+    '--cache-dir',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    metavar='<dir>',
+    help='cache parsed tzdata files in <dir>'
+    )
+@click.option(
+    '--no-cache', is_flag=True,
+    help='do not use the parsed tzdata cache'
+    )
+@click.option(
+    '--verbose', '-v', count=True,
+    help='output in verbose mode'
+    )
+def diff(**kwargs):
+    """Compare the releases OLD and NEW.
+
+    Zones, Rules and Links added, removed or changed between the releases
+    are written keyed by name.  Files with the same contents in both
+    releases are only parsed once.
+
+    With --patch, the zone and rule csv files written by parse for OLD are
+    updated in place to match NEW instead of being written again.
+    """
+    from tzparse.tzdata import diff as tzdiff
+    tzdiff.diff(kwargs)
+
+@cli.command()
+@click.option(
+    '--config', '-c', default="./config.yml",
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<cfg>',
+    help='Configuration File (default: config.yml)'
+    )
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, readable=True, resolve_path=True),
+)
+@click.option(
+    '--host', default='127.0.0.1',
+    metavar='<host>',
+    help='address to listen on (default: 127.0.0.1)'
+    )
+@click.option(
+    '--port', '-p', default=8080, type=click.IntRange(0, 65535),
+    metavar='<port>',
+    help='TCP port to listen on (default: 8080)'
+    )
+@click.option(
+    '--socket', '-s',
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<path>',
+    help='listen on a Unix socket instead of TCP'
+    )
+@click.option(
+    '--interval', default=2.0, type=click.FloatRange(min=0.1),
+    metavar='<sec>',
+    help='seconds between checks for changed files (default: 2)'
+    )
+@click.option(
+    '--timeout', default=10.0, type=click.FloatRange(min=0.1),
+    metavar='<sec>',
+    help='seconds a client may take to send each line of a request (default: 10)'
+    )
+@click.option(
+    '--jobs', '-j', type=click.IntRange(min=0),
+    metavar='<n>',
+    help='number of processes parsing tzdata files, 0 for one per CPU'
+    )
+@click.option(
+    '--cache-dir',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    metavar='<dir>',
+    help='cache parsed tzdata files in <dir>'
+    )
+@click.option(
+    '--no-cache', is_flag=True,
+    help='do not use the parsed tzdata cache'
+    )
+@click.option(
+    '--verbose', '-v', count=True,
+    help='output in verbose mode'
+    )
+def serve(**kwargs):
+    """Serve TZDIR over HTTP until interrupted.
+
+    TZDIR is parsed once and kept in memory.  The files are reloaded when
+    they change, requests in flight finish with the data they started
+    with.
+
+    \b
+    GET /status                    dataset version and load time
+    GET /zones                     names of all zones and links
+    GET /zones/<name>              a zone or link with its history
+    GET /countries/<code or name>  zones used in a country
+    GET /nearest/<lat>,<lon>       zone closest to a coordinate
+    GET /rules                     names of all rule sets
+    GET /rules/<name>              Rule lines of a rule set
+    GET /export/<zones|rules>.<csv|json>
+    """
+    from tzparse.tzdata import server
+    server.serve(kwargs)
+
+@cli.command()
+@click.option(
+    '--config', '-c', default="./config.yml",
+    type=click.Path(exists=False, dir_okay=False, writable=True, resolve_path=True),
+    metavar='<cfg>',
+    help='Configuration File (default: config.yml)'
+    )
+@click.argument(
+    'tzdir',
+    type=click.Path(exists=True, readable=True, resolve_path=True),
+)
+@click.argument(
+    'input',
+    type=click.Path(exists=True, dir_okay=False, readable=True, allow_dash=True),
+)
+@click.argument(
+    'output',
+    type=click.Path(exists=False, dir_okay=False, writable=True),
+)
+@click.option(
+    '--to', '-t',
+    metavar='<zone>',
+    help='zone to convert to (default: UTC)'
+    )
+@click.option(
+    '--format', '-f', 'format',
+    type=click.Choice(['csv', 'jsonl']),
+    help='input and output format (default: jsonl for .jsonl and .ndjson, else csv)'
+    )
+@click.option(
+    '--delimiter', '-d', default=',',
+    metavar='<char>',
+    help='csv delimiter (default: ,)'
+    )
+@click.option(
+    '--time-column', default='timestamp',
+    metavar='<name>',
+    help='column holding the timestamps (default: timestamp)'
+    )
+@click.option(
+    '--zone-column', default='zone',
+    metavar='<name>',
+    help='column holding the zone of wall clock timestamps (default: zone)'
+    )
+@click.option(
+    '--start', type=int,
+    metavar='<year>',
+    help='first year of the transitions (default: 1970)'
+    )
+@click.option(
+    '--end', type=int,
+    metavar='<year>',
+    help='last year of the transitions (default: 2037)'
+    )
+@click.option(
+    '--chunk-size', type=click.IntRange(min=1), default=10000,
+    metavar='<n>',
+    help='rows converted per chunk (default: 10000)'
+    )
+@click.option(
+    '--jobs', '-j', type=click.IntRange(min=0),
+    metavar='<n>',
+    help='number of processes converting chunks and parsing tzdata files, 0 for one per CPU'
+    )
+@click.option(
+    '--cache-dir',
+    type=click.Path(exists=False, file_okay=False, writable=True, resolve_path=True),
+    metavar='<dir>',
+    help='cache parsed tzdata files in <dir>'
+    )
+@click.option(
+    '--no-cache', is_flag=True,
+    help='do not use the parsed tzdata cache'
+    )
+@click.option(
+    '--overwrite', '-o', is_flag=True,
+    help='overwrite the output file (default: False)'
+)
+@click.option(
+    '--verbose', '-v', count=True,
+    help='output in verbose mode'
+    )
+def convert(**kwargs):
+    """Convert the timestamps of INPUT into OUTPUT.
+
+    INPUT is a csv file with a header row, or a file of JSON objects one per
+    line, and - reads stdin.  Each row gets the converted timestamp and the
+    abbreviation in effect, in UTC or in the zone given by --to.
+
+    Timestamps are seconds since the epoch or ISO 8601 times.  An ISO time
+    without 'Z' or an offset is a wall clock time of the zone in the zone
+    column.  Rows are streamed in chunks, so files of any size are converted
+    in constant memory.  Instants outside of the --start and --end years
+    get the offset at the nearest end of the range.
     """
-    tzdata.parse(kwargs)
+    from tzparse.tzdata import convert as tzconvert
+    tzconvert.convert(kwargs)
 
 # Entry point
 def main():
@@ -1 +1 @@
-__all__ = ['tzdata']
+__all__ = ['tzdata', 'tokenizer', 'cache', 'source', 'model', 'transitions', 'tzindex', 'binary', 'diff', 'stats', 'server', 'geo', 'convert', 'columnar', 'output', 'check']
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""compact binary output of the zones, rules and countries"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Layout of the file, all integers little endian unsigned 32 bit:
+#
+#   header     magic "TZPB", u16 version, u16 reserved, then the
+#              (offset, count) of the string index, (offset, size) of the
+#              string data and (offset, count) of each table
+#   strings    (offset, length) into the string data per string id
+#   data       UTF-8 text of all strings, each stored once
+#   zones      string ids of Country, Zone, STDOFF, Rule, Coordinate, Comment
+#   rules      (first, count) into the rule fields per Rule line
+#   fields     string ids of the columns of the Rule lines
+#   countries  string ids of code and name, sorted by code
+#
+# The records only hold string ids, so a reader maps the file and decodes
+# the fields it touches.
+
+import mmap
+import struct
+
+from tzparse.tzdata.output import atomicFile
+
+MAGIC = b"TZPB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHH12I")
+STRING = struct.Struct("<2I")
+ZONE = struct.Struct("<6I")
+RULE = struct.Struct("<2I")
+FIELD = struct.Struct("<I")
+COUNTRY = struct.Struct("<2I")
+
+class StringTable(object):
+    """Assign ids to the strings written to a binary file."""
+
+    def __init__(self):
+        self.ids = {}
+        self.index = bytearray()
+        self.data = bytearray()
+
+    def add(self, text):
+        """Get the id of a string, adding it on first use
+
+        Args:
+            text (Str): string to store
+
+        Returns:
+            Int: string id
+        """
+        sid = self.ids.get(text)
+        if sid is None:
+            raw = text.encode("utf-8")
+            sid = len(self.ids)
+            self.ids[text] = sid
+            self.index += STRING.pack(len(self.data), len(raw))
+            self.data += raw
+        return sid
+
+def dumps(zoneRows, rules, clist):
+    """Encode zones, rules and countries into the binary format
+
+    Args:
+        zoneRows (Iterable): rows of the zone list, see tzdata.zoneRows
+        rules (Array): Rule records
+        clist (Dict): iso3166 country code to country name
+
+    Returns:
+        Bytes: file contents
+    """
+    strings = StringTable()
+    zones = bytearray()
+    nzones = 0
+    for row in zoneRows:
+        zones += ZONE.pack(*map(strings.add, row))
+        nzones += 1
+    body = bytearray()
+    fields = bytearray()
+    nfields = 0
+    for rule in rules:
+        body += RULE.pack(nfields, len(rule.fields))
+        for field in rule.fields:
+            fields += FIELD.pack(strings.add(field))
+        nfields += len(rule.fields)
+    countries = bytearray()
+    for code in sorted(clist):
+        countries += COUNTRY.pack(strings.add(code), strings.add(clist[code]))
+
+    offset = HEADER.size
+    sections = []
+    tables = (strings.index, strings.data, zones, body, fields, countries)
+    for section in tables:
+        sections.append(offset)
+        offset += len(section)
+        # Keep every table 4 byte aligned
+        offset += -offset % 4
+    header = HEADER.pack(
+        MAGIC, VERSION, 0,
+        sections[0], len(strings.ids),
+        sections[1], len(strings.data),
+        sections[2], nzones,
+        sections[3], len(rules),
+        sections[4], nfields,
+        sections[5], len(clist),
+    )
+    out = bytearray(header)
+    for start, section in zip(sections, tables):
+        out += bytes(start - len(out))
+        out += section
+    return bytes(out)
+
+class RecordTable(object):
+    """Read only sequence over a table of a mapped binary file.
+
+    Records are decoded when they are accessed.
+    """
+
+    def __init__(self, db, record, offset, count):
+        self.db = db
+        self.record = record
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def ids(self, i):
+        """Get the string ids of a record
+
+        Args:
+            i (Int): record number
+
+        Returns:
+            Tuple: string ids of the fields
+        """
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("record {i} out of range".format(i=i))
+        return self.record.unpack_from(self.db.buf, self.offset + i * self.record.size)
+
+    def __getitem__(self, i):
+        return [self.db.string(sid) for sid in self.ids(i)]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+class RuleTable(RecordTable):
+    """Read only sequence over the Rule lines of a mapped binary file.
+
+    Rule lines do not all have the same number of columns, so each record
+    points at a slice of the rule fields.
+    """
+
+    def __init__(self, db, record, offset, count, fieldOffset):
+        super().__init__(db, record, offset, count)
+        self.fieldOffset = fieldOffset
+
+    def ids(self, i):
+        first, count = super().ids(i)
+        fmt = "<{n}I".format(n=count)
+        return struct.unpack_from(fmt, self.db.buf, self.fieldOffset + first * FIELD.size)
+
+class BinaryDB(object):
+    """Memory mapped reader of a file written by writeBinary.
+
+    zones, rules and countries are sequences of rows laid out like the CSV
+    outputs.  Pages are shared by every process mapping the same file.
+    """
+
+    def __init__(self, fpath):
+        """Map a binary file
+
+        Args:
+            fpath (Str): file written by writeBinary
+
+        Raises:
+            ValueError: not a file of a known version
+        """
+        with open(fpath, "rb") as fp:
+            self.buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = HEADER.unpack_from(self.buf, 0)
+        if fields[0] != MAGIC or fields[1] != VERSION:
+            self.buf.close()
+            raise ValueError("{path} is not a tzparse binary file of version {v}".format(path=fpath, v=VERSION))
+        (self.stringsOffset, self.nstrings, self.dataOffset, _size,
+         zoneOffset, nzones, ruleOffset, nrules, fieldOffset, _nfields,
+         countryOffset, ncountries) = fields[3:]
+        self.zones = RecordTable(self, ZONE, zoneOffset, nzones)
+        self.rules = RuleTable(self, RULE, ruleOffset, nrules, fieldOffset)
+        self.countries = RecordTable(self, COUNTRY, countryOffset, ncountries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the file"""
+        self.buf.close()
+
+    def string(self, sid):
+        """Decode a string of the string table
+
+        Args:
+            sid (Int): string id
+
+        Returns:
+            Str: the string
+        """
+        start, length = STRING.unpack_from(self.buf, self.stringsOffset + sid * STRING.size)
+        start += self.dataOffset
+        return self.buf[start:start + length].decode("utf-8")
+
+    def countryName(self, code):
+        """Look up a country name by binary search over the country table
+
+        Args:
+            code (Str): iso3166 country code
+
+        Returns:
+            Str: country name, None if unknown
+        """
+        countries = self.countries
+        lo, hi = 0, len(countries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            codeId, nameId = countries.ids(mid)
+            key = self.string(codeId)
+            if key == code:
+                return self.string(nameId)
+            if key < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+def writeBinary(fpath, zoneRows, rules, clist, mode="w"):
+    """Write zones, rules and countries into a binary file, replaced
+    atomically
+
+    Args:
+        fpath (Str): output file
+        zoneRows (Iterable): rows of the zone list, see tzdata.zoneRows
+        rules (Array): Rule records
+        clist (Dict): iso3166 country code to country name
+        mode (Str): 'w' to overwrite or 'x' to fail on an existing file (default: {'w'})
+    """
+    data = dumps(zoneRows, rules, clist)
+    with atomicFile(fpath, mode + "b") as fp:
+        fp.write(data)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""persistent cache of parsed tz database files"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Layout of the cache directory:
+#
+#   <dir>/v<CACHE_VERSION>/index.json    path -> size, mtime and sha256
+#   <dir>/v<CACHE_VERSION>/<sha256>.pickle  parsed result of a file
+#
+# Entries are addressed by the content hash.  The index only saves
+# hashing files whose size and mtime did not change since the last run.
+
+import hashlib
+import json
+import os
+import pickle
+import time
+
+# Bump when the parsed data structure changes
+CACHE_VERSION = 3
+
+INDEX = "index.json"
+SUFFIX = ".pickle"
+
+def cachePath(cacheDir):
+    """Get the directory holding the entries of the current version
+
+    Args:
+        cacheDir (Str): cache directory
+
+    Returns:
+        Str: versioned cache directory
+    """
+    return os.path.join(cacheDir, "v{v}".format(v=CACHE_VERSION))
+
+def loadIndex(cacheDir):
+    """Load the index of the cache directory
+
+    Args:
+        cacheDir (Str): cache directory
+
+    Returns:
+        Dict: file path to {"size", "mtime", "hash"}
+    """
+    try:
+        with open(os.path.join(cachePath(cacheDir), INDEX), encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+def saveIndex(cacheDir, index):
+    """Save the index of the cache directory
+
+    Args:
+        cacheDir (Str): cache directory
+        index (Dict): index returned by loadIndex
+    """
+    writeAtomic(
+        os.path.join(cachePath(cacheDir), INDEX),
+        json.dumps(index, indent=1, sort_keys=True).encode("utf-8")
+    )
+
+def writeAtomic(fpath, data):
+    """Write data to fpath through a temporary file
+
+    Args:
+        fpath (Str): file to write
+        data (Bytes): file contents
+    """
+    os.makedirs(os.path.dirname(fpath) or ".", exist_ok=True)
+    tmp = "{path}.{pid}.tmp".format(path=fpath, pid=os.getpid())
+    with open(tmp, "wb") as fp:
+        fp.write(data)
+    os.replace(tmp, fpath)
+
+def fileHash(fpath, index):
+    """Get the content hash of a file, skipping the hashing when the size
+    and mtime match the index.  The index is updated in place.
+
+    Args:
+        fpath (Str): database file
+        index (Dict): index returned by loadIndex
+
+    Returns:
+        Str: sha256 hex digest of the file contents
+    """
+    key = os.path.abspath(fpath)
+    st = os.stat(fpath)
+    known = index.get(key)
+    if known and known["size"] == st.st_size and known["mtime"] == st.st_mtime_ns:
+        return known["hash"]
+    with open(fpath, "rb") as fp:
+        digest = dataHash(fp.read())
+    index[key] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": digest}
+    return digest
+
+def dataHash(data):
+    """Get the content hash of a file already read in memory
+
+    Args:
+        data (Bytes): file contents
+
+    Returns:
+        Str: sha256 hex digest of data
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def load(cacheDir, digest):
+    """Load the parsed result of a file
+
+    Args:
+        cacheDir (Str): cache directory
+        digest (Str): content hash of the file
+
+    Returns:
+        Tuple: parsed result, or None on a cache miss
+    """
+    fpath = os.path.join(cachePath(cacheDir), digest + SUFFIX)
+    try:
+        with open(fpath, "rb") as fp:
+            entry = pickle.load(fp)
+        if entry["version"] != CACHE_VERSION:
+            raise ValueError("cache version {v}".format(v=entry["version"]))
+        data = entry["data"]
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Truncated, or holding records whose classes moved or changed,
+        # the file is parsed again and the entry replaced
+        try:
+            os.remove(fpath)
+        except OSError:
+            pass
+        return None
+    # Record the use for the age based eviction
+    try:
+        os.utime(fpath)
+    except OSError:
+        pass
+    return data
+
+def store(cacheDir, digest, data):
+    """Store the parsed result of a file
+
+    Args:
+        cacheDir (Str): cache directory
+        digest (Str): content hash of the file
+        data (Tuple): parsed result
+    """
+    entry = {"version": CACHE_VERSION, "data": data}
+    writeAtomic(
+        os.path.join(cachePath(cacheDir), digest + SUFFIX),
+        pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+def evict(cacheDir, maxAge=None, maxSize=None):
+    """Remove old entries and older versions from the cache directory
+
+    Entries not used for maxAge days are removed, then the least recently
+    used entries are removed until the cache fits in maxSize MiB.
+
+    Args:
+        cacheDir (Str): cache directory
+        maxAge (Float): maximum age of an entry in days (default: {None})
+        maxSize (Float): maximum size of the cache in MiB (default: {None})
+
+    Returns:
+        Int: number of removed entries
+    """
+    removed = 0
+    current = os.path.basename(cachePath(cacheDir))
+    try:
+        names = os.listdir(cacheDir)
+    except OSError:
+        return removed
+    # Entries of other format versions can never be read again
+    for name in names:
+        path = os.path.join(cacheDir, name)
+        if name != current and name[:1] == "v" and name[1:].isdigit() and os.path.isdir(path):
+            for old in os.listdir(path):
+                os.remove(os.path.join(path, old))
+                removed += 1
+            os.rmdir(path)
+
+    path = cachePath(cacheDir)
+    entries = []
+    try:
+        for entry in os.scandir(path):
+            if entry.name.endswith(SUFFIX):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    except OSError:
+        return removed
+    entries.sort()
+    if maxAge is not None:
+        limit = time.time() - maxAge * 86400
+        while entries and entries[0][0] < limit:
+            os.remove(entries.pop(0)[2])
+            removed += 1
+    if maxSize is not None:
+        total = sum(entry[1] for entry in entries)
+        while entries and total > maxSize * 1024 * 1024:
+            mtime, size, fpath = entries.pop(0)
+            os.remove(fpath)
+            total -= size
+            removed += 1
+    return removed
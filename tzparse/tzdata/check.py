@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""integrity check of the zones, rules, links and country codes"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import csv
+from collections import namedtuple
+
+from tzparse.tzdata.geo import parseCoord
+from tzparse.tzdata.model import Rule, parseOffset, parseSave
+from tzparse.tzdata.source import isArchive, readInputs, openTZFile, displayPath
+from tzparse.tzdata.stats import Stats
+from tzparse.tzdata.tokenizer import tokenize, ZoneEntry, LinkEntry
+from tzparse.tzdata.transitions import isAmount
+from tzparse.tzdata.tzdata import pout, Level
+
+Problem = namedtuple('Problem', ['level', 'kind', 'name', 'message'])
+Problem.__doc__ = """Inconsistency found in a database.
+
+level is Level.ERROR for data that makes parse fail or its outputs wrong,
+and Level.WARNING for data parse handles on purpose, such as a Zone
+replacing the Link of an earlier file.  kind is 'malformed', 'duplicate',
+'missing', 'country', 'rule', 'link' or 'overlap', and name the zone,
+link, rule or country code concerned.
+"""
+
+def tabRows(fp):
+    """Read the rows of a tab separated file, comments and blank lines left out"""
+    return csv.reader(filter(lambda line: line[:1] != '#' and line.strip(), fp), delimiter='\t')
+
+def definedIn(first, fname):
+    """Name the files of a definition and of its duplicate"""
+    if first == fname:
+        return "{file} twice".format(file=fname)
+    return "{first} and {file}".format(first=first, file=fname)
+
+class Index(object):
+    """Hash indexes over the definitions of a database.
+
+    Every definition is indexed by name as its file is read, so a name
+    defined twice is found by a single lookup, and checking the references
+    between the definitions afterwards takes a lookup per reference.  The
+    check is linear in the size of the database.
+    """
+
+    def __init__(self):
+        self.countries = {}     # iso3166 code to country name
+        self.zonelist = {}      # zone1970 zone to its country codes
+        self.zones = {}         # Zone name to (file, ZoneEntry)
+        self.links = {}         # Link name to (file, target)
+        self.rules = {}         # rule name to its Rule lines
+        self.problems = []
+
+    def report(self, level, kind, name, message, **kwargs):
+        """Add a problem, message being formatted with name and kwargs"""
+        self.problems.append(Problem(level, kind, name, message.format(name=name, **kwargs)))
+
+    def addCountries(self, isoFile, tzdir):
+        """Index the country codes of the iso3166.tab file
+
+        Args:
+            isoFile (Str): file name of the iso3166.tab file
+            tzdir (Str or TZArchive): directory or archive holding the file
+        """
+        with openTZFile(isoFile, tzdir) as fp:
+            for row in tabRows(fp):
+                if len(row) < 2:
+                    self.report(Level.ERROR, "malformed", row[0], "{file}: no country name for {name}", file=isoFile)
+                elif row[0] in self.countries:
+                    self.report(Level.ERROR, "duplicate", row[0], "{file}: country code {name} listed twice", file=isoFile)
+                else:
+                    self.countries[row[0]] = row[1]
+
+    def addZoneList(self, zoneFile, tzdir):
+        """Index the zones of the zone1970.tab file
+
+        Args:
+            zoneFile (Str): file name of the zone1970.tab file
+            tzdir (Str or TZArchive): directory or archive holding the file
+        """
+        with openTZFile(zoneFile, tzdir) as fp:
+            for row in tabRows(fp):
+                if len(row) < 3:
+                    self.report(Level.ERROR, "malformed", row[0], "{file}: malformed line {line}",
+                                file=zoneFile, line="\t".join(row))
+                    continue
+                codes, coord, zone = row[:3]
+                if zone in self.zonelist:
+                    self.report(Level.ERROR, "duplicate", zone, "{file}: zone {name} listed twice", file=zoneFile)
+                try:
+                    parseCoord(coord)
+                except ValueError:
+                    self.report(Level.WARNING, "malformed", zone, "{file}: {name} has a malformed coordinate {coord}",
+                                file=zoneFile, coord=coord)
+                self.zonelist[zone] = codes.split(',')
+
+    def addTZDB(self, fname, tzdir):
+        """Index the Zones, Links and Rules of a database file
+
+        Files must be added in the order of the config, as a Zone replaces
+        the Link of an earlier file.
+
+        Args:
+            fname (Str): file name
+            tzdir (Str or TZArchive): directory or archive holding the file
+        """
+        with openTZFile(fname, tzdir) as fp:
+            for entry in tokenize(fp):
+                if isinstance(entry, ZoneEntry):
+                    self.addZone(fname, entry)
+                elif isinstance(entry, LinkEntry):
+                    self.addLink(fname, entry)
+                else:
+                    self.addRule(fname, entry)
+
+    def addZone(self, fname, entry):
+        """Index a ZoneEntry of the file fname"""
+        name = entry.name
+        if name in self.zones:
+            self.report(Level.ERROR, "duplicate", name, "Zone {name} defined in {files}",
+                        files=definedIn(self.zones[name][0], fname))
+        elif name in self.links:
+            lname = self.links[name][0]
+            if lname == fname:
+                self.report(Level.ERROR, "duplicate", name, "{name} defined as a Zone and a Link in {file}", file=fname)
+            else:
+                self.report(Level.WARNING, "duplicate", name, "Zone {name} of {file} replaces the Link of {first}",
+                            first=lname, file=fname)
+                del self.links[name]
+        self.zones[name] = (fname, entry)
+
+    def addLink(self, fname, entry):
+        """Index a LinkEntry of the file fname"""
+        name = entry.name
+        if name in self.links:
+            self.report(Level.ERROR, "duplicate", name, "Link {name} defined in {files}",
+                        files=definedIn(self.links[name][0], fname))
+        elif name in self.zones:
+            self.report(Level.ERROR, "duplicate", name, "{name} defined as a Zone in {first} and a Link in {file}",
+                        first=self.zones[name][0], file=fname)
+        self.links[name] = (fname, entry.target)
+
+    def addRule(self, fname, entry):
+        """Index a RuleEntry of the file fname"""
+        try:
+            rule = Rule.fromFields(entry.fields)
+        except ValueError as e:
+            self.report(Level.ERROR, "malformed", entry.name, "{file}: {e}", file=fname, e=e)
+            return
+        self.rules.setdefault(rule.name, []).append(rule)
+
+    def check(self):
+        """Check the references between the indexed definitions
+
+        Returns:
+            Array: Problem list, those found while indexing first
+        """
+        self.checkZoneList()
+        self.checkZones()
+        self.checkLinks()
+        self.checkRules()
+        return self.problems
+
+    def checkZoneList(self):
+        """Report zone1970 zones neither defined as a Zone nor as a Link,
+        and country codes missing from iso3166"""
+        for zone, codes in self.zonelist.items():
+            if zone not in self.zones and zone not in self.links:
+                self.report(Level.ERROR, "missing", zone, "{name} is listed in the zone list but not defined")
+            for code in codes:
+                if code not in self.countries:
+                    self.report(Level.ERROR, "country", code, "{zone} is in the unknown country {name}", zone=zone)
+
+    def checkZones(self):
+        """Report malformed Zone lines and rule names with no Rule lines"""
+        for name, (fname, entry) in self.zones.items():
+            unknown = set()
+            for era in entry.eras:
+                if len(era) < 3:
+                    self.report(Level.ERROR, "malformed", name, "{file}: Zone {name} has a short line {line}",
+                                file=fname, line=" ".join(era))
+                    continue
+                try:
+                    parseOffset(era[0])
+                    if isAmount(era[1]):
+                        parseSave(era[1])
+                except ValueError:
+                    self.report(Level.ERROR, "malformed", name, "{file}: Zone {name} has a malformed line {line}",
+                                file=fname, line=" ".join(era))
+                    continue
+                if not isAmount(era[1]) and era[1] not in self.rules and era[1] not in unknown:
+                    unknown.add(era[1])
+                    self.report(Level.ERROR, "rule", era[1], "Zone {zone} uses the undefined rule {name}", zone=name)
+
+    def checkLinks(self):
+        """Report Links not ending at a Zone, following every chain once"""
+        resolved = {}
+        for link in self.links:
+            if link in resolved:
+                continue
+            chain = []
+            seen = set()
+            target = link
+            while target in self.links and target not in resolved and target not in seen:
+                chain.append(target)
+                seen.add(target)
+                target = self.links[target][1]
+            if target in resolved:
+                ok = resolved[target]
+            elif target in self.zones:
+                ok = True
+            elif target in seen:
+                ok = False
+                cycle = chain[chain.index(target):] + [target]
+                self.report(Level.ERROR, "link", target, "link cycle: {cycle}", cycle=" -> ".join(cycle))
+            else:
+                ok = False
+                self.report(Level.ERROR, "link", chain[-1], "{name} links to the undefined zone {target}", target=target)
+            for name in chain:
+                resolved[name] = ok
+
+    def checkRules(self):
+        """Report Rule lines of a rule set taking effect on the same day of
+        overlapping years"""
+        for name, lines in self.rules.items():
+            days = {}
+            for rule in lines:
+                days.setdefault((rule.month, rule.on), []).append(rule)
+            for same in days.values():
+                if len(same) < 2:
+                    continue
+                same.sort(key=lambda rule: rule.first)
+                latest = same[0]
+                for rule in same[1:]:
+                    if latest.last is None or rule.first <= latest.last:
+                        self.report(Level.ERROR, "overlap", name, "Rule {first} overlaps Rule {line}",
+                                    first=" ".join(latest.fields), line=" ".join(rule.fields))
+                    if latest.last is not None and (rule.last is None or rule.last > latest.last):
+                        latest = rule
+
+def indexDB(conf, tzdir, verbose):
+    """Index the input files of a tz database in a single pass
+
+    Args:
+        conf (dict): configuration returned by readConf
+        tzdir (Str or TZArchive): directory or archive of the database
+        verbose (Int): verbosity mode
+
+    Returns:
+        Index: indexes of the database, holding the problems found so far
+    """
+    index = Index()
+    index.addCountries(conf['countrylist'], tzdir)
+    index.addZoneList(conf['zones'], tzdir)
+    for db in conf['tzdata']:
+        pout("checking {path}", verbose, Level.INFO, path=displayPath(db, tzdir))
+        index.addTZDB(db, tzdir)
+    return index
+
+def checkDB(conf, tzdir, verbose, stats=None):
+    """Check the integrity of a tz database and report its problems
+
+    Zones of the zone list must be defined, with their country codes in the
+    country list.  Rule columns must name defined rule sets and Links must
+    end at a Zone.  Names may be defined once, and the lines of a rule set
+    taking effect on the same day may not cover the same years.  Problems
+    are reported as errors or warnings, see Problem.
+
+    Args:
+        conf (dict): configuration returned by readConf
+        tzdir (Str): directory or release archive of the database
+        verbose (Int): verbosity mode
+        stats (Stats): collector of the per phase statistics (default: {None})
+
+    Returns:
+        Array: Problem list
+    """
+    if stats is None:
+        stats = Stats(False)
+    inputs = [conf['countrylist'], conf['zones']] + conf['tzdata']
+    if isArchive(tzdir):
+        with stats.phase("archive") as counts:
+            pout("Reading archive: {arc}".format(arc=tzdir), verbose, Level.INFO)
+            tzdir = readInputs(tzdir, inputs)
+            counts["files"] = len(tzdir)
+    else:
+        readInputs(tzdir, inputs)
+
+    with stats.phase("index") as counts:
+        index = indexDB(conf, tzdir, verbose)
+        counts.update(
+            countries=len(index.countries), zonelist=len(index.zonelist), zones=len(index.zones),
+            links=len(index.links), rules=sum(map(len, index.rules.values()))
+        )
+    with stats.phase("check") as counts:
+        problems = index.check()
+        errors = sum(1 for problem in problems if problem.level >= Level.ERROR)
+        counts.update(errors=errors, warnings=len(problems) - errors)
+
+    # Warnings are the point of the check, so they are shown at any verbosity
+    for problem in problems:
+        pout("{kind}: {message}", max(verbose, 1), problem.level, kind=problem.kind, message=problem.message)
+    pout("{errors} errors, {warnings} warnings in {zones} zones, {links} links and {rules} rule sets",
+         verbose, Level.INFO, errors=errors, warnings=len(problems) - errors,
+         zones=len(index.zones), links=len(index.links), rules=len(index.rules))
+    return problems
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""typed columnar export of the parsed database"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+# Every column holds a single type, so the tables load without parsing:
+#   offsets, AT and SAVE amounts are seconds (int32)
+#   FROM and TO are years (int16), 'min' and 'max' being YEAR_MIN and YEAR_MAX
+#   ON is split into OnKind ('day', 'last', '>=' or '<='), OnWeekday
+#       (0 for Monday to 6 for Sunday) and OnDay
+#   UNTIL is the local time in seconds since the epoch, with its w/s/u kind
+#   strings are dictionary encoded
+# The Rule column of zones is the rule name, null when the zone gives an
+# amount of saved time, which is then in Save.
+
+import os
+
+# Optional and slow to import, see importArrow
+pyarrow = None
+
+from tzparse.tzdata.model import parseOffset
+from tzparse.tzdata.output import atomicFile
+from tzparse.tzdata.transitions import parseUntil, isAmount
+
+YEAR_MIN = -32768
+YEAR_MAX = 32767
+
+# File extension of each format
+FORMATS = {"arrow": "arrow", "parquet": "parquet"}
+
+def importArrow():
+    """Import pyarrow when the columnar output is first built
+
+    Returns:
+        Module: pyarrow
+
+    Raises:
+        ImportError: pyarrow is not installed
+    """
+    global pyarrow
+    if pyarrow is None:
+        import pyarrow.feather
+        import pyarrow.parquet
+    return pyarrow
+
+def clampYear(year):
+    """Map a year of a Rule to the int16 range"""
+    if year is None:
+        return YEAR_MAX
+    return max(YEAR_MIN, min(YEAR_MAX, year))
+
+def splitRule(rules):
+    """Split the RULES column of a zone into a rule name and an amount
+
+    Args:
+        rules (Str): RULES column
+
+    Returns:
+        Tuple: (rule name or None, saved seconds or None)
+    """
+    if isAmount(rules):
+        return None, parseOffset(rules)
+    return rules, None
+
+def ruleColumns(rules):
+    """Type the columns of the rules
+
+    Args:
+        rules (Array): Rule records
+
+    Returns:
+        Dict: column name to list of values
+    """
+    cols = {name: [] for name in (
+        "Name", "From", "To", "In", "OnKind", "OnWeekday", "OnDay",
+        "At", "AtKind", "Save", "IsDST", "Letter"
+    )}
+    for rule in rules:
+        cols["Name"].append(rule.name)
+        cols["From"].append(clampYear(rule.first))
+        cols["To"].append(clampYear(rule.last))
+        cols["In"].append(rule.month)
+        cols["OnKind"].append(rule.on.kind)
+        cols["OnWeekday"].append(rule.on.weekday)
+        cols["OnDay"].append(rule.on.day)
+        cols["At"].append(rule.at)
+        cols["AtKind"].append(rule.atKind)
+        cols["Save"].append(rule.save)
+        cols["IsDST"].append(rule.isdst)
+        cols["Letter"].append(rule.letters)
+    return cols
+
+def zoneColumns(zlist):
+    """Type the columns of the zone list, one row per country of each zone
+
+    Args:
+        zlist (dict): zone list joined with the zone information
+
+    Returns:
+        Dict: column name to list of values
+    """
+    cols = {name: [] for name in (
+        "Country", "Code", "Zone", "STDOFF", "Rule", "Save", "Latitude", "Longitude", "Comment"
+    )}
+    for zone, info in zlist.items():
+        rule, save = splitRule(info["Rule"])
+        for country, code in zip(info["Countries"], info["Codes"]):
+            cols["Country"].append(country)
+            cols["Code"].append(code)
+            cols["Zone"].append(zone)
+            cols["STDOFF"].append(parseOffset(info["STDOFF"]))
+            cols["Rule"].append(rule)
+            cols["Save"].append(save)
+            cols["Latitude"].append(info["Latitude"])
+            cols["Longitude"].append(info["Longitude"])
+            cols["Comment"].append(info["Comment"])
+    return cols
+
+def historyColumns(zinfos, aliases):
+    """Type the columns of the zone history, one row per line of each Zone
+
+    Args:
+        zinfos (dict): parsed timezone information
+        aliases (dict): alias index returned by resolveLinks
+
+    Returns:
+        Dict: column name to list of values
+    """
+    cols = {name: [] for name in (
+        "Zone", "Line", "STDOFF", "Rule", "Save", "Format", "Until", "UntilKind"
+    )}
+    for zone in zinfos:
+        if aliases.get(zone) != zone:
+            continue
+        for line, era in enumerate(zinfos[zone]["History"]):
+            rule, save = splitRule(era.rules)
+            if era.until:
+                days, seconds, kind = parseUntil(era.until)
+                until = days * 86400 + seconds
+            else:
+                until = kind = None
+            cols["Zone"].append(zone)
+            cols["Line"].append(line)
+            cols["STDOFF"].append(parseOffset(era.stdoff))
+            cols["Rule"].append(rule)
+            cols["Save"].append(save)
+            cols["Format"].append(era.format)
+            cols["Until"].append(until)
+            cols["UntilKind"].append(kind)
+    return cols
+
+def transitionColumns(table):
+    """Flatten a transition table into columns
+
+    Args:
+        table (Dict): zone name to ZoneTransitions, see buildTransitions
+
+    Returns:
+        Dict: column name to list of values
+    """
+    cols = {"Zone": [], "UTC": [], "Offset": [], "IsDST": [], "Abbreviation": []}
+    for zone in sorted(table):
+        trans = table[zone]
+        cols["Zone"].extend([zone] * len(trans.instants))
+        cols["UTC"].extend(trans.instants)
+        cols["Offset"].extend(trans.offsets)
+        cols["IsDST"].extend(bool(dst) for dst in trans.isdst)
+        cols["Abbreviation"].extend(trans.abbrs)
+    return cols
+
+def schemas():
+    """Get the arrow types of the columns of every table
+
+    Returns:
+        Dict: table name to column name to arrow type
+    """
+    importArrow()
+    text = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    seconds = pyarrow.int32()
+    year = pyarrow.int16()
+    small = pyarrow.int8()
+    return {
+        "zones": {
+            "Country": text, "Code": text, "Zone": text, "STDOFF": seconds, "Rule": text,
+            "Save": seconds, "Latitude": pyarrow.float64(), "Longitude": pyarrow.float64(),
+            "Comment": text,
+        },
+        "rules": {
+            "Name": text, "From": year, "To": year, "In": small, "OnKind": text,
+            "OnWeekday": small, "OnDay": small, "At": seconds, "AtKind": text,
+            "Save": seconds, "IsDST": pyarrow.bool_(), "Letter": text,
+        },
+        "history": {
+            "Zone": text, "Line": pyarrow.int16(), "STDOFF": seconds, "Rule": text,
+            "Save": seconds, "Format": text, "Until": pyarrow.int64(), "UntilKind": text,
+        },
+        "transitions": {
+            "Zone": text, "UTC": pyarrow.timestamp("s", tz="UTC"), "Offset": seconds,
+            "IsDST": pyarrow.bool_(), "Abbreviation": text,
+        },
+    }
+
+def toTable(cols, types):
+    """Build an arrow table from columns
+
+    Args:
+        cols (Dict): column name to list of values
+        types (Dict): column name to arrow type
+
+    Returns:
+        pyarrow.Table: the table
+    """
+    arrays = []
+    for name, kind in types.items():
+        if pyarrow.types.is_dictionary(kind):
+            arrays.append(pyarrow.array(cols[name], type=kind.value_type).dictionary_encode())
+        else:
+            arrays.append(pyarrow.array(cols[name], type=kind))
+    return pyarrow.Table.from_arrays(arrays, names=list(types))
+
+def tables(db, table=None):
+    """Build the arrow tables of a database
+
+    Args:
+        db (dict): database returned by loadDB
+        table (Dict): transition table to include (default: {None})
+
+    Returns:
+        Dict: table name to pyarrow.Table
+    """
+    types = schemas()
+    result = {
+        "zones": toTable(zoneColumns(db["zones"]), types["zones"]),
+        "rules": toTable(ruleColumns(db["rules"]), types["rules"]),
+        "history": toTable(historyColumns(db["zinfos"], db["aliases"]), types["history"]),
+    }
+    if table is not None:
+        result["transitions"] = toTable(transitionColumns(table), types["transitions"])
+    return result
+
+def writeColumnar(dpath, db, table=None, fmt="arrow", overwrite=False):
+    """Write the tables of a database into a directory, one file per table,
+    each replaced atomically
+
+    Args:
+        dpath (Str): output directory, created when missing
+        db (dict): database returned by loadDB
+        table (Dict): transition table to include (default: {None})
+        fmt (Str): 'arrow' for Arrow IPC (Feather) or 'parquet' (default: {'arrow'})
+        overwrite (Bool): replace existing files (default: {False})
+
+    Returns:
+        Array: paths of the files written
+
+    Raises:
+        ImportError: pyarrow is not installed
+        FileExistsError: a file exists and overwrite is False
+    """
+    importArrow()
+    built = tables(db, table)
+    fpaths = {
+        name: os.path.join(dpath, "{name}.{ext}".format(name=name, ext=FORMATS[fmt]))
+        for name in built
+    }
+    if not overwrite:
+        for fpath in fpaths.values():
+            if os.path.exists(fpath):
+                raise FileExistsError(fpath)
+    os.makedirs(dpath, exist_ok=True)
+    for name, data in built.items():
+        with atomicFile(fpaths[name], "wb") as fp:
+            if fmt == "parquet":
+                pyarrow.parquet.write_table(data, fp)
+            else:
+                pyarrow.feather.write_feather(data, fp, compression="uncompressed")
+    return list(fpaths.values())
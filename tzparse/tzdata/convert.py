@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""streaming conversion of timestamps between zones"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import csv
+import io
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from itertools import islice
+
+import click
+
+from tzparse.tzdata.output import atomicFile
+from tzparse.tzdata.transitions import buildTransitions, RuleExpander
+from tzparse.tzdata.tzindex import TzIndex
+from tzparse.tzdata.tzdata import pout, Level, readConf, loadDB, requireParsedRules
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Columns added to every row
+OUTPUT_COLUMNS = ["converted", "abbreviation"]
+
+def parseTimestamp(value):
+    """Read a timestamp of the input
+
+    Numbers are seconds since the epoch.  Strings are either numbers or ISO
+    8601 date and times, 'YYYY-MM-DD HH:MM[:SS[.fff]]' with a 'T' or a
+    space between the date and the time.  An ISO time ending in 'Z' or in
+    an offset such as '+09:00' is an instant, without one it is a wall
+    clock time of the zone of the row.
+
+    Args:
+        value (Str or Number): timestamp
+
+    Returns:
+        Tuple: (seconds since the epoch, fraction of the second as written,
+            True when the timestamp is an instant)
+
+    Raises:
+        ValueError: malformed timestamp
+    """
+    if isinstance(value, bool):
+        raise ValueError("malformed timestamp: {v}".format(v=value))
+    if isinstance(value, int):
+        return value, "", True
+    text = value if isinstance(value, str) else str(value)
+    if text.isdigit():
+        return int(text), "", True
+    text = text.strip()
+    if len(text) < 16 or text[4] != '-':
+        try:
+            number = Decimal(text)
+            seconds = math.floor(number)
+        except (InvalidOperation, OverflowError, ValueError):
+            raise ValueError("malformed timestamp: {v}".format(v=value))
+        fraction = number - seconds
+        return seconds, str(fraction)[1:] if fraction else "", True
+    if text[10] not in 'T ' or text[13] != ':':
+        raise ValueError("malformed timestamp: {v}".format(v=value))
+    seconds = daysOf(text[:10]) * 86400 + int(text[11:13]) * 3600 + int(text[14:16]) * 60
+    rest = text[16:]
+    if rest[:1] == ':':
+        seconds += int(rest[1:3])
+        rest = rest[3:]
+    fraction = ""
+    if rest[:1] in ('.', ','):
+        end = 1
+        while end < len(rest) and rest[end].isdigit():
+            end += 1
+        fraction = "." + rest[1:end]
+        rest = rest[end:]
+    if not rest:
+        return seconds, fraction, False
+    if rest in ('Z', 'z'):
+        return seconds, fraction, True
+    digits = rest[1:].replace(':', '')
+    if rest[0] not in '+-' or len(digits) not in (2, 4) or not digits.isdigit():
+        raise ValueError("malformed timestamp: {v}".format(v=value))
+    offset = int(digits[:2]) * 3600 + int(digits[2:] or 0) * 60
+    return seconds - offset if rest[0] == '+' else seconds + offset, fraction, True
+
+def formatTimestamp(seconds, fraction, offset):
+    """Write a local time as an ISO 8601 timestamp
+
+    Args:
+        seconds (Int): local time as seconds since the epoch
+        fraction (Str): fraction of the second as read
+        offset (Int or None): offset in seconds east of UTC, None for 'Z'
+
+    Returns:
+        Str: timestamp such as 2024-03-10T03:00:00-04:00
+    """
+    days, secs = divmod(seconds, 86400)
+    return "%sT%02d:%02d:%02d%s%s" % (
+        dateOf(days), secs // 3600, secs // 60 % 60, secs % 60, fraction, offsetOf(offset)
+    )
+
+# Logs repeat a small number of days and offsets, so their conversions are
+# cached instead of being done for every row.
+
+@lru_cache(maxsize=4096)
+def daysOf(text):
+    """Get the days since the epoch of a YYYY-MM-DD date
+
+    Raises:
+        ValueError: malformed date
+    """
+    if text[4] != '-' or text[7] != '-':
+        raise ValueError("malformed date: {d}".format(d=text))
+    return date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal() - EPOCH_ORDINAL
+
+@lru_cache(maxsize=4096)
+def dateOf(days):
+    """Get the YYYY-MM-DD date of days since the epoch"""
+    return date.fromordinal(days + EPOCH_ORDINAL).isoformat()
+
+@lru_cache(maxsize=256)
+def offsetOf(offset):
+    """Get the ISO 8601 suffix of an offset, Z for None"""
+    if offset is None:
+        return "Z"
+    sign = '-' if offset < 0 else '+'
+    minutes, secs = divmod(abs(offset), 60)
+    text = "{s}{H:02d}:{M:02d}".format(s=sign, H=minutes // 60, M=minutes % 60)
+    return text + (":{S:02d}".format(S=secs) if secs else "")
+
+class Converter(object):
+    """Convert timestamps to UTC or to a target zone through a TzIndex."""
+
+    def __init__(self, index, target=None):
+        """Set up the conversion
+
+        Args:
+            index (TzIndex): offsets of the zones
+            target (Str): zone to convert to, UTC when None (default: {None})
+        """
+        self.index = index
+        self.target = None if target is None else index.zoneId(target)
+
+    def convert(self, timestamp, zone):
+        """Convert a single timestamp
+
+        Args:
+            timestamp (Str or Number): timestamp, see parseTimestamp
+            zone (Str): zone of a wall clock timestamp, unused for instants
+
+        Returns:
+            Tuple: (converted timestamp, abbreviation in effect)
+
+        Raises:
+            ValueError: malformed timestamp or unknown zone
+        """
+        seconds, fraction, instant = parseTimestamp(timestamp)
+        index = self.index
+        if not instant:
+            if zone not in index.ids:
+                raise ValueError("unknown zone: {zone}".format(zone=zone))
+            seconds = index.utcOf(index.ids[zone], seconds)
+        if self.target is None:
+            return formatTimestamp(seconds, fraction, None), "UTC"
+        offset, _, abbr = index.lookup(self.target, seconds)
+        return formatTimestamp(seconds + offset, fraction, offset), abbr
+
+class CSVCodec(object):
+    """Rows of a CSV file with a header, the output gets the header and
+    delimiter of the input."""
+
+    def __init__(self, delimiter=',', timeColumn="timestamp", zoneColumn="zone"):
+        self.delimiter = delimiter
+        self.timeColumn = timeColumn
+        self.zoneColumn = zoneColumn
+        self.header = None
+
+    def records(self, fp):
+        """Start reading an input
+
+        Args:
+            fp (File): input text stream
+
+        Returns:
+            Iterator: rows of the input after the header
+
+        Raises:
+            click.UsageError: the timestamp column is missing
+        """
+        reader = csv.reader(fp, delimiter=self.delimiter)
+        self.header = next(reader, [])
+        if self.timeColumn not in self.header:
+            raise click.UsageError("no column named {col}".format(col=self.timeColumn))
+        self.timeIndex = self.header.index(self.timeColumn)
+        if self.zoneColumn in self.header:
+            self.zoneIndex = self.header.index(self.zoneColumn)
+        else:
+            self.zoneIndex = None
+        return reader
+
+    def writeHeader(self, fp):
+        csv.writer(fp, delimiter=self.delimiter, lineterminator='\n').writerow(
+            self.header + OUTPUT_COLUMNS
+        )
+
+    def convertChunk(self, converter, rows):
+        """Convert a chunk of rows
+
+        Args:
+            converter (Converter): converter to use
+            rows (Array): rows of the input
+
+        Returns:
+            Tuple: (output text, number of rows failed, first failure)
+        """
+        out = io.StringIO()
+        writer = csv.writer(out, delimiter=self.delimiter, lineterminator='\n')
+        ti = self.timeIndex
+        zi = self.zoneIndex
+        errors = 0
+        first = None
+        for row in rows:
+            try:
+                result = converter.convert(row[ti], row[zi] if zi is not None else None)
+            except (ValueError, IndexError, OverflowError) as e:
+                result = ("", "")
+                errors += 1
+                first = first or str(e)
+            row.extend(result)
+            writer.writerow(row)
+        return out.getvalue(), errors, first
+
+class JSONLCodec(object):
+    """One JSON object per line, the output objects get the added keys."""
+
+    def __init__(self, timeColumn="timestamp", zoneColumn="zone"):
+        self.timeColumn = timeColumn
+        self.zoneColumn = zoneColumn
+
+    def records(self, fp):
+        return fp
+
+    def writeHeader(self, fp):
+        pass
+
+    def convertChunk(self, converter, lines):
+        """Convert a chunk of lines, see CSVCodec.convertChunk"""
+        out = []
+        errors = 0
+        first = None
+        for line in lines:
+            if not line.strip():
+                continue
+            record = None
+            try:
+                record = json.loads(line)
+                converted, abbr = converter.convert(record[self.timeColumn], record.get(self.zoneColumn))
+            except (ValueError, KeyError, TypeError, AttributeError, OverflowError) as e:
+                if not isinstance(record, dict):
+                    record = {"line": line.rstrip("\n")}
+                converted = abbr = ""
+                errors += 1
+                first = first or "{name}: {e}".format(name=type(e).__name__, e=e)
+            record[OUTPUT_COLUMNS[0]] = converted
+            record[OUTPUT_COLUMNS[1]] = abbr
+            out.append(json.dumps(record, ensure_ascii=False))
+            out.append("\n")
+        return "".join(out), errors, first
+
+# Converter and codec of a worker process, set by initWorker
+worker = None
+
+def initWorker(converter, codec):
+    """Keep the converter of a worker process, sent once per worker"""
+    global worker
+    worker = (converter, codec)
+
+def convertChunk(chunk):
+    """Convert a chunk in a worker process"""
+    converter, codec = worker
+    return codec.convertChunk(converter, chunk)
+
+def chunks(records, size):
+    """Split records into lists of at most size records"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def convertFile(records, fout, codec, converter, chunkSize=10000, jobs=1):
+    """Stream an input through the converter
+
+    Only a bounded number of chunks is held in memory.  With more than one
+    job the chunks are converted in a process pool and written in the
+    order of the input.  The converter and its index are sent to each
+    worker once, only the chunks and their results cross processes after
+    that, so jobs only pay off when converting a chunk costs more than
+    pickling it.
+
+    Args:
+        records (Iterator): records returned by codec.records
+        fout (File): output text stream
+        codec (CSVCodec or JSONLCodec): format of the input and output
+        converter (Converter): converter of this process
+        chunkSize (Int): records per chunk (default: {10000})
+        jobs (Int): number of worker processes (default: {1})
+
+    Returns:
+        Tuple: (records read, records failed, first failure)
+    """
+    codec.writeHeader(fout)
+    total = failed = 0
+    first = None
+
+    def collect(result, size):
+        nonlocal total, failed, first
+        text, errors, error = result
+        fout.write(text)
+        total += size
+        failed += errors
+        first = first or error
+
+    if jobs <= 1:
+        for chunk in chunks(records, chunkSize):
+            collect(codec.convertChunk(converter, chunk), len(chunk))
+        return total, failed, first
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker,
+                             initargs=(converter, codec)) as pool:
+        pending = deque()
+        for chunk in chunks(records, chunkSize):
+            pending.append((pool.submit(convertChunk, chunk), len(chunk)))
+            if len(pending) >= 2 * jobs:
+                future, size = pending.popleft()
+                collect(future.result(), size)
+        while pending:
+            future, size = pending.popleft()
+            collect(future.result(), size)
+    return total, failed, first
+
+def existsError(fpath):
+    """Error for an output that is not to be overwritten"""
+    return click.ClickException("{file} already exists. use '-o' to overwrite".format(file=fpath))
+
+def convert(kwargs):
+    """Convert the timestamps of a CSV or JSON lines file
+
+    The output and the header of the input are checked before the
+    database is read.  The output is written to a temporary file renamed
+    once complete, so a failed run leaves no output behind.
+
+    Args:
+        kwargs (dict): command line arguments parsed by Click library
+
+    Returns:
+        Tuple: (records read, records failed, seconds spent converting)
+
+    Raises:
+        click.ClickException: the output exists and overwrite is not set
+        click.UsageError: the timestamp column is missing from the input
+    """
+    verbose = kwargs["verbose"]
+    fpath = kwargs['output']
+    fmode = 'w' if kwargs['overwrite'] else 'x'
+    if fmode == 'x' and fpath != '-' and os.path.exists(fpath):
+        raise existsError(fpath)
+
+    fmt = kwargs.get('format')
+    if fmt is None:
+        ext = os.path.splitext(kwargs['input'])[1].lower()
+        fmt = "jsonl" if ext in (".jsonl", ".ndjson") else "csv"
+    if fmt == "jsonl":
+        codec = JSONLCodec(kwargs['time_column'], kwargs['zone_column'])
+    else:
+        codec = CSVCodec(kwargs['delimiter'], kwargs['time_column'], kwargs['zone_column'])
+    jobs = kwargs.get('jobs') or 1
+    if kwargs.get('jobs') == 0:
+        jobs = os.cpu_count() or 1
+
+    with click.open_file(kwargs['input'], 'r', encoding="utf-8") as fin:
+        records = codec.records(fin)
+
+        conf = readConf(kwargs)
+        db = loadDB(conf, kwargs['tzdir'], verbose)
+        tconf = conf.get('transitions') or {}
+        start = kwargs.get('start') or tconf.get('start', 1970)
+        end = kwargs.get('end') or tconf.get('end', 2037)
+        pout("Building transitions from {start} to {end}".format(start=start, end=end), verbose, Level.INFO)
+        requireParsedRules(db["rules"])
+        expander = RuleExpander.fromConf(db["rules"], tconf, verbose)
+        table = buildTransitions(db["zinfos"], db["rules"], db["aliases"], start, end, expander)
+        index = TzIndex(table, db["aliases"])
+        target = kwargs.get('to')
+        if target is not None and target not in index:
+            raise click.BadParameter("unknown zone {zone}".format(zone=target), param_hint="'--to'")
+        converter = Converter(index, target)
+
+        wall = time.perf_counter()
+        try:
+            with atomicFile(fpath, fmode, encoding="utf-8") as fout:
+                pout("converting {src} to {dst}".format(src=kwargs['input'], dst=fpath), verbose, Level.INFO)
+                total, failed, first = convertFile(
+                    records, fout, codec, converter, kwargs['chunk_size'], jobs
+                )
+        except FileExistsError:
+            raise existsError(fpath)
+    wall = time.perf_counter() - wall
+    pout("converted {n} rows in {sec:.2f} s ({rate:.0f} rows/s)", verbose, Level.INFO,
+         n=total, sec=wall, rate=total / wall if wall else 0)
+    if failed:
+        pout("{n} rows could not be converted, first: {e}".format(n=failed, e=first), verbose, Level.ERROR)
+    return total, failed, wall
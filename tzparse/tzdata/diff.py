@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""structured diff between two tz database releases"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import csv
+import json
+import os
+
+import click
+
+from tzparse.tzdata.output import atomicFile
+from tzparse.tzdata.tzdata import (
+    pout, Level, readConf, loadDB, zoneRows, ZONE_HEADER, RULE_HEADER
+)
+
+DELTA_HEADER = ["Kind","Name","Change","Old","New"]
+
+# Order of the kinds in the delta
+KINDS = ["zone", "rule", "link", "zonelist"]
+
+def zoneValues(db):
+    """Get the history of every Zone of a database, Links left out
+
+    Args:
+        db (dict): database returned by loadDB
+
+    Returns:
+        Dict: zone name to the rows of its history
+    """
+    zinfos = db["zinfos"]
+    aliases = db["aliases"]
+    return {
+        zone: [list(era) for era in zinfos[zone]["History"]]
+        for zone in zinfos if aliases.get(zone) == zone
+    }
+
+def ruleValues(db):
+    """Group the Rule lines of a database by rule name
+
+    Args:
+        db (dict): database returned by loadDB
+
+    Returns:
+        Dict: rule name to its Rule lines
+    """
+    values = {}
+    for rule in db["rules"]:
+        values.setdefault(rule.name, []).append(list(rule.fields))
+    return values
+
+def linkValues(db):
+    """Get the target of every Link of a database
+
+    Args:
+        db (dict): database returned by loadDB
+
+    Returns:
+        Dict: link name to [[target]]
+    """
+    return {lnk: [[target]] for lnk, target in db["links"].items()}
+
+def zoneListValues(db):
+    """Get the rows of zones.csv of every zone of a database
+
+    Args:
+        db (dict): database returned by loadDB
+
+    Returns:
+        Dict: zone name to its rows of zones.csv
+    """
+    zlist = db["zones"]
+    return {zone: list(zoneRows({zone: zlist[zone]})) for zone in zlist}
+
+VALUES = {
+    "zone": zoneValues,
+    "rule": ruleValues,
+    "link": linkValues,
+    "zonelist": zoneListValues,
+}
+
+def diffValues(kind, old, new):
+    """Compare the values of one kind keyed by name
+
+    Args:
+        kind (Str): kind of the values
+        old (Dict): name to rows in the old release
+        new (Dict): name to rows in the new release
+
+    Yields:
+        Dict: change with Kind, Name, Change, Old and New
+    """
+    for name in sorted(set(old) | set(new)):
+        before = old.get(name)
+        after = new.get(name)
+        if before == after:
+            continue
+        if before is None:
+            change = "added"
+        elif after is None:
+            change = "removed"
+        else:
+            change = "changed"
+        yield {
+            "Kind": kind,
+            "Name": name,
+            "Change": change,
+            "Old": before or [],
+            "New": after or [],
+        }
+
+def diffDB(old, new):
+    """Compute the added, removed and changed entries between two databases
+
+    Zones, Rules (grouped by name) and Links are compared as written in
+    the tzdata files.  zonelist holds the zones whose rows of zones.csv
+    changed, which also covers changes of zone1970.tab and iso3166.tab.
+
+    Args:
+        old (dict): database returned by loadDB for the old release
+        new (dict): database returned by loadDB for the new release
+
+    Returns:
+        Array: changes ordered by kind and name
+    """
+    delta = []
+    for kind in KINDS:
+        delta.extend(diffValues(kind, VALUES[kind](old), VALUES[kind](new)))
+    return delta
+
+def formatRows(rows):
+    """Format the rows of a change for a single CSV column
+
+    Args:
+        rows (Array): rows of a value
+
+    Returns:
+        Str: non empty fields joined by spaces and rows by '; '
+    """
+    return "; ".join(" ".join(field for field in row if field) for row in rows)
+
+def writeDelta(fp, delta, fmt="csv"):
+    """Write the changes as tab separated CSV or as JSON
+
+    Args:
+        fp (File): text stream to write to
+        delta (Array): changes returned by diffDB
+        fmt (Str): 'csv' or 'json' (default: {'csv'})
+    """
+    if fmt == "json":
+        # One change per line keeps the delta compact and easy to grep
+        fp.write("[\n")
+        fp.write(",\n".join(json.dumps(change, ensure_ascii=False) for change in delta))
+        fp.write("\n]\n")
+        return
+    writer = csv.writer(fp, delimiter='\t', lineterminator='\n')
+    writer.writerow(DELTA_HEADER)
+    for change in delta:
+        writer.writerow([
+            change["Kind"], change["Name"], change["Change"],
+            formatRows(change["Old"]), formatRows(change["New"])
+        ])
+
+def patchCSV(fpath, header, key, changes):
+    """Patch a CSV output in place with changed rows
+
+    The rows of a changed name replace its old rows where they were, rows
+    of removed names are dropped and rows of added names are appended.
+    The file is replaced atomically.
+
+    Args:
+        fpath (Str): tab separated CSV written by parse
+        header (Array): header row of the file
+        key (Int): column holding the name
+        changes (Dict): name to its new rows, empty for removed names
+
+    Returns:
+        Int: number of names patched
+    """
+    with open(fpath, 'r', encoding="utf-8", newline='') as fp:
+        rows = list(csv.reader(fp, delimiter='\t'))
+    with atomicFile(fpath, 'w', encoding="utf-8") as out:
+        writer = csv.writer(out, delimiter='\t', lineterminator='\n')
+        writer.writerow(header)
+        done = set()
+        for row in rows[1:]:
+            name = row[key] if len(row) > key else None
+            if name not in changes:
+                writer.writerow(row)
+            elif name not in done:
+                writer.writerows(changes[name])
+                done.add(name)
+        for name in changes:
+            if name not in done:
+                writer.writerows(changes[name])
+    return len(changes)
+
+def patchOutputs(conf, delta, verbose):
+    """Patch the zones and rules CSV outputs named in the config
+
+    Args:
+        conf (dict): configuration returned by readConf
+        delta (Array): changes returned by diffDB
+        verbose (Int): verbosity mode
+    """
+    targets = [
+        ("zonelist", conf['output']['zonecsv'], ZONE_HEADER, 1),
+        ("rule", conf['output']['rulescsv'], RULE_HEADER, 0),
+    ]
+    for kind, fpath, header, key in targets:
+        changes = {
+            change["Name"]: change["New"] for change in delta if change["Kind"] == kind
+        }
+        try:
+            count = patchCSV(fpath, header, key, changes)
+            pout("patched {n} entries of {file}".format(n=count, file=fpath), verbose, Level.INFO)
+        except OSError as e:
+            pout("Failed to patch {file}: {e}".format(file=fpath, e=e), verbose, Level.ERROR)
+
+def existsError(fpath):
+    """Error for a delta file that is not to be overwritten"""
+    return click.ClickException("{file} already exists. use '-o' to overwrite".format(file=fpath))
+
+def diff(kwargs):
+    """Compare two tz database releases and emit the changes
+
+    Args:
+        kwargs (dict): command line arguments parsed by Click library
+
+    Returns:
+        Array: changes returned by diffDB
+    """
+    verbose = kwargs["verbose"]
+    fpath = kwargs['output'] or "delta.{ext}".format(ext=kwargs['format'])
+    fmode = 'w' if kwargs.get('overwrite') else 'x'
+    # Fail before reading the releases, the file is checked again when written
+    if fmode == 'x' and fpath != '-' and os.path.exists(fpath):
+        raise existsError(fpath)
+    conf = readConf(kwargs)
+    # Files with the same contents in both releases are parsed once
+    memo = {}
+    pout("Reading old release: {dir}".format(dir=kwargs['old']), verbose, Level.INFO)
+    old = loadDB(conf, kwargs['old'], verbose, memo)
+    pout("Reading new release: {dir}".format(dir=kwargs['new']), verbose, Level.INFO)
+    new = loadDB(conf, kwargs['new'], verbose, memo)
+    delta = diffDB(old, new)
+    pout("{n} changes".format(n=len(delta)), verbose, Level.INFO)
+
+    pout("writing {file}".format(file=fpath), verbose, Level.INFO)
+    try:
+        with atomicFile(fpath, fmode, encoding="utf-8") as fp:
+            writeDelta(fp, delta, kwargs['format'])
+    except FileExistsError:
+        raise existsError(fpath)
+    if kwargs['patch']:
+        patchOutputs(conf, delta, verbose)
+    return delta
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""country and coordinate indexes of the zone list"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import heapq
+import math
+
+EARTH_RADIUS = 6371.0088 # mean radius in km
+
+def parseCoord(coord):
+    """Decode an ISO 6709 coordinate of the zone1970.tab file
+
+    The latitude is given as +-DDMM or +-DDMMSS and the longitude as
+    +-DDDMM or +-DDDMMSS.
+
+    Args:
+        coord (Str): coordinate such as '+3541+13946'
+
+    Returns:
+        Tuple: (latitude, longitude) in degrees, north and east positive
+
+    Raises:
+        ValueError: malformed coordinate
+    """
+    i = max(coord.rfind('+'), coord.rfind('-'))
+    lat, lon = coord[:i], coord[i:]
+    if i < 1 or (len(lat), len(lon)) not in ((5, 6), (7, 8)) or lat[0] not in '+-':
+        raise ValueError("malformed coordinate: {c}".format(c=coord))
+    return (parseAngle(lat, 2), parseAngle(lon, 3))
+
+def parseAngle(value, width):
+    """Decode the sign, degrees, minutes and seconds of an angle
+
+    Args:
+        value (Str): signed angle such as '+13946' or '-0581230'
+        width (Int): number of digits of the degrees
+
+    Returns:
+        Float: angle in degrees
+    """
+    digits = value[1:]
+    if not digits.isdigit():
+        raise ValueError("malformed angle: {v}".format(v=value))
+    angle = int(digits[:width]) + int(digits[width:width+2]) / 60
+    if len(digits) > width + 2:
+        angle += int(digits[width+2:]) / 3600
+    return -angle if value[0] == '-' else angle
+
+def countryIndex(zlist):
+    """Invert the zone list into the zones of every country
+
+    Args:
+        zlist (dict): zone list from getZones
+
+    Returns:
+        Dict: iso3166 code to the zone names in the order of zone1970.tab
+    """
+    index = {}
+    for zone, info in zlist.items():
+        for code in info["Codes"]:
+            index.setdefault(code, []).append(zone)
+    return index
+
+def toVector(lat, lon):
+    """Project a coordinate to a point on the unit sphere
+
+    Args:
+        lat (Float): latitude in degrees
+        lon (Float): longitude in degrees
+
+    Returns:
+        Tuple: (x, y, z)
+    """
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+def chordToKm(chord2):
+    """Convert a squared chord of the unit sphere to a great circle distance
+
+    Args:
+        chord2 (Float): squared straight line distance between two points
+
+    Returns:
+        Float: distance in km
+    """
+    return 2 * math.asin(min(1.0, math.sqrt(chord2) / 2)) * EARTH_RADIUS
+
+class ZoneLocator(object):
+    """Nearest zone queries over a k-d tree of the zone coordinates.
+
+    Coordinates are projected to points on the unit sphere, so the straight
+    line distance orders the zones like the great circle distance does and
+    the antimeridian and the poles need no special handling.  The tree is
+    kept implicitly in one list: the zone at the middle of a range splits it
+    along the axis stored for it, the lower half of the range holding the
+    left subtree and the upper half the right one.
+    """
+
+    def __init__(self, points):
+        """Build the tree
+
+        Args:
+            points (Dict): zone name to (latitude, longitude) in degrees
+        """
+        self.names = []
+        self.coords = []
+        self.points = []
+        for name, (lat, lon) in points.items():
+            self.names.append(name)
+            self.coords.append((lat, lon))
+            self.points.append(toVector(lat, lon))
+        self.order = list(range(len(self.names)))
+        self.axes = [0] * len(self.names)
+        self.build(0, len(self.order))
+
+    @classmethod
+    def fromZones(cls, zlist):
+        """Build the locator from the zone list, zones without a
+        coordinate left out
+
+        Args:
+            zlist (dict): zone list from getZones
+
+        Returns:
+            ZoneLocator: the locator
+        """
+        return cls({
+            zone: (info["Latitude"], info["Longitude"])
+            for zone, info in zlist.items() if info.get("Latitude") is not None
+        })
+
+    def __len__(self):
+        return len(self.names)
+
+    def build(self, lo, hi):
+        """Arrange order[lo:hi] as a subtree, split on the widest axis"""
+        while hi - lo > 1:
+            ids = self.order[lo:hi]
+            spread = [
+                max(self.points[i][axis] for i in ids) - min(self.points[i][axis] for i in ids)
+                for axis in range(3)
+            ]
+            axis = spread.index(max(spread))
+            ids.sort(key=lambda i: self.points[i][axis])
+            self.order[lo:hi] = ids
+            mid = (lo + hi) // 2
+            self.axes[mid] = axis
+            self.build(lo, mid)
+            lo = mid + 1
+
+    def nearest(self, lat, lon, k=1):
+        """Find the zones closest to a coordinate
+
+        Args:
+            lat (Float): latitude in degrees
+            lon (Float): longitude in degrees
+            k (Int): number of zones to return (default: {1})
+
+        Returns:
+            Array: (zone name, distance in km) pairs, closest first
+        """
+        target = toVector(lat, lon)
+        best = [] # max heap of (-chord2, id) holding the k closest so far
+        self.search(0, len(self.order), target, k, best)
+        best.sort(reverse=True)
+        return [(self.names[i], chordToKm(-d)) for d, i in best]
+
+    def search(self, lo, hi, target, k, best):
+        """Collect the k closest points of order[lo:hi] into best"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = self.order[mid]
+            p = self.points[i]
+            d = (p[0]-target[0])**2 + (p[1]-target[1])**2 + (p[2]-target[2])**2
+            if len(best) < k:
+                heapq.heappush(best, (-d, i))
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, (-d, i))
+            axis = self.axes[mid]
+            delta = target[axis] - p[axis]
+            if delta < 0:
+                near, far = (lo, mid), (mid + 1, hi)
+            else:
+                near, far = (mid + 1, hi), (lo, mid)
+            self.search(near[0], near[1], target, k, best)
+            # visit the other side only if the splitting plane is closer
+            # than the worst point kept
+            if len(best) == k and delta * delta >= -best[0][0]:
+                return
+            lo, hi = far
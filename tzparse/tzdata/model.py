@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""record types of the parsed tz database"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from sys import intern
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+# AT and UNTIL time kinds
+WALL = "w"
+STANDARD = "s"
+UTC = "u"
+
+# FROM year of 'min'
+YEAR_MIN = -(1 << 31)
+
+class ZoneEra(namedtuple('ZoneEra', ['stdoff', 'rules', 'format', 'until'])):
+    """Single line of a Zone entry.
+
+    until is the UNTIL column joined by single spaces, and empty for the
+    last (current) line of the zone.  The columns are interned, as the same
+    offsets, rule names and formats recur over the whole database.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def fromFields(cls, fields):
+        """Create an era from the fields of a Zone line
+
+        Args:
+            fields (Array): [STDOFF, RULES, FORMAT, UNTIL...]
+
+        Returns:
+            ZoneEra: the era
+        """
+        return cls(
+            intern(fields[0]),
+            intern(fields[1]) if len(fields) > 1 else '-',
+            intern(fields[2]) if len(fields) > 2 else '',
+            intern(' '.join(fields[3:]))
+        )
+
+class DaySpec(namedtuple('DaySpec', ['kind', 'weekday', 'day'])):
+    """ON column of a Rule line.
+
+    kind is 'day' for a fixed day, 'last' for the last weekday of the
+    month, '>=' or '<=' for the first weekday on or after, or on or before,
+    day.  weekday is 0 for Monday to 6 for Sunday, None for a fixed day,
+    and day is None for 'last'.
+    """
+    __slots__ = ()
+
+class Rule(namedtuple('Rule', [
+        'name', 'first', 'last', 'month', 'on', 'at', 'atKind', 'save', 'isdst', 'letters', 'fields'
+    ])):
+    """Single Rule line with its columns parsed.
+
+    first and last are years, first being YEAR_MIN for 'min' and last None
+    for 'max'.  month is 1-12, on a DaySpec, at and save are seconds and
+    atKind is WALL, STANDARD or UTC.  fields holds the columns as written,
+    which is what the outputs show.  The columns are interned and the parsed
+    values shared between the lines, see the parse functions.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def fromFields(cls, fields):
+        """Create a rule from the fields of a Rule line
+
+        Args:
+            fields (Array): [NAME, FROM, TO, TYPE, IN, ON, AT, SAVE, LETTER/S...]
+
+        Returns:
+            Rule: the rule
+
+        Raises:
+            ValueError: malformed column
+        """
+        fields = tuple(map(intern, fields))
+        try:
+            name, first, last, _type, month, on, at, save, letters = fields[:9]
+            first = parseYear(first, None)
+            atSeconds, atKind = parseTime(at)
+            saveSeconds, isdst = parseSave(save)
+            return cls(
+                name, first, parseYear(last, first), parseMonth(month), parseOn(on),
+                atSeconds, atKind, saveSeconds, isdst, letters, fields
+            )
+        except (KeyError, ValueError):
+            raise ValueError("malformed Rule line: {line}".format(line=" ".join(fields)))
+
+    @classmethod
+    def unparsed(cls, fields):
+        """Keep a malformed Rule line as written, with no parsed columns
+
+        The outputs showing the columns as written still hold the line, the
+        consumers of the parsed columns must check parsed first.
+
+        Args:
+            fields (Array): [NAME, ...] columns of the line
+
+        Returns:
+            Rule: the rule, every parsed column None
+        """
+        fields = tuple(map(intern, fields))
+        return cls(fields[0], *([None] * 9), fields)
+
+    @property
+    def parsed(self):
+        """False for a malformed line kept by unparsed"""
+        return self.month is not None
+
+class RuleSet(object):
+    """Rule lines sharing a name, sorted by FROM year and month.
+
+    The lines in effect only change at a FROM year or the year after a TO
+    year.  starts holds these years in order and segments the lines in
+    effect from each of them to the next, so the lines of a year are found
+    by a single bisection.
+    """
+    __slots__ = ('name', 'rules', 'starts', 'segments')
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = tuple(sorted(rules, key=lambda rule: (rule.first, rule.month)))
+        firsts = [rule.first for rule in self.rules]
+        starts = set(firsts)
+        starts.update([rule.last + 1 for rule in self.rules if rule.last is not None])
+        self.starts = sorted(starts)
+        self.segments = []
+        current = ()
+        begun = 0
+        for year in self.starts:
+            # the lines beginning this year come after those in effect
+            end = bisect_right(firsts, year)
+            current = tuple([rule for rule in current if rule.last is None or year <= rule.last]) + self.rules[begun:end]
+            begun = end
+            self.segments.append(current)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def active(self, year):
+        """Get the lines in effect in a year
+
+        Args:
+            year (Int): year
+
+        Returns:
+            Tuple: rules with FROM <= year <= TO, sorted by FROM and month
+        """
+        i = bisect_right(self.starts, year) - 1
+        return self.segments[i] if i >= 0 else ()
+
+    def firstYear(self):
+        """Get the earliest FROM year of the lines"""
+        return self.rules[0].first
+
+def groupRules(rules):
+    """Group rules by name
+
+    Args:
+        rules (Array): Rule records
+
+    Returns:
+        Dict: rule name to RuleSet
+
+    Raises:
+        ValueError: a Rule line is malformed
+    """
+    grouped = {}
+    for rule in rules:
+        if not rule.parsed:
+            raise ValueError("malformed Rule line: {line}".format(line=" ".join(rule.fields)))
+        grouped.setdefault(rule.name, []).append(rule)
+    return {name: RuleSet(name, lines) for name, lines in grouped.items()}
+
+# The parse functions are memoised: a column takes few distinct values over
+# the database, so the caches stay small and the lines share the parsed
+# values instead of holding a copy each.
+
+@lru_cache(maxsize=None)
+def parseOffset(text):
+    """Parse [-]h[:mm[:ss]] into seconds, '-' being zero
+
+    Args:
+        text (Str): offset or time of day
+
+    Returns:
+        Int: seconds
+    """
+    if text == "-":
+        return 0
+    sign = 1
+    if text[:1] == "-":
+        sign = -1
+        text = text[1:]
+    seconds = 0
+    for part, scale in zip(text.split(":"), (3600, 60, 1)):
+        if "." in part:
+            part = part.split(".")[0]
+        seconds += int(part or 0) * scale
+    return sign * seconds
+
+@lru_cache(maxsize=None)
+def parseTime(text):
+    """Parse an AT or UNTIL time with its w/s/u suffix
+
+    Args:
+        text (Str): time such as 2:00, 1:00u or 2:00s
+
+    Returns:
+        Tuple: (seconds, kind)
+    """
+    kind = WALL
+    suffix = text[-1:].lower()
+    if suffix in ("w", "s", "u", "g", "z"):
+        text = text[:-1]
+        kind = UTC if suffix in ("u", "g", "z") else suffix
+    return parseOffset(text), kind
+
+@lru_cache(maxsize=None)
+def parseSave(text):
+    """Parse a SAVE column with its optional s/d suffix
+
+    Args:
+        text (Str): amount of saved time
+
+    Returns:
+        Tuple: (seconds, isdst)
+    """
+    suffix = text[-1:].lower()
+    if suffix in ("s", "d"):
+        return parseOffset(text[:-1]), suffix == "d"
+    save = parseOffset(text)
+    return save, save != 0
+
+def parseMonth(text):
+    """Parse a month name
+
+    Args:
+        text (Str): month name or abbreviation
+
+    Returns:
+        Int: month 1-12
+    """
+    return MONTHS[text[:3].lower()]
+
+@lru_cache(maxsize=None)
+def parseYear(text, default):
+    """Parse a FROM or TO column
+
+    Args:
+        text (Str): year, 'only', 'min' or 'max'
+        default (Int): year returned for 'only'
+
+    Returns:
+        Int: year, None for max
+    """
+    word = text.lower()
+    if word.startswith("o"):
+        return default
+    if word.startswith("ma"):
+        return None
+    if word.startswith("mi"):
+        return YEAR_MIN
+    return int(text)
+
+@lru_cache(maxsize=None)
+def parseOn(text):
+    """Parse an ON column
+
+    Args:
+        text (Str): 15, lastSun, Sun>=8 or Sun<=25
+
+    Returns:
+        DaySpec: the day
+    """
+    if text[:4] == "last":
+        return DaySpec("last", WEEKDAYS[text[4:7].lower()], None)
+    for op in (">=", "<="):
+        if op in text:
+            name, day = text.split(op)
+            return DaySpec(op, WEEKDAYS[name[:3].lower()], int(day))
+    return DaySpec("day", None, int(text))
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""registry of the outputs, written atomically and concurrently"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager, suppress
+
+import click
+
+# Write buffer of the output files
+BUFFER_SIZE = 1 << 20
+
+Sink = namedtuple('Sink', ['name', 'path', 'write'])
+Sink.__doc__ = """Output written by writeSinks.
+
+write is called without arguments, writes the whole output to path and
+returns the record counts reported in the statistics, e.g. a
+functools.partial of a registered writer.
+"""
+
+Writer = namedtuple('Writer', ['name', 'write', 'needs', 'options'])
+Writer.__doc__ = """Output registered by registerWriter.
+
+write(fpath, fmode, data) writes the output from an OutputData and
+returns its record counts.  needs holds 'history' when the output uses
+the history rows and 'transitions' when it uses the transition table.
+options are the other keys of the output section the writer reads.
+"""
+
+OutputData = namedtuple('OutputData', ['db', 'rows', 'table', 'options'])
+OutputData.__doc__ = """Everything the writers are built from.
+
+db is the database returned by loadDB, rows the rows shared by the
+outputs (see tzdata.outputRows), table the transition table or None and
+options the output section of the config.
+"""
+
+# Writers by the name of the output in the config, in registration order
+WRITERS = {}
+
+def registerWriter(name, needs=(), options=()):
+    """Register the decorated function as the writer of an output
+
+    The output is written when the output section of the config, or the
+    --output option, gives a file for name.
+
+    Args:
+        name (Str): name of the output
+        needs (Tuple): 'history' and/or 'transitions' (default: {()})
+        options (Tuple): other keys of the output section read by the writer (default: {()})
+
+    Returns:
+        Callable: decorator
+    """
+    def register(write):
+        WRITERS[name] = Writer(name, write, frozenset(needs), tuple(options))
+        return write
+    return register
+
+def unknownOutputs(options):
+    """Get the keys of an output section naming no writer or option
+
+    Args:
+        options (Dict): output section of the config
+
+    Returns:
+        Array: unknown keys
+    """
+    known = set(WRITERS)
+    for writer in WRITERS.values():
+        known.update(writer.options)
+    return [key for key in options if key not in known]
+
+def writeNDJSON(fpath, fmode, tables):
+    """Write tables as newline delimited JSON, one object per row
+
+    Each object holds the columns of the row by their header, and the name
+    of its table as 'table'.  The rows are serialised one by one as they
+    come, so the output can be consumed in chunks.
+
+    Args:
+        fpath (Str): output file
+        fmode (Str): 'w' to overwrite or 'x' to fail on an existing file
+        tables (Iterable): (name, header, rows) of each table
+
+    Returns:
+        Dict: number of rows of each table
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    counts = {}
+    with atomicFile(fpath, fmode, encoding="utf-8") as fp:
+        for name, header, rows in tables:
+            counts[name] = 0
+            for row in rows:
+                record = {"table": name}
+                record.update(zip(header, row))
+                fp.write(encode(record))
+                fp.write("\n")
+                counts[name] += 1
+    return counts
+
+def writeJSON(fpath, fmode, tables):
+    """Write tables as a JSON object holding an array of rows per table
+
+    The rows are objects holding the columns by their header, like the
+    JSON export of the server.  They are serialised one by one as they
+    come rather than building the whole document first.
+
+    Args:
+        fpath (Str): output file
+        fmode (Str): 'w' to overwrite or 'x' to fail on an existing file
+        tables (Iterable): (name, header, rows) of each table
+
+    Returns:
+        Dict: number of rows of each table
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    counts = {}
+    with atomicFile(fpath, fmode, encoding="utf-8") as fp:
+        fp.write("{")
+        for name, header, rows in tables:
+            fp.write(",\n" if counts else "\n")
+            fp.write(encode(name))
+            fp.write(": [")
+            counts[name] = 0
+            for row in rows:
+                fp.write(",\n" if counts[name] else "\n")
+                fp.write(encode(dict(zip(header, row))))
+                counts[name] += 1
+            fp.write("\n]" if counts[name] else "]")
+        fp.write("\n}\n")
+    return counts
+
+@contextmanager
+def atomicFile(fpath, mode="w", encoding=None):
+    """Open a temporary file next to fpath, renamed to fpath once written
+
+    Readers never see a partly written output, and fpath is left as it was
+    when writing fails.  '-' writes to stdout instead.
+
+    Args:
+        fpath (Str): output file
+        mode (Str): 'w' to overwrite or 'x' to fail on an existing file,
+            with 'b' for a binary file (default: {'w'})
+        encoding (Str): encoding of a text file (default: {None})
+
+    Yields:
+        File: buffered file to write to
+
+    Raises:
+        FileExistsError: fpath exists and mode is 'x'
+    """
+    binary = "b" in mode
+    if fpath == "-":
+        yield click.get_binary_stream("stdout") if binary else click.get_text_stream("stdout")
+        return
+    exclusive = "x" in mode
+    if exclusive and os.path.exists(fpath):
+        raise FileExistsError(fpath)
+    dirname, basename = os.path.split(os.path.abspath(fpath))
+    tmp = os.path.join(dirname, ".{name}.{pid}.{tid}.tmp".format(
+        name=basename, pid=os.getpid(), tid=threading.get_ident()
+    ))
+    try:
+        with open(tmp, "wb" if binary else "w", buffering=BUFFER_SIZE, encoding=encoding) as fp:
+            yield fp
+        if exclusive and os.path.exists(fpath):
+            raise FileExistsError(fpath)
+        os.replace(tmp, fpath)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp)
+        raise
+
+def writeSink(sink):
+    """Write a sink, catching its error
+
+    Args:
+        sink (Sink): output to write
+
+    Returns:
+        Tuple: (record counts, wall seconds, cpu seconds of the calling
+            thread, exception or None)
+    """
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    counts = error = None
+    try:
+        counts = sink.write()
+    except Exception as e:
+        error = e
+    return counts, time.perf_counter() - wall, time.thread_time() - cpu, error
+
+# Sinks of a worker process, set by initWriter
+sinks = None
+
+def initWriter(allSinks):
+    """Keep the sinks in a worker process, inherited rather than sent with
+    each task where processes are forked"""
+    global sinks
+    sinks = allSinks
+
+def writeSinkAt(index):
+    """Write a sink in a worker process"""
+    return writeSink(sinks[index])
+
+def writeSinks(allSinks, jobs=1):
+    """Write the sinks concurrently, in a thread each or, when jobs is
+    larger than 1, in a process pool
+
+    The outputs share nothing but the rows they are built from and only
+    read them.  Threads overlap the file writes and need no copy of the
+    rows, but the formatting of the rows still holds the interpreter lock,
+    so only processes run it on several cores, at the cost of sending the
+    rows to each of them where processes are not forked.
+
+    Args:
+        allSinks (Array): Sink of each output
+        jobs (Int): number of worker processes, 0 for one per CPU and 1
+            for threads (default: {1})
+
+    Yields:
+        Tuple: (sink, record counts, wall seconds, cpu seconds, exception
+            or None) as each sink is done
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if len(allSinks) < 2:
+        for sink in allSinks:
+            yield (sink,) + writeSink(sink)
+        return
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    if jobs <= 1:
+        pool = ThreadPoolExecutor(max_workers=len(allSinks))
+        futures = {pool.submit(writeSink, sink): sink for sink in allSinks}
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(jobs, len(allSinks)), initializer=initWriter,
+                                   initargs=(allSinks,))
+        futures = {pool.submit(writeSinkAt, i): sink for i, sink in enumerate(allSinks)}
+    with pool:
+        for future in as_completed(futures):
+            try:
+                yield (futures[future],) + future.result()
+            except Exception as e:
+                # e.g. the result could not be sent back
+                yield futures[future], None, 0.0, 0.0, e
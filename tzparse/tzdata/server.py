@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""serve the parsed tz database over HTTP"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# The server speaks a small subset of HTTP/1.1 (GET and HEAD, one request
+# per connection) on a localhost TCP port or on a Unix socket:
+#
+#   GET /status                    dataset version and load time
+#   GET /zones                     names of all zones and links
+#   GET /zones/<name>              a zone or link with its history
+#   GET /countries/<code or name>  zones used in a country
+#   GET /nearest/<lat>,<lon>       zone closest to a coordinate
+#   GET /rules                     names of all rule sets
+#   GET /rules/<name>              Rule lines of a rule set
+#   GET /export/<zones|rules>.<csv|json>
+
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from urllib.parse import unquote, urlsplit
+
+from tzparse.tzdata.geo import ZoneLocator
+from tzparse.tzdata.source import isArchive
+from tzparse.tzdata.tzdata import (
+    pout, Level, readConf, loadDB, zoneRows, ruleRows, ZONE_HEADER, RULE_HEADER
+)
+from tzparse.version import __version__
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+    414: "URI Too Long", 500: "Internal Server Error",
+}
+
+# Seconds a client may take to send each line of its request
+REQUEST_TIMEOUT = 10.0
+
+class NotFound(Exception):
+    """Raised by the queries for unknown names."""
+
+class BadRequest(Exception):
+    """Raised for requests that cannot be read, status being the answer."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Dataset(object):
+    """Immutable snapshot of a parsed database answering the queries.
+
+    The server swaps whole snapshots on reload, so a request keeps the
+    snapshot it started with.
+    """
+
+    def __init__(self, db, version):
+        """Index a database returned by loadDB
+
+        Args:
+            db (dict): database returned by loadDB
+            version (Int): sequence number of the snapshot
+        """
+        self.db = db
+        self.version = version
+        self.loaded = time.time()
+        self.ruleSets = {}
+        for rule in db["rules"]:
+            self.ruleSets.setdefault(rule.name, []).append(rule.fields)
+        self.codes = {name: code for code, name in db["countries"].items()}
+        self.locator = ZoneLocator.fromZones(db["zones"])
+
+    def status(self):
+        """Describe the snapshot
+
+        Returns:
+            Dict: version, load time and number of entries
+        """
+        return {
+            "tzparse": __version__,
+            "version": self.version,
+            "loaded": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.loaded)),
+            "zones": len(self.db["zinfos"]),
+            "rules": len(self.db["rules"]),
+            "countries": len(self.db["countries"]),
+        }
+
+    def zoneNames(self):
+        """Get the names of all zones and links
+
+        Returns:
+            Array: sorted names
+        """
+        return sorted(self.db["zinfos"])
+
+    def zone(self, name):
+        """Look up a zone or link
+
+        Args:
+            name (Str): zone or link name
+
+        Returns:
+            Dict: zone information with its history
+
+        Raises:
+            NotFound: unknown name
+        """
+        zinfos = self.db["zinfos"]
+        if name not in zinfos:
+            raise NotFound("zone {name}".format(name=name))
+        zinfo = zinfos[name]
+        canonical = self.db["aliases"].get(name, name)
+        entry = {
+            "name": name,
+            "zone": canonical,
+            "STDOFF": zinfo["STDOFF"],
+            "Rule": zinfo["Rule"],
+            "History": [era._asdict() for era in zinfo["History"]],
+        }
+        listed = self.db["zones"].get(canonical)
+        if listed is not None:
+            entry.update(
+                countries=listed["Countries"], coordinate=listed["Coord"], comment=listed["Comment"],
+                latitude=listed["Latitude"], longitude=listed["Longitude"]
+            )
+        return entry
+
+    def country(self, key):
+        """Look up the zones of a country
+
+        Args:
+            key (Str): iso3166 code or country name
+
+        Returns:
+            Dict: country code, name and zones
+
+        Raises:
+            NotFound: unknown country
+        """
+        countries = self.db["countries"]
+        if key.upper() in countries:
+            code = key.upper()
+            name = countries[code]
+        elif key in self.codes:
+            code = self.codes[key]
+            name = key
+        else:
+            raise NotFound("country {key}".format(key=key))
+        return {"code": code, "name": name, "zones": self.db["countryZones"].get(code, [])}
+
+    def nearest(self, coord):
+        """Look up the zone closest to a coordinate
+
+        Args:
+            coord (Str): '<latitude>,<longitude>' in degrees
+
+        Returns:
+            Dict: zone name and distance in km
+
+        Raises:
+            NotFound: malformed coordinate or empty zone list
+        """
+        try:
+            lat, lon = (float(v) for v in coord.split(","))
+        except ValueError:
+            raise NotFound("coordinate {coord}".format(coord=coord))
+        found = self.locator.nearest(lat, lon)
+        if not found:
+            raise NotFound("coordinate {coord}".format(coord=coord))
+        zone, km = found[0]
+        return {"zone": zone, "distance": round(km, 1)}
+
+    def ruleNames(self):
+        """Get the names of all rule sets
+
+        Returns:
+            Array: sorted names
+        """
+        return sorted(self.ruleSets)
+
+    def rules(self, name):
+        """Look up a rule set
+
+        Args:
+            name (Str): rule name
+
+        Returns:
+            Array: Rule lines of the rule set
+
+        Raises:
+            NotFound: unknown rule set
+        """
+        if name not in self.ruleSets:
+            raise NotFound("rule {name}".format(name=name))
+        return self.ruleSets[name]
+
+    def export(self, name):
+        """Export the zone list or the rules like the CSV outputs
+
+        Args:
+            name (Str): zones.csv, zones.json, rules.csv or rules.json
+
+        Returns:
+            Tuple: (content type, body bytes)
+
+        Raises:
+            NotFound: unknown export
+        """
+        what, _, fmt = name.partition(".")
+        if what == "zones":
+            header, rows = ZONE_HEADER, zoneRows(self.db["zones"])
+        elif what == "rules":
+            header, rows = RULE_HEADER, ruleRows(self.db["rules"])
+        else:
+            raise NotFound("export {name}".format(name=name))
+        if fmt == "csv":
+            out = io.StringIO()
+            writer = csv.writer(out, delimiter='\t', lineterminator='\n')
+            writer.writerow(header)
+            writer.writerows(rows)
+            return "text/tab-separated-values; charset=utf-8", out.getvalue().encode("utf-8")
+        if fmt == "json":
+            body = json.dumps([dict(zip(header, row)) for row in rows], ensure_ascii=False)
+            return "application/json", body.encode("utf-8")
+        raise NotFound("export {name}".format(name=name))
+
+def route(dataset, path):
+    """Answer a request path from a snapshot
+
+    Args:
+        dataset (Dataset): snapshot to query
+        path (Str): decoded request path
+
+    Returns:
+        Tuple: (content type, body bytes)
+
+    Raises:
+        NotFound: unknown path or name
+    """
+    parts = path.strip("/").split("/", 1)
+    head = parts[0]
+    rest = parts[1] if len(parts) > 1 else ""
+    if head == "status" and not rest:
+        result = dataset.status()
+    elif head == "zones":
+        result = dataset.zone(rest) if rest else dataset.zoneNames()
+    elif head == "countries" and rest:
+        result = dataset.country(rest)
+    elif head == "nearest" and rest:
+        result = dataset.nearest(rest)
+    elif head == "rules":
+        result = dataset.rules(rest) if rest else dataset.ruleNames()
+    elif head == "export" and rest:
+        return dataset.export(rest)
+    else:
+        raise NotFound(path)
+    return "application/json", json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+class Server(object):
+    """Serve a tz database and reload it when its files change."""
+
+    def __init__(self, conf, tzdir, verbose, interval=2.0, timeout=REQUEST_TIMEOUT):
+        """Prepare the server, the database is loaded by start
+
+        Args:
+            conf (dict): configuration returned by readConf
+            tzdir (Str): directory or release archive of the database
+            verbose (Int): verbosity mode
+            interval (Float): seconds between checks of the files (default: {2.0})
+            timeout (Float): seconds to read each line of a request (default: {REQUEST_TIMEOUT})
+        """
+        self.conf = conf
+        self.tzdir = tzdir
+        self.verbose = verbose
+        self.interval = interval
+        self.timeout = timeout
+        self.memo = Memo()
+        self.dataset = None
+        self.signature = None
+
+    def inputs(self):
+        """Get the files the database is read from
+
+        Returns:
+            Array: file paths
+        """
+        if isArchive(self.tzdir):
+            return [self.tzdir]
+        names = [self.conf['countrylist'], self.conf['zones']] + self.conf['tzdata']
+        return [os.path.join(self.tzdir, name) for name in names]
+
+    def stat(self):
+        """Get the size and mtime of the input files
+
+        Returns:
+            Tuple: (path, size, mtime) per file, None for missing files
+        """
+        result = []
+        for fpath in self.inputs():
+            try:
+                st = os.stat(fpath)
+                result.append((fpath, st.st_size, st.st_mtime_ns))
+            except OSError:
+                result.append((fpath, None, None))
+        return tuple(result)
+
+    def load(self):
+        """Parse the database into a new snapshot
+
+        Files whose contents did not change since the last load are not
+        parsed again.
+
+        Returns:
+            Dataset: the snapshot
+        """
+        signature = self.stat()
+        db = loadDB(self.conf, self.tzdir, self.verbose, self.memo)
+        self.memo.prune()
+        version = 1 if self.dataset is None else self.dataset.version + 1
+        self.signature = signature
+        return Dataset(db, version)
+
+    async def reload(self):
+        """Reload the database when its files changed since the last load
+
+        The new snapshot is built in a worker thread and swapped in as a
+        whole.  The old snapshot is kept when the new one fails to load.
+        """
+        if self.stat() == self.signature:
+            return
+        pout("reloading {dir}".format(dir=self.tzdir), self.verbose, Level.INFO)
+        loop = asyncio.get_event_loop()
+        try:
+            dataset = await loop.run_in_executor(None, self.load)
+        except Exception as e:
+            # Do not retry until the files change again
+            self.signature = self.stat()
+            pout("reload failed, keeping version {v}: {e}".format(v=self.dataset.version, e=e), self.verbose, Level.ERROR)
+            return
+        self.dataset = dataset
+        pout("serving version {v}".format(v=dataset.version), self.verbose, Level.INFO)
+
+    async def watch(self):
+        """Check the files for changes every interval seconds"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reload()
+
+    async def readLine(self, reader, status):
+        """Read a line of a request within the timeout
+
+        Args:
+            reader (StreamReader): request stream
+            status (Int): answer to a line over the limit of the reader
+
+        Returns:
+            Bytes: the line, empty at the end of the stream
+
+        Raises:
+            BadRequest: line too long, or not received within the timeout
+        """
+        try:
+            return await asyncio.wait_for(reader.readline(), self.timeout)
+        except ValueError:
+            raise BadRequest(status, "line too long")
+        except asyncio.TimeoutError:
+            raise BadRequest(408, "no request within {t:g} seconds".format(t=self.timeout))
+
+    async def handle(self, reader, writer):
+        """Answer a single HTTP request
+
+        Args:
+            reader (StreamReader): request stream
+            writer (StreamWriter): response stream
+        """
+        dataset = self.dataset
+        status, ctype, body = 200, "application/json", b""
+        method = "GET"
+        line = b""
+        try:
+            try:
+                line = await self.readLine(reader, 414)
+                # Skip the headers, requests have no body
+                while True:
+                    header = await self.readLine(reader, 400)
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                parts = line.decode("latin-1").split()
+                if len(parts) < 2:
+                    status = 400
+                else:
+                    method = parts[0]
+                    if method not in ("GET", "HEAD"):
+                        status = 405
+                    else:
+                        ctype, body = route(dataset, unquote(urlsplit(parts[1]).path))
+            except BadRequest as e:
+                status = e.status
+                body = json.dumps({"error": str(e)}).encode("utf-8")
+            except NotFound as e:
+                status = 404
+                body = json.dumps({"error": "not found: {e}".format(e=e)}).encode("utf-8")
+            except Exception as e:
+                status = 500
+                body = json.dumps({"error": str(e)}).encode("utf-8")
+                pout("request failed: {e}".format(e=e), self.verbose, Level.ERROR)
+            pout("{status} {line}", self.verbose, Level.DEBUG, status=status, line=line.strip()[:200])
+            head = "HTTP/1.1 {s} {r}\r\nContent-Type: {t}\r\nContent-Length: {n}\r\nX-Dataset-Version: {v}\r\nConnection: close\r\n\r\n".format(
+                s=status, r=REASONS[status], t=ctype, n=len(body), v=dataset.version)
+            writer.write(head.encode("latin-1"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080, socket=None):
+        """Load the database and serve until cancelled
+
+        Args:
+            host (Str): address to listen on (default: {'127.0.0.1'})
+            port (Int): TCP port to listen on (default: {8080})
+            socket (Str): Unix socket to listen on instead of TCP (default: {None})
+        """
+        self.dataset = self.load()
+        if socket:
+            server = await asyncio.start_unix_server(self.handle, path=socket)
+            where = socket
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            where = "http://{h}:{p}".format(h=host, p=port)
+        pout("serving version {v} on {w}".format(v=self.dataset.version, w=where), self.verbose, Level.INFO)
+        watcher = asyncio.ensure_future(self.watch())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            if socket and os.path.exists(socket):
+                os.remove(socket)
+
+class Memo(dict):
+    """Parsed files by content hash, see readTZDBs, forgetting the files
+    that were not part of the last load."""
+
+    def __init__(self):
+        super().__init__()
+        self.used = set()
+
+    def __setitem__(self, key, value):
+        self.used.add(key)
+        super().__setitem__(key, value)
+
+    def prune(self):
+        """Drop the files not stored since the last prune"""
+        for key in list(self):
+            if key not in self.used:
+                del self[key]
+        self.used = set()
+
+def serve(kwargs):
+    """Serve the database of kwargs until interrupted
+
+    Args:
+        kwargs (dict): command line arguments parsed by Click library
+    """
+    conf = readConf(kwargs)
+    server = Server(conf, kwargs['tzdir'], kwargs['verbose'], kwargs['interval'], kwargs.get('timeout', REQUEST_TIMEOUT))
+    try:
+        asyncio.run(server.start(kwargs['host'], kwargs['port'], kwargs['socket']))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""tz database release archive support"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import errno
+import io
+import os
+import shutil
+import subprocess
+import tarfile
+
+import click
+
+class TZArchive(dict):
+    """Members of a tz database release archive keyed by file name."""
+
+    def __init__(self, path, members):
+        super().__init__(members)
+        self.path = path
+
+def isArchive(tzdir):
+    """Check if tzdir points at an archive instead of a directory
+
+    Args:
+        tzdir (Str): tzdir given on the command line
+
+    Returns:
+        bool: True if tzdir is a file
+    """
+    return isinstance(tzdir, str) and os.path.isfile(tzdir)
+
+def readArchive(fpath, names):
+    """Read the named files out of a tzdataXXXX.tar.gz or tzdb-XXXX.tar.lz
+    archive in a single streaming pass.
+
+    tar.lz archives are decompressed by the lzip command, every other
+    compression supported by tarfile is read directly.  Members are matched
+    by name, ignoring the tzdb-XXXX/ directory of the tzdb archives.
+
+    Args:
+        fpath (Str): path to the archive
+        names (Iterable): file names to read
+
+    Returns:
+        TZArchive: contents of the named files
+
+    Raises:
+        click.FileError: lzip is missing or failed to decompress the archive
+    """
+    wanted = set(names)
+    members = {}
+    proc = None
+    if fpath.endswith(".lz"):
+        lzip = shutil.which("lzip")
+        if lzip is None:
+            raise click.FileError(fpath, hint="lzip is required to read .lz archives")
+        proc = subprocess.Popen([lzip, "-dc", fpath], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    tar = None
+    try:
+        if proc is not None:
+            tar = tarfile.open(fileobj=proc.stdout, mode="r|")
+        else:
+            tar = tarfile.open(fpath, mode="r|*")
+        for member in tar:
+            if not member.isfile():
+                continue
+            name = member.name
+            if name not in wanted:
+                name = name.split("/", 1)[-1]
+            if name in wanted and name not in members:
+                members[name] = tar.extractfile(member).read()
+    finally:
+        if tar is not None:
+            tar.close()
+        if proc is not None:
+            proc.stdout.close()
+            error = proc.stderr.read().decode(errors="replace").strip()
+            proc.stderr.close()
+            # killed by SIGPIPE when the tar ends before the stream does
+            if proc.wait() > 0:
+                raise click.FileError(fpath, hint=error or "lzip exited with status {rc}".format(rc=proc.returncode))
+    for name in wanted:
+        if name not in members:
+            raise FileNotFoundError(errno.ENOENT, "not found in {arc}".format(arc=fpath), name)
+    return TZArchive(fpath, members)
+
+def readInputs(tzdir, names):
+    """Read the named files out of a release archive, or check that a
+    directory holds them
+
+    Args:
+        tzdir (Str): directory or archive given on the command line
+        names (Iterable): file names to read
+
+    Returns:
+        Str or TZArchive: the directory, or the files read out of the archive
+
+    Raises:
+        click.ClickException: a file is missing, or the archive cannot be read
+    """
+    if not isArchive(tzdir):
+        for name in names:
+            if not os.path.isfile(os.path.join(tzdir, name)):
+                raise click.ClickException("{name} not found in {dir}".format(name=name, dir=tzdir))
+        return tzdir
+    try:
+        return readArchive(tzdir, names)
+    except FileNotFoundError as e:
+        raise click.ClickException("{name} not found in {arc}".format(name=e.filename, arc=tzdir))
+    except tarfile.TarError as e:
+        raise click.ClickException("{arc} is not a readable tar archive: {e}".format(arc=tzdir, e=e))
+
+def openTZFile(name, tzdir):
+    """Open a file of the tz database as text
+
+    Args:
+        name (Str): file name
+        tzdir (Str or TZArchive): directory or archive holding the file
+
+    Returns:
+        File: text stream of the file
+    """
+    if isinstance(tzdir, TZArchive):
+        return io.TextIOWrapper(io.BytesIO(tzdir[name]), encoding="utf-8")
+    return click.open_file(os.path.join(tzdir, name), 'r', encoding="utf-8")
+
+def displayPath(name, tzdir):
+    """Get the path of a file of the tz database for messages
+
+    Args:
+        name (Str): file name
+        tzdir (Str or TZArchive): directory or archive holding the file
+
+    Returns:
+        Str: path of the file
+    """
+    if isinstance(tzdir, TZArchive):
+        return "{arc}:{name}".format(arc=tzdir.path, name=name)
+    return os.path.join(tzdir, name)
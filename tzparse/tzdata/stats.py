@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""per phase timing and memory statistics of a run"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+PhaseStats = namedtuple('PhaseStats', ['name', 'wall', 'cpu', 'peak', 'rss', 'counts'])
+PhaseStats.__doc__ = """Statistics of a phase of a run.
+
+wall and cpu are in seconds, peak is the peak traced memory of the phase
+and rss the peak resident set size of the process so far, both in bytes
+(None when not available).  counts holds the number of records handled.
+"""
+
+FileStats = namedtuple('FileStats', ['path', 'source', 'wall', 'cpu', 'counts'])
+FileStats.__doc__ = """Statistics of an input tzdata file or of an output.
+
+source is 'parsed', 'cached' or 'unchanged' for an input and 'written'
+for an output.  wall and cpu are the time spent parsing or writing the
+file, in the worker process when done in parallel.
+"""
+
+def maxRSS():
+    """Get the peak resident set size of the process
+
+    Returns:
+        Int: bytes, None when not available
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+class Stats(object):
+    """Collect per phase and per input file statistics of a run.
+
+    A disabled instance records nothing, so callers do not need to check
+    whether statistics were requested.
+    """
+
+    def __init__(self, enabled=True, trace=True):
+        """Create a collector
+
+        Args:
+            enabled (Bool): record the statistics (default: {True})
+            trace (Bool): trace the memory with tracemalloc (default: {True})
+        """
+        self.enabled = enabled
+        self.trace = enabled and trace
+        self.phases = []
+        self.files = []
+        self.started = False
+
+    def start(self):
+        """Start tracing the memory"""
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started = True
+
+    def stop(self):
+        """Stop tracing the memory if start started it"""
+        if self.started:
+            tracemalloc.stop()
+            self.started = False
+
+    @contextmanager
+    def phase(self, name):
+        """Measure a phase of the run
+
+        Args:
+            name (Str): name of the phase
+
+        Yields:
+            Dict: record counts of the phase, filled in by the caller
+        """
+        counts = {}
+        if not self.enabled:
+            yield counts
+            return
+        tracing = tracemalloc.is_tracing()
+        if tracing and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield counts
+        finally:
+            self.phases.append(PhaseStats(
+                name,
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+                tracemalloc.get_traced_memory()[1] if tracing else None,
+                maxRSS(),
+                counts
+            ))
+
+    def addFile(self, path, source, wall=0.0, cpu=0.0, counts=None):
+        """Record the statistics of an input or output file
+
+        Args:
+            path (Str): file path
+            source (Str): 'parsed', 'cached', 'unchanged' or 'written'
+            wall (Float): wall time in seconds (default: {0.0})
+            cpu (Float): cpu time in seconds (default: {0.0})
+            counts (Dict): record counts (default: {None})
+        """
+        if self.enabled:
+            self.files.append(FileStats(path, source, wall, cpu, counts or {}))
+
+    def asDict(self):
+        """Get the statistics as plain data, e.g. to dump them as JSON
+
+        Returns:
+            Dict: phases and files as lists of dicts
+        """
+        return {
+            "phases": [dict(p._asdict()) for p in self.phases],
+            "files": [dict(f._asdict()) for f in self.files],
+        }
+
+    def report(self):
+        """Format the statistics as a table
+
+        Returns:
+            Str: report
+        """
+        def mib(value):
+            return "-" if value is None else "{v:.1f}".format(v=value / 1024 / 1024)
+
+        def counts(values):
+            return " ".join("{k}={v}".format(k=k, v=v) for k, v in values.items())
+
+        lines = ["{p:<16} {w:>10} {c:>10} {m:>10} {r:>10}  counts".format(
+            p="phase", w="wall ms", c="cpu ms", m="peak MiB", r="rss MiB")]
+        for p in self.phases:
+            lines.append("{p:<16} {w:10.2f} {c:10.2f} {m:>10} {r:>10}  {n}".format(
+                p=p.name, w=p.wall * 1000, c=p.cpu * 1000,
+                m=mib(p.peak), r=mib(p.rss), n=counts(p.counts)))
+        lines.append("{p:<16} {w:10.2f} {c:10.2f}".format(
+            p="total",
+            w=sum(p.wall for p in self.phases) * 1000,
+            c=sum(p.cpu for p in self.phases) * 1000))
+        if self.files:
+            lines.append("")
+            lines.append("{f:<40} {s:<9} {w:>10} {c:>10}  counts".format(
+                f="file", s="source", w="wall ms", c="cpu ms"))
+            for f in self.files:
+                lines.append("{f:<40} {s:<9} {w:10.2f} {c:10.2f}  {n}".format(
+                    f=f.path, s=f.source, w=f.wall * 1000, c=f.cpu * 1000, n=counts(f.counts)))
+        return "\n".join(lines)
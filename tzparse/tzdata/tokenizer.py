@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""single pass tokenizer for the tz database source files"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from collections import namedtuple
+
+class ZoneEntry(namedtuple('ZoneEntry', ['name', 'eras'])):
+    """Zone entry in the database.
+
+    eras holds one field list per line of the entry, starting with the
+    Zone line itself: [STDOFF, RULES, FORMAT, UNTIL...]
+    """
+    __slots__ = ()
+
+class RuleEntry(namedtuple('RuleEntry', ['fields'])):
+    """Rule entry in the database.
+
+    fields holds the columns following the Rule keyword:
+    [NAME, FROM, TO, TYPE, IN, ON, AT, SAVE, LETTER/S]
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self.fields[0]
+
+class LinkEntry(namedtuple('LinkEntry', ['target', 'name'])):
+    """Link entry in the database."""
+    __slots__ = ()
+
+def stripComment(line):
+    """Strip comments and trailing spaces from a line
+
+    The comment is cut at the last '#' of the line, which is what the
+    original `re.sub(r'^(.*)#.*', ...)` did.
+
+    Args:
+        line (Str): single line of the database file
+
+    Returns:
+        Str: line without comments and trailing spaces
+    """
+    pos = line.rfind('#')
+    if pos >= 0:
+        line = line[:pos]
+    return line.rstrip()
+
+def tokenize(lines):
+    """Classify the lines of a database file into typed entries.
+
+    Each line is looked at once.  Lines are classified by their first
+    character: Zone continuation lines start with a tab, comments start
+    with '#' and everything else is dispatched on its leading keyword.
+
+    Args:
+        lines (Iterable): lines of a single database file
+
+    Yields:
+        ZoneEntry, RuleEntry or LinkEntry: entries in file order
+    """
+    zone = None
+    for line in lines:
+        head = line[:1]
+        if zone is not None:
+            # Zones span multiple lines denoted by leading tabs
+            if head == '\t':
+                fields = stripComment(line).split()
+                if fields:
+                    zone.eras.append(fields)
+                continue
+            elif head == '#':
+                continue
+            yield zone
+            zone = None
+        if head == 'Z':
+            if line.startswith('Zone'):
+                fields = stripComment(line).split()
+                zone = ZoneEntry(fields[1], [fields[2:]])
+        elif head == 'R':
+            if line.startswith('Rule'):
+                yield RuleEntry(stripComment(line).split()[1:])
+        elif head == 'L':
+            if line.startswith('Link'):
+                fields = stripComment(line).split()
+                yield LinkEntry(fields[1], fields[2])
+    if zone is not None:
+        yield zone
@@ -0,0 +1,470 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""UTC transition table generator"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Times are handled as seconds since 1970-01-01 00:00 and dates as days
+# since 1970-01-01, both in the proleptic Gregorian calendar.
+
+from array import array
+from collections import namedtuple, OrderedDict
+from datetime import date
+
+import click
+
+from tzparse.tzdata.model import (
+    WALL, STANDARD, UTC, groupRules, parseOffset, parseTime, parseSave, parseMonth, parseOn
+)
+
+EPOCH = date(1970, 1, 1).toordinal()
+DAY = 86400
+
+# Instant of the first row of a zone whose era has no start
+BIG_BANG = -(1 << 59)
+
+# Rules running from 'min' are expanded from this year on
+MIN_YEAR = 1800
+
+# Default number of (rule name, year) results kept by a RuleExpander
+CACHE_SIZE = 1 << 16
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+class ZoneTransitions(namedtuple('ZoneTransitions', ['instants', 'offsets', 'isdst', 'abbrs'])):
+    """Transitions of a single zone as array backed columns.
+
+    instants[i] is the UTC instant (seconds since the epoch) from which
+    offsets[i] (seconds east of UTC), isdst[i] and abbrs[i] apply.
+    """
+    __slots__ = ()
+
+def dayOfMonth(year, month, on):
+    """Resolve an ON column into a date
+
+    Args:
+        year (Int): year
+        month (Int): month 1-12
+        on (DaySpec): day of the month
+
+    Returns:
+        Int: days since 1970-01-01, which may fall into the next or previous month
+    """
+    kind, wday, day = on
+    if kind == "day":
+        return date(year, month, day).toordinal() - EPOCH
+    if kind == "last":
+        if month == 12:
+            last = date(year + 1, 1, 1).toordinal() - 1
+        else:
+            last = date(year, month + 1, 1).toordinal() - 1
+        return last - (last - wday - 1) % 7 - EPOCH
+    base = date(year, month, 1).toordinal() + day - 1
+    # date.weekday() is (ordinal - 1) % 7
+    if kind == ">=":
+        return base + (wday - (base - 1)) % 7 - EPOCH
+    return base - ((base - 1) - wday) % 7 - EPOCH
+
+def parseUntil(text):
+    """Parse an UNTIL column
+
+    Args:
+        text (Str): YEAR [MONTH [DAY [TIME]]]
+
+    Returns:
+        Tuple: (days since 1970-01-01, seconds into the day, kind)
+    """
+    fields = text.split()
+    year = int(fields[0])
+    month = parseMonth(fields[1]) if len(fields) > 1 else 1
+    days = dayOfMonth(year, month, parseOn(fields[2] if len(fields) > 2 else "1"))
+    seconds, kind = parseTime(fields[3]) if len(fields) > 3 else (0, WALL)
+    return days, seconds, kind
+
+def toUTC(days, seconds, kind, stdoff, save):
+    """Convert a local day and time to a UTC instant
+
+    Args:
+        days (Int): days since 1970-01-01
+        seconds (Int): seconds into the day
+        kind (Str): WALL, STANDARD or UTC
+        stdoff (Int): standard offset in seconds
+        save (Int): saved time in effect in seconds
+
+    Returns:
+        Int: seconds since the epoch
+    """
+    instant = days * DAY + seconds
+    if kind == UTC:
+        return instant
+    if kind == STANDARD:
+        return instant - stdoff
+    return instant - stdoff - save
+
+def yearOf(instant):
+    """Get the UTC year of an instant
+
+    Args:
+        instant (Int): seconds since the epoch
+
+    Returns:
+        Int: year
+    """
+    return date.fromordinal(instant // DAY + EPOCH).year
+
+def formatOffset(utoff):
+    """Format an offset the way %z of the FORMAT column does
+
+    Args:
+        utoff (Int): offset from UTC in seconds
+
+    Returns:
+        Str: +hh, +hhmm or +hhmmss
+    """
+    sign = "-" if utoff < 0 else "+"
+    hours, rest = divmod(abs(utoff), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if seconds:
+        return "{s}{h:02d}{m:02d}{x:02d}".format(s=sign, h=hours, m=minutes, x=seconds)
+    if minutes:
+        return "{s}{h:02d}{m:02d}".format(s=sign, h=hours, m=minutes)
+    return "{s}{h:02d}".format(s=sign, h=hours)
+
+def formatAbbr(fmt, isdst, letters, utoff):
+    """Expand the FORMAT column of a zone into an abbreviation
+
+    Args:
+        fmt (Str): FORMAT column
+        isdst (Bool): True during daylight saving time
+        letters (Str): LETTER/S column of the rule in effect
+        utoff (Int): offset from UTC in seconds
+
+    Returns:
+        Str: time zone abbreviation
+    """
+    if "%s" in fmt:
+        return fmt.replace("%s", "" if letters == "-" else letters)
+    if "%z" in fmt:
+        return fmt.replace("%z", formatOffset(utoff))
+    if "/" in fmt:
+        std, dst = fmt.split("/", 1)
+        return dst if isdst else std
+    return fmt
+
+class RuleExpander(object):
+    """Expand rule sets into the transitions of a given year.
+
+    The result of every (rule name, year) pair is kept in a cache of at
+    most maxsize entries, the least recently used one being evicted, so a
+    rule set shared by many zones is only computed once per year.  The
+    hits, misses and evictions are counted, see cacheInfo.
+    """
+
+    def __init__(self, rules, maxsize=CACHE_SIZE):
+        """Create an expander
+
+        Args:
+            rules (Array): Rule records
+            maxsize (Int): number of cached results, 0 for no cache and None for no limit (default: {CACHE_SIZE})
+
+        Raises:
+            ValueError: maxsize is negative
+        """
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("negative cache size: {n}".format(n=maxsize))
+        self.ruleSets = groupRules(rules)
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def fromConf(cls, rules, tconf, verbose=0):
+        """Create an expander as set by the transitions section of the config
+
+        A warm-up range not fitting in the cache is warned about, as its
+        first years are evicted by the last ones.
+
+        Args:
+            rules (Array): Rule records
+            tconf (Dict): cachesize, and warmup as [start, end] years
+            verbose (Int): verbosity mode (default: {0})
+
+        Returns:
+            RuleExpander: expander, warmed up when asked
+
+        Raises:
+            click.ClickException: cachesize is negative
+        """
+        from tzparse.tzdata.tzdata import pout, Level
+        maxsize = tconf.get('cachesize', CACHE_SIZE)
+        if maxsize is not None and maxsize < 0:
+            raise click.ClickException("transitions cachesize must be 0 or more, not {n}".format(n=maxsize))
+        expander = cls(rules, maxsize)
+        warmup = tconf.get('warmup')
+        if warmup:
+            pairs = (warmup[1] - warmup[0] + 1) * len(expander.ruleSets)
+            if maxsize is not None and pairs > maxsize:
+                pout("warmup of {start}-{end} expands up to {n} rule years, more than the cachesize of {size}",
+                     verbose, Level.WARNING, start=warmup[0], end=warmup[1], n=pairs, size=maxsize)
+            expander.warmup(warmup[0], warmup[1])
+        return expander
+
+    def __contains__(self, name):
+        return name in self.ruleSets
+
+    def expand(self, name, year):
+        """Get the transitions of a rule set in a year
+
+        Args:
+            name (Str): rule name
+            year (Int): year
+
+        Returns:
+            Tuple: (days, at, atKind, save, isdst, letters) sorted by date and time
+        """
+        key = (name, year)
+        events = self.cache.get(key)
+        if events is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return events
+        self.misses += 1
+        events = [
+            (dayOfMonth(year, rule.month, rule.on), rule.at, rule.atKind,
+             rule.save, rule.isdst, rule.letters)
+            for rule in self.ruleSets[name].active(year)
+        ]
+        events.sort(key=lambda e: e[0] * DAY + e[1])
+        events = tuple(events)
+        if self.maxsize != 0:
+            self.cache[key] = events
+            if self.maxsize is not None and len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+                self.evictions += 1
+        return events
+
+    def warmup(self, startYear, endYear, names=None):
+        """Expand rule sets for a range of years ahead of the queries
+
+        Args:
+            startYear (Int): first year
+            endYear (Int): last year
+            names (Iterable): rule names, all of them when None (default: {None})
+
+        Returns:
+            Int: number of (rule name, year) pairs expanded
+        """
+        count = 0
+        for name in self.ruleSets if names is None else names:
+            for year in range(max(startYear, self.firstYear(name)), endYear + 1):
+                self.expand(name, year)
+                count += 1
+        return count
+
+    def cacheInfo(self):
+        """Get the statistics of the cache
+
+        Returns:
+            CacheInfo: hits, misses, evictions, maxsize and current size
+        """
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.cache))
+
+    def firstYear(self, name):
+        """Get the first year of a rule set
+
+        Args:
+            name (Str): rule name
+
+        Returns:
+            Int: earliest FROM year of the rule set, MIN_YEAR at the earliest
+        """
+        return max(self.ruleSets[name].firstYear(), MIN_YEAR)
+
+    def initialLetters(self, name):
+        """Get the letters used before the first transition of a rule set,
+        which are the ones of the earliest rule without saved time.
+
+        Args:
+            name (Str): rule name
+
+        Returns:
+            Str: letters
+        """
+        for rule in self.ruleSets[name]:
+            if rule.save == 0:
+                return rule.letters
+        return "-"
+
+def isAmount(rules):
+    """Check if the RULES column of a zone is an amount of time instead of
+    a rule name.  Rule names never start with a digit or a sign.
+
+    Args:
+        rules (Str): RULES column
+
+    Returns:
+        Bool: True for '-' or an amount of saved time
+    """
+    return rules[:1] == "-" or rules[:1].isdigit()
+
+def zoneTransitions(history, expander, endYear):
+    """Compute the transitions of a zone up to the end of endYear
+
+    Rule sets missing from the database are taken as '-'.
+
+    Args:
+        history (Tuple): ZoneEra records of the zone
+        expander (RuleExpander): rule sets of the database
+        endYear (Int): last year to compute
+
+    Returns:
+        Array: (instant, offset, isdst, abbr) sorted by instant
+    """
+    rows = []
+
+    def add(instant, stdoff, save, isdst, fmt, letters):
+        utoff = stdoff + save
+        row = (instant, utoff, isdst, formatAbbr(fmt, isdst, letters, utoff))
+        if rows and rows[-1][0] >= instant:
+            rows.pop()
+        if rows and rows[-1][1:] == row[1:]:
+            return
+        rows.append(row)
+
+    rangeEnd = (date(endYear + 1, 1, 1).toordinal() - EPOCH) * DAY
+    start = None
+    for era in history:
+        stdoff = parseOffset(era.stdoff)
+        until = parseUntil(era.until) if era.until else None
+        first = BIG_BANG if start is None else start
+        if isAmount(era.rules):
+            save, isdst = parseSave(era.rules)
+            add(first, stdoff, save, isdst, era.format, "")
+        elif era.rules not in expander:
+            save = 0
+            add(first, stdoff, save, False, era.format, "")
+        else:
+            save, isdst, letters = 0, False, expander.initialLetters(era.rules)
+            started = False
+            done = False
+            # The era starts in the state left by the last transition of
+            # the rule set before it, which may be years back
+            y0 = expander.firstYear(era.rules)
+            if start is not None:
+                year = yearOf(start) - 1
+                while year > y0 and not expander.expand(era.rules, year):
+                    year -= 1
+                y0 = max(year, y0)
+            y1 = min(yearOf(until[0] * DAY) if until else endYear, endYear) + 1
+            for year in range(y0, y1 + 1):
+                for days, at, kind, rsave, risdst, rletters in expander.expand(era.rules, year):
+                    instant = toUTC(days, at, kind, stdoff, save)
+                    if until is not None and instant >= toUTC(until[0], until[1], until[2], stdoff, save):
+                        done = True
+                        break
+                    # Like zic, a transition at the local time the previous
+                    # era ended is in effect from the start of the era
+                    if not started and start is not None and instant > first \
+                            and toUTC(days, at, kind, prevStdoff, prevSave) <= first:
+                        instant = first
+                    if instant > first and not started:
+                        add(first, stdoff, save, isdst, era.format, letters)
+                        started = True
+                    save, isdst, letters = rsave, risdst, rletters
+                    if started:
+                        add(instant, stdoff, save, isdst, era.format, letters)
+                if done:
+                    break
+            if not started:
+                add(first, stdoff, save, isdst, era.format, letters)
+        if until is None:
+            break
+        start = toUTC(until[0], until[1], until[2], stdoff, save)
+        prevStdoff, prevSave = stdoff, save
+        if start >= rangeEnd:
+            break
+    return rows
+
+def buildTransitions(zinfos, rules, aliases=None, startYear=1970, endYear=2037, expander=None):
+    """Build the transition table of every zone for a range of years
+
+    The first row of each zone gives the offset in effect at the start of
+    startYear, the following rows the transitions until the end of endYear.
+
+    Args:
+        zinfos (Dict): parsed timezone information with the zone History
+        rules (Array): rules returned by parseTZDBs
+        aliases (Dict): alias index, links are left out when given (default: {None})
+        startYear (Int): first year of the table (default: {1970})
+        endYear (Int): last year of the table (default: {2037})
+        expander (RuleExpander): rule expander to reuse (default: {None})
+
+    Returns:
+        Dict: zone name to ZoneTransitions
+    """
+    if expander is None:
+        expander = RuleExpander(rules)
+    rangeStart = (date(startYear, 1, 1).toordinal() - EPOCH) * DAY
+    rangeEnd = (date(endYear + 1, 1, 1).toordinal() - EPOCH) * DAY
+    table = {}
+    for zone in zinfos:
+        if aliases is not None and aliases.get(zone) != zone:
+            continue
+        rows = zoneTransitions(zinfos[zone]["History"], expander, endYear)
+        # Start with the row in effect at the start of the range
+        first = 0
+        while first + 1 < len(rows) and rows[first + 1][0] <= rangeStart:
+            first += 1
+        instants = array('q')
+        offsets = array('i')
+        isdst = array('b')
+        abbrs = []
+        for i in range(first, len(rows)):
+            instant, utoff, dst, abbr = rows[i]
+            if instant >= rangeEnd:
+                break
+            instants.append(max(instant, rangeStart))
+            offsets.append(utoff)
+            isdst.append(1 if dst else 0)
+            abbrs.append(abbr)
+        table[zone] = ZoneTransitions(instants, offsets, isdst, abbrs)
+    return table
+
+def transitionRows(table):
+    """Generate the rows of a transition table
+
+    Args:
+        table (Dict): table returned by buildTransitions
+
+    Yields:
+        Array: [Zone, UTC, Offset, IsDST, Abbreviation]
+    """
+    for zone, trans in table.items():
+        for i in range(len(trans.instants)):
+            yield [zone, trans.instants[i], trans.offsets[i], trans.isdst[i], trans.abbrs[i]]
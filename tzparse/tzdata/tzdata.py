@@ -30,14 +30,61 @@
 
 from enum import IntEnum
 
-import yaml
 import csv
+import io
+import logging
 import os
-import re
-import openpyxl
-from pprint import pformat
+import time
+from collections import namedtuple
+from functools import lru_cache, partial
+from itertools import repeat
+from sys import intern
 import click
 
+from tzparse.tzdata import cache
+from tzparse.tzdata.source import TZArchive, isArchive, readInputs, openTZFile, displayPath
+from tzparse.tzdata.model import ZoneEra, Rule
+from tzparse.tzdata.tokenizer import tokenize, ZoneEntry, RuleEntry, LinkEntry
+from tzparse.tzdata.binary import writeBinary
+from tzparse.tzdata.stats import Stats
+from tzparse.tzdata.transitions import buildTransitions, transitionRows, RuleExpander
+from tzparse.tzdata.geo import parseCoord, countryIndex, ZoneLocator
+from tzparse.tzdata.columnar import writeColumnar
+from tzparse.tzdata.output import (
+    atomicFile, Sink, OutputData, WRITERS, registerWriter, unknownOutputs, writeSinks, writeJSON, writeNDJSON
+)
+
+ZONE_HEADER = ["Country","Zone","STDOFF","Rule","Coordinate","Comment"]
+RULE_HEADER = ["NAME","FROM","TO","TYPE","IN","ON","AT","SAVE","LETTER/S"]
+HISTORY_HEADER = ["Zone","STDOFF","Rules","Format","Until"]
+TRANSITION_HEADER = ["Zone","UTC","Offset","IsDST","Abbreviation"]
+
+# Workbook layout, fixed up front so the rows can be streamed
+ZONE_WIDTHS = [24, 32, 10, 12, 18, 48]
+RULE_WIDTHS = [14, 7, 7, 6, 6, 10, 8, 8, 10]
+HISTORY_WIDTHS = [32, 10, 12, 12, 24]
+OutputRows = namedtuple('OutputRows', ['zones', 'rules', 'history'])
+
+
+# openpyxl, yaml, pprint, cProfile and the process pool are imported by the
+# functions using them, so that --version, --help and runs writing no
+# workbook do not pay for importing them.
+
+def pformat(obj, **kwargs):
+    """pprint.pformat, imported when a message first needs it"""
+    from pprint import pformat
+    return pformat(obj, **kwargs)
+
+@lru_cache(maxsize=None)
+def headerStyle():
+    """Get the font and fill of the header rows of the workbook
+
+    Returns:
+        Tuple: (Font, PatternFill)
+    """
+    from openpyxl.styles import Font, PatternFill
+    return Font(bold=True), PatternFill(fill_type="solid", fgColor="DDDDDD")
+
 class Level(IntEnum):
     NOTSET = 0
     DEBUG = 10
@@ -46,49 +93,76 @@ class Level(IntEnum):
     ERROR = 40
     CRITICAL = 50
 
-def pout(msg=None, Verbose=0, level=Level.INFO, newline=True):
+class ClickHandler(logging.Handler):
+    """Print log records on the console, errors and warnings to stderr."""
+
+    COLORS = {
+        Level.DEBUG: 'magenta',
+        Level.INFO: 'green',
+        Level.WARNING: 'yellow',
+        Level.ERROR: 'red',
+        Level.CRITICAL: 'red',
+    }
+
+    def emit(self, record):
+        try:
+            click.echo(
+                click.style(self.format(record), fg=self.COLORS.get(record.levelno)),
+                nl=getattr(record, "newline", True),
+                err=record.levelno >= Level.WARNING
+            )
+        except Exception:
+            self.handleError(record)
+
+# Messages go through the "tzparse" logger.  Applications may replace the
+# handler or set propagate to route them to their own logging setup.
+logger = logging.getLogger("tzparse")
+logger.setLevel(Level.DEBUG)
+logger.addHandler(ClickHandler())
+logger.propagate = False
+
+def pout(msg=None, Verbose=0, level=Level.INFO, newline=True, **kwargs):
     """stdout support method
 
+    The message is only built once it passed the verbosity check, so a
+    callable or a format string with its keyword arguments costs nothing
+    when the message is dropped.
+
     Keyword Arguments:
-        msg {string} -- message to print (default: {None})
+        msg {string} -- message, format string or callable returning the message (default: {None})
         Verbose {Int} -- Set True to print DEBUG message (default: {0})
         level {Level} -- Set message level for coloring (default: {Level.INFO})
         newline {bool} -- set to False if trailing new line is not needed (default: {True})
+        kwargs -- arguments to format msg with
     """
-    error=False
-    if level in {Level.NOTSET, Level.DEBUG}:
-        # blah
+    if level <= Level.DEBUG:
         if Verbose < 2:
             return
-        fg = 'magenta'
-    elif level == Level.INFO:
-        fg = 'green'
-    elif level == Level.WARNING:
-        if Verbose < 1:
-            return
-        fg = 'yellow'
-        error=True
-    elif level in {Level.ERROR, Level.CRITICAL}:
-        fg = 'red'
-        error=True
-    else:
-        pass
-    click.echo(click.style(str(msg), fg=fg), nl=newline, err=error)
+        level = Level.DEBUG
+    elif level == Level.WARNING and Verbose < 1:
+        return
+    if not logger.isEnabledFor(level):
+        return
+    if callable(msg):
+        msg = msg()
+    elif kwargs:
+        msg = msg.format(**kwargs)
+    logger.log(level, "%s", msg, extra={"newline": newline})
 
 def getCountry(isoFile, tzdir, verbose):
     """Get the dictionary containing the iso3166 country code to name conversion
 
     Args:
         isoFile (string): file name of the iso3166.tab file
-        tzdir (string): path holding the zoneFile
+        tzdir (string or TZArchive): path or archive holding the zoneFile
         verbose (string): verbosity level
 
     Returns:
         dict: dictionary containing the conversion from iso3166 country code to country name
     """
-    fpath = os.path.join(tzdir, isoFile)
-    pout("processing {path}".format(path=fpath), verbose, Level.DEBUG)
-    with open(fpath, encoding="utf-8") as fp:
+    fpath = displayPath(isoFile, tzdir)
+    pout("processing {path}", verbose, Level.DEBUG, path=fpath)
+    with openTZFile(isoFile, tzdir) as fp:
         rdr = csv.reader(filter(lambda row: row[0]!='#', fp), delimiter='\t')
         countryList = {}
         for row in rdr:
@@ -100,184 +174,412 @@ def getZones(zoneFile, tzdir, clist, verbose):
 
     Args:
         zoneFile (string): filename of the zone1970.tab file to use
-        tzdir (string): path holding the zoneFile
+        tzdir (string or TZArchive): path or archive holding the zoneFile
         clist (dict): dictionary to convert iso3166 code to country name
         verbose (int): verbosity level
 
     Returns:
-        dict: dictionary containing the zone list and their attributes
+        dict: dictionary containing the zone list and their attributes,
+            Latitude and Longitude holding the decoded Coord in degrees.
+            Zones of the same countries share the Countries and Codes lists
     """
-    fpath = os.path.join(tzdir, zoneFile)
-    pout("processing {path}".format(path=fpath), verbose, Level.DEBUG)
-    with open(fpath, encoding="utf-8") as fp:
+    fpath = displayPath(zoneFile, tzdir)
+    pout("processing {path}", verbose, Level.DEBUG, path=fpath)
+    with openTZFile(zoneFile, tzdir) as fp:
         rdr = csv.reader(filter(lambda row: row[0]!='#', fp), delimiter='\t')
         zoneList = {}
+        countries = {}
         for row in rdr:
-            cnlist = []
-            for ccode in row[0].split(','):
-                if ccode in clist:
-                    cnlist.append(clist[ccode])
-                else:
-                    cnlist.append("undefined")
+            if row[0] not in countries:
+                codes = row[0].split(',')
+                cnlist = []
+                for ccode in codes:
+                    if ccode in clist:
+                        cnlist.append(clist[ccode])
+                    else:
+                        cnlist.append("undefined")
+                countries[row[0]] = (cnlist, codes)
+            cnlist, codes = countries[row[0]]
+            try:
+                lat, lon = parseCoord(row[1])
+            except ValueError:
+                pout("{zone} has a malformed coordinate {coord}", verbose, Level.WARNING, zone=row[2], coord=row[1])
+                lat = lon = None
             if len(row) > 3: # comment available
                 zoneList[row[2]] = {"Countries":cnlist, "Coord": row[1], "Comment": row[3]}
             else:
                 zoneList[row[2]] = {"Countries":cnlist, "Coord": row[1], "Comment": ''}
+            zoneList[row[2]].update(Codes=codes, Latitude=lat, Longitude=lon)
 
     return zoneList
 
-def parseZone(lines, verbose):
+def parseZone(entry, verbose):
     """Parse the Zone entry in the database.
 
     Args:
-        lines (Array): Array containing the lines for a single Zone entry
+        entry (ZoneEntry): tokenized Zone entry
         verbose (Int): verbosity mode
 
     Returns:
-        Dict: zinfo data
+        Dict: zinfo data, History holds a ZoneEra per line of the entry
     """
-    pout("parseZone: {l}".format(l = lines), verbose, Level.DEBUG)
-    #pout(lines, verbose, Level.DEBUG)
-    firstLine = lines.pop(0)
-    firstLine = re.split(r'[\t ]', firstLine)
-    pout(firstLine, verbose, Level.DEBUG)
+    pout("parseZone: {l}", verbose, Level.DEBUG, l=entry)
+    history = tuple(map(ZoneEra.fromFields, entry.eras))
+    # The current STDOFF/Rule is held in the last line of the entry
+    lastLine = history[-1]
     zinfo = {
-        firstLine[1] : {
-            "STDOFF" : firstLine[2],
-            "Rule" : firstLine[3]
+        entry.name : {
+            "STDOFF" : lastLine.stdoff,
+            "Rule" : lastLine.rules,
+            "History" : history
         }
     }
-    if len(lines) > 0:
-        lastLine = re.split(r'[\t ]', lines[(len(lines)-1)].lstrip())
-        zinfo[firstLine[1]]["STDOFF"] = lastLine[0]
-        zinfo[firstLine[1]]["Rule"] = lastLine[1]
-    else:
-        pout("{zone} does not have extra lines".format(zone = firstLine[1]), verbose, Level.WARNING)
+    if len(entry.eras) < 2:
+        pout("{zone} does not have extra lines", verbose, Level.WARNING, zone=entry.name)
     pout(zinfo, verbose, Level.DEBUG)
     return zinfo
 
-def parseLink(line, verbose):
+def parseLink(entry, verbose):
     """Parse the Link entry in the database.
 
     Args:
-        line (Str): line containing a single Link entry
+        entry (LinkEntry): tokenized Link entry
         verbose (Int): verbosity mode
 
     Returns:
         Dict: zlink
     """
-    line = re.split(r'[\t ]', line)
-    pout("parseLink: {l}".format(l=line), verbose, Level.DEBUG)
+    pout("parseLink: {l}", verbose, Level.DEBUG, l=entry)
     zlink = {
-        line[2] : line[1]
+        entry.name : entry.target
     }
     return zlink
 
-def parseRule(line, verbose):
+def parseRule(entry, verbose):
     """Parse the Rule entry in the database.
 
     Args:
-        line (Str): line containing a single Rule entry
+        entry (RuleEntry): tokenized Rule entry
         verbose (Int): verbosity mode
 
     Returns:
-        Array: parsed rule data
+        Rule: parsed rule data
+
+    Raises:
+        ValueError: malformed Rule line
+    """
+    pout("parseRule: {l}", verbose, Level.DEBUG, l=entry)
+    return Rule.fromFields(entry.fields)
+
+def requireParsedRules(rules):
+    """Refuse malformed Rule lines, for the consumers of the parsed columns
+
+    Args:
+        rules (Array): Rule records
+
+    Raises:
+        click.ClickException: a Rule line is malformed
     """
-    pout("parseRule: {l}".format(l=line), verbose, Level.DEBUG)
-    rule = line.split()
-    rule.pop(0)
-    return rule
+    malformed = [rule for rule in rules if not rule.parsed]
+    if malformed:
+        raise click.ClickException(
+            "{n} malformed Rule lines, such as '{line}'. Run 'tzparse --check' to list them".format(
+                n=len(malformed), line=" ".join(malformed[0].fields))
+        )
 
 def expandLink(linkSrc, linkDst, zinfos, verbose):
     """expand the link to a full zone info
 
+    The link shares the zone information of the linked zone rather than
+    holding a copy, so the records must not be modified.
+
     Args:
         linkSrc (Str): timezone name of source
         linkDst (Str): timezone name of link dest
-        zinfos (Dict): timezone database structure to copy data from
+        zinfos (Dict): timezone database structure to take data from
         verbose (Int): verbosity mode
 
     Returns:
         Dict: zone information data
     """
-    pout("expanding: {src} -> {dst}".format(src=linkSrc, dst=linkDst), verbose, Level.DEBUG)
-    zinfo = {
-        linkSrc: {
-            "STDOFF" : zinfos[linkDst]["STDOFF"],
-            "Rule" : zinfos[linkDst]["Rule"],
-        }
-    }
-    pout(pformat(zinfo,depth=3,indent=4), verbose, Level.DEBUG)
+    pout("expanding: {src} -> {dst}", verbose, Level.DEBUG, src=linkSrc, dst=linkDst)
+    zinfo = {linkSrc: zinfos[linkDst]}
+    pout(lambda: pformat(zinfo,depth=3,indent=4), verbose, Level.DEBUG)
     return zinfo
 
-def parseTZDB(fpath, verbose):
-    """Parse a single Timezone Database file.
+def readTZDB(fpath, verbose, data=None):
+    """Read a single Timezone Database file without expanding the Links.
     zinfos contains the parsed timezone information.
-    rules contains the parsed rules.
+    zlinks contains the Links as link name to target zone name.
+    rules contains the parsed rules.  Malformed Rule lines are reported
+    and kept as written, see Rule.unparsed.
 
     Args:
         fpath (Str): file path to the database file
         verbose (Int): verbosity mode
+        data (Bytes): contents of the file when read from an archive (default: {None})
 
     Returns:
-        Tuple: returns (zinfos, rules)
+        Tuple: returns (zinfos, zlinks, rules)
     """
     zinfos = {}
     zlinks = {}
     rules = []
     pout("parseTZDB: {path}".format(path=fpath), verbose, Level.INFO)
-    with click.open_file(fpath, 'r', encoding="utf-8") as db:
-        line = db.readline()
-        while line:
-            # Strip comments and trailing spaces
-            line = re.sub(r'^(.*)#.*', '\\1', line).rstrip()
-            if re.match(r'Zone.*',line):
-                lines = [line]
-                line = db.readline()
-                # Zones span multiple lines denoted by leading tabs
-                while re.match(r'[\t\#]',line):
-                    if re.match(r'\t',line):
-                        # Strip comments and trailing spaces
-                        line = re.sub(r'^(.*)#.*', '\\1', line).rstrip()
-                        lines.extend([line])
-                    line = db.readline()
-                zinfos.update(parseZone(lines, verbose))
-            elif re.match(r'Link.*',line):
-                zlinks.update(parseLink(line, verbose))
-                line = db.readline()
-            elif re.match(r'Rule.*',line):
-                rules.extend([parseRule(line, verbose)])
-                line = db.readline()
-            else:
-                line = db.readline()
-        pass
-    # Some Links source different database files.
-    pout("linking:\n{l}".format(l=zlinks), verbose, Level.DEBUG)
+    if data is None:
+        db = click.open_file(fpath, 'r', encoding="utf-8")
+    else:
+        db = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+    with db:
+        for entry in tokenize(db):
+            if isinstance(entry, ZoneEntry):
+                zinfos.update(parseZone(entry, verbose))
+            elif isinstance(entry, LinkEntry):
+                zlinks.update(parseLink(entry, verbose))
+            elif isinstance(entry, RuleEntry):
+                try:
+                    rules.append(parseRule(entry, verbose))
+                except ValueError as e:
+                    pout("{path}: {e}, kept as written".format(path=fpath, e=e), verbose, Level.ERROR)
+                    rules.append(Rule.unparsed(entry.fields))
+    return zinfos, zlinks, rules
+
+def resolveLinks(zlinks, zinfos, verbose):
+    """Resolve every Link to the Zone it finally points at.
+
+    Links may point at other Links.  Each chain is followed once and every
+    name on it is memoised, so resolving all links is linear in their
+    number.  Links ending in an unknown name or in a cycle are reported and
+    left out of the result.
+
+    Args:
+        zlinks (Dict): link name to target name
+        zinfos (Dict): timezone database structure holding the Zones
+        verbose (Int): verbosity mode
+
+    Returns:
+        Dict: alias index from every zone and link name to its Zone name
+    """
+    aliases = {zone: zone for zone in zinfos if zone not in zlinks}
+    failed = set()
     for lnk in zlinks:
-        zinfos.update(expandLink(lnk, zlinks[lnk], zinfos, verbose))
+        if lnk in aliases or lnk in failed:
+            continue
+        chain = [lnk]
+        seen = {lnk}
+        target = zlinks[lnk]
+        while target in zlinks and target not in aliases and target not in failed:
+            if target in seen:
+                pout("link cycle: {c}".format(c=" -> ".join(chain + [target])), verbose, Level.ERROR)
+                break
+            chain.append(target)
+            seen.add(target)
+            target = zlinks[target]
+        if target in aliases:
+            zone = aliases[target]
+            for name in chain:
+                aliases[name] = zone
+        else:
+            if target not in seen and target not in failed:
+                pout("{lnk} links to undefined zone {dst}".format(lnk=chain[-1], dst=target), verbose, Level.WARNING)
+            failed.update(chain)
+    pout("aliases:\n{l}", verbose, Level.DEBUG, l=aliases)
+    return aliases
+
+def expandLinks(aliases, zinfos, verbose):
+    """Expand all Links into zinfos
+
+    Args:
+        aliases (Dict): alias index returned by resolveLinks
+        zinfos (Dict): timezone database structure to update
+        verbose (Int): verbosity mode
+    """
+    for name, zone in aliases.items():
+        if name != zone:
+            zinfos.update(expandLink(name, zone, zinfos, verbose))
+
+def parseTZDB(fpath, verbose):
+    """Parse a single Timezone Database file.
+    zinfos contains the parsed timezone information.
+    rules contains the parsed rules.
+
+    Args:
+        fpath (Str): file path to the database file
+        verbose (Int): verbosity mode
+
+    Returns:
+        Tuple: returns (zinfos, rules)
+    """
+    zinfos, zlinks, rules = readTZDB(fpath, verbose)
+    expandLinks(resolveLinks(zlinks, zinfos, verbose), zinfos, verbose)
     return zinfos, rules
 
-def parseTZDBs(tzdbs, tzdir, verbose):
-    """Parse the list of timezone databases
+def timedReadTZDB(fpath, verbose, data=None):
+    """readTZDB also returning the time spent, so it can be measured in
+    the worker processes.
+
+    Args:
+        fpath (Str): file path to the database file
+        verbose (Int): verbosity mode
+        data (Bytes): contents of the file when read from an archive (default: {None})
+
+    Returns:
+        Tuple: ((zinfos, zlinks, rules), wall seconds, cpu seconds)
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = readTZDB(fpath, verbose, data)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+def shareRecords(result):
+    """Share the strings and parsed values of a result read back from the
+    cache or from a worker process
+
+    Unpickling gives each file its own copy of the strings and values
+    which parseZone and parseRule share over the whole database.  They are
+    interned again, and the Rule records rebuilt through the memoised
+    parse functions.
+
+    Args:
+        result (Tuple): (zinfos, zlinks, rules) returned by readTZDB
+
+    Returns:
+        Tuple: (zinfos, zlinks, rules) sharing their values
+    """
+    zinfos, zlinks, rules = result
+    shared = {}
+    for zone, zinfo in zinfos.items():
+        history = tuple(ZoneEra._make(map(intern, era)) for era in zinfo["History"])
+        shared[intern(zone)] = {"STDOFF": history[-1].stdoff, "Rule": history[-1].rules, "History": history}
+    return (
+        shared,
+        {intern(lnk): intern(target) for lnk, target in zlinks.items()},
+        [Rule.fromFields(rule.fields) if rule.parsed else Rule.unparsed(rule.fields) for rule in rules],
+    )
+
+def readTZDBs(tzdbs, tzdir, verbose, jobs=1, cacheDir=None, memo=None, stats=None):
+    """Read the list of timezone databases without expanding the Links
     zinfos contains the parsed timezone information.
+    zlinks contains the Links of all files as link name to target name.
     rules contains the parsed rules.
 
+    Files are read in a process pool when jobs is larger than 1.  The
+    results are merged in the order of tzdbs so a later definition wins
+    just like in the serial case.  When cacheDir is given, files whose
+    contents were parsed before are loaded from the cache.  memo keeps the
+    parsed files by content hash within a process, so files shared by two
+    trees are only parsed once.  Results read back from the cache or from
+    the worker processes are shared again by shareRecords.
+
     Args:
         tzdbs (Array): list of timezone database file paths
-        tzdir (Str): directory the database file is located
+        tzdir (Str or TZArchive): directory or archive the database file is located
         verbose (Int): verbosity mode
+        jobs (Int): number of worker processes, 0 for one per CPU (default: {1})
+        cacheDir (Str): directory of the parsed file cache (default: {None})
+        memo (Dict): content hash to parsed file, updated in place (default: {None})
+        stats (Stats): collector of the per file statistics (default: {None})
 
     Returns:
-        Tuple: zinfos, rules
+        Tuple: zinfos, zlinks, rules
     """
+    fpaths = [displayPath(db, tzdir) for db in tzdbs]
+    if isinstance(tzdir, TZArchive):
+        datas = [tzdir[db] for db in tzdbs]
+    else:
+        datas = [None] * len(tzdbs)
+    results = [None] * len(fpaths)
+    digests = [None] * len(fpaths)
+    sources = ["parsed"] * len(fpaths)
+    times = [(0.0, 0.0)] * len(fpaths)
+    if cacheDir or memo is not None:
+        index = cache.loadIndex(cacheDir) if cacheDir else {}
+        for i, fpath in enumerate(fpaths):
+            if datas[i] is None:
+                digests[i] = cache.fileHash(fpath, index)
+            else:
+                digests[i] = cache.dataHash(datas[i])
+            if memo is not None and digests[i] in memo:
+                results[i] = memo[digests[i]]
+                sources[i] = "unchanged"
+                pout("unchanged: {path}".format(path=fpath), verbose, Level.INFO)
+            elif cacheDir:
+                results[i] = cache.load(cacheDir, digests[i])
+                if results[i] is not None:
+                    results[i] = shareRecords(results[i])
+                    sources[i] = "cached"
+                    pout("cached: {path}".format(path=fpath), verbose, Level.INFO)
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(missing) > 1:
+        pout("parsing with {jobs} processes".format(jobs=jobs), verbose, Level.INFO)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = pool.map(
+                timedReadTZDB,
+                [fpaths[i] for i in missing],
+                repeat(verbose),
+                [datas[i] for i in missing]
+            )
+            for i, (result, wall, cpu) in zip(missing, parsed):
+                results[i] = shareRecords(result)
+                times[i] = (wall, cpu)
+    else:
+        for i in missing:
+            results[i], wall, cpu = timedReadTZDB(fpaths[i], verbose, datas[i])
+            times[i] = (wall, cpu)
+
+    if cacheDir:
+        try:
+            for i in missing:
+                cache.store(cacheDir, digests[i], results[i])
+            cache.saveIndex(cacheDir, index)
+        except OSError as e:
+            pout("could not update cache {dir}: {e}".format(dir=cacheDir, e=e), verbose, Level.WARNING)
+    if memo is not None:
+        for i, digest in enumerate(digests):
+            memo[digest] = results[i]
+
+    if stats is not None:
+        for i, (retZInfo, retZLinks, retRules) in enumerate(results):
+            stats.addFile(fpaths[i], sources[i], times[i][0], times[i][1], {
+                "zones": len(retZInfo), "links": len(retZLinks), "rules": len(retRules)
+            })
+
     zinfos = {}
+    zlinks = {}
     rules = []
-    for db in tzdbs:
-        fpath = os.path.join(tzdir, db)
-        retZInfo, retRules = parseTZDB(fpath, verbose)
+    for retZInfo, retZLinks, retRules in results:
+        # A Zone defined in a later file replaces an earlier Link
+        for zone in retZInfo:
+            zlinks.pop(zone, None)
         zinfos.update(retZInfo)
+        zlinks.update(retZLinks)
         rules.extend(retRules)
 
+    return zinfos, zlinks, rules
+
+def parseTZDBs(tzdbs, tzdir, verbose, jobs=1):
+    """Parse the list of timezone databases
+    zinfos contains the parsed timezone information.
+    rules contains the parsed rules.
+
+    Links are resolved once over the zones of all files, so they may point
+    at zones of other files or at other links.
+
+    Args:
+        tzdbs (Array): list of timezone database file paths
+        tzdir (Str or TZArchive): directory or archive the database file is located
+        verbose (Int): verbosity mode
+        jobs (Int): number of worker processes, 0 for one per CPU (default: {1})
+
+    Returns:
+        Tuple: zinfos, rules
+    """
+    zinfos, zlinks, rules = readTZDBs(tzdbs, tzdir, verbose, jobs)
+    expandLinks(resolveLinks(zlinks, zinfos, verbose), zinfos, verbose)
     return zinfos, rules
 
 def createConf(conf, verbose):
@@ -294,6 +596,7 @@ def createConf(conf, verbose):
                 "  - europe\n",
                 "  - northamerica\n",
                 "  - southamerica\n",
+                "jobs: 1\n",
                 "output:\n",
                 "  zonecsv: zones.csv\n",
                 "  rulescsv: rules.csv\n",
@@ -303,140 +606,562 @@ def createConf(conf, verbose):
         pout("could not create {file}".format(file=conf), verbose, Level.ERROR)
     pass
 
-def createWB(zlist, rules, verbose):
-    wb = openpyxl.Workbook()
+def zoneRows(zlist):
+    """Generate the rows of the zone list, one per country of each zone
+
+    Args:
+        zlist (dict): zone list joined with the zone information
 
-    ws = wb.active
-    ws.append(["Country","Zone","STDOFF","Rule","Coordinate","Comment"])
-    ws.title = "Time Zones"
+    Yields:
+        Array: [Country, Zone, STDOFF, Rule, Coordinate, Comment]
+    """
     for zone in zlist:
         for country in zlist[zone]["Countries"]:
-            ws.append([
+            yield [
                 country,
                 zone,
                 zlist[zone]["STDOFF"],
                 zlist[zone]["Rule"],
                 zlist[zone]["Coord"],
                 zlist[zone]["Comment"]
-            ])
+            ]
+
+def ruleRows(rules):
+    """Generate the rows of the rules, the columns as written
 
-    ws2 = wb.create_sheet("Rules", 1)
-    ws2.append(["NAME","FROM","TO","TYPE","IN","ON","AT","SAVE","LETTER/S"])
+    Args:
+        rules (Array): Rule records
+
+    Yields:
+        Tuple: [NAME, FROM, TO, TYPE, IN, ON, AT, SAVE, LETTER/S]
+    """
     for rule in rules:
-        #rule.pop(0)
-        ws2.append(rule)
+        yield rule.fields
+
+def historyRows(zinfos, aliases):
+    """Generate the rows of the zone history, one per line of each Zone
+
+    Links are left out, they share the history of their zone.
+
+    Args:
+        zinfos (dict): parsed timezone information
+        aliases (dict): alias index returned by resolveLinks
+
+    Yields:
+        Array: [Zone, STDOFF, Rules, Format, Until]
+    """
+    for zone in zinfos:
+        if aliases.get(zone) == zone:
+            for era in zinfos[zone]["History"]:
+                yield [zone, era.stdoff, era.rules, era.format, era.until]
+
+def addSheet(wb, title, header, widths, rows, nrows, writeOnly):
+    """Add a sheet with a styled header, column widths and an autofilter
+
+    Everything but the rows is set up before the first row is written, so
+    the same code works for write-only workbooks that stream their rows.
+
+    Args:
+        wb (Workbook): workbook to add the sheet to
+        title (str): sheet title
+        header (list): column titles
+        widths (list): column widths
+        rows (Iterable): rows to write
+        nrows (int): number of rows, for the autofilter range
+        writeOnly (bool): True if wb is a write-only workbook
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    font, fill = headerStyle()
+    ws = wb.create_sheet(title)
+    for col, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+    ws.freeze_panes = "A2"
+    ws.auto_filter.ref = "A1:{col}{row}".format(col=get_column_letter(len(header)), row=nrows + 1)
+    if writeOnly:
+        cells = []
+        for value in header:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = font
+            cell.fill = fill
+            cells.append(cell)
+        ws.append(cells)
+    else:
+        ws.append(header)
+        for cell in ws[1]:
+            cell.font = font
+            cell.fill = fill
+    for row in rows:
+        ws.append(row)
+
+def outputRows(db, history=False):
+    """Generate the rows of the outputs once, to be shared by all of them
+
+    Args:
+        db (dict): database returned by loadDB
+        history (bool): include the zone history rows (default: {False})
+
+    Returns:
+        OutputRows: zone, rule and history rows, history being None unless
+            requested
+    """
+    return OutputRows(
+        list(zoneRows(db["zones"])),
+        list(ruleRows(db["rules"])),
+        list(historyRows(db["zinfos"], db["aliases"])) if history else None
+    )
+
+def createWB(zlist, rules, verbose, writeOnly=True, history=None, rows=None):
+    """Create the timezone data workbook
+
+    The write-only workbook streams the rows to temporary files instead of
+    holding a cell object per value in memory.
+
+    Args:
+        zlist (dict): zone list joined with the zone information
+        rules (list): Rule records
+        verbose (int): verbosity level
+        writeOnly (bool): build a write-only workbook (default: {True})
+        history (tuple): (zinfos, aliases) to add the Zone History sheet (default: {None})
+        rows (OutputRows): rows returned by outputRows, instead of
+            generating them again (default: {None})
+
+    Returns:
+        Workbook: workbook ready to be saved
+    """
+    if rows is None:
+        rows = OutputRows(zoneRows(zlist), ruleRows(rules), None)
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=writeOnly)
+    if not writeOnly:
+        wb.remove(wb.active)
+    nzones = sum(len(zlist[zone]["Countries"]) for zone in zlist)
+    addSheet(wb, "Time Zones", ZONE_HEADER, ZONE_WIDTHS, rows.zones, nzones, writeOnly)
+    addSheet(wb, "Rules", RULE_HEADER, RULE_WIDTHS, rows.rules, len(rules), writeOnly)
+    if history is not None:
+        zinfos, aliases = history
+        neras = sum(len(zinfos[zone]["History"]) for zone in zinfos if aliases.get(zone) == zone)
+        if rows.history is None:
+            rows = rows._replace(history=historyRows(zinfos, aliases))
+        addSheet(wb, "Zone History", HISTORY_HEADER, HISTORY_WIDTHS, rows.history, neras, writeOnly)
     return wb
 
-def parse(kwargs):
-    """Parse the tz database files and emmit CSV
+def saveWB(fpath, fmode, zlist, rules, history=None, rows=None):
+    """Create the timezone data workbook and save it atomically
+
+    Args:
+        fpath (str): output file
+        fmode (str): 'w' to overwrite or 'x' to fail on an existing file
+        zlist (dict): zone list joined with the zone information
+        rules (list): Rule records
+        history (tuple): see createWB (default: {None})
+        rows (OutputRows): see createWB (default: {None})
+    """
+    if fmode == 'x' and os.path.exists(fpath):
+        raise FileExistsError(fpath)
+    wb = createWB(zlist, rules, 0, history=history, rows=rows)
+    with atomicFile(fpath, fmode + 'b') as fp:
+        wb.save(fp)
+
+def readConf(kwargs):
+    """Read the config file and apply the command line overrides
+
+    The config file is created with the defaults when it does not exist.
 
     Args:
         kwargs (dict): command line arguments parsed by Click library
+
+    Returns:
+        dict: configuration, cache holding the cache settings
     """
     verbose = kwargs["verbose"]
     pout("Command line arguments:", verbose, Level.INFO)
-    pout(pformat(kwargs,depth=3,indent=4), verbose, Level.INFO)
+    pout(lambda: pformat(kwargs,depth=3,indent=4), verbose, Level.INFO)
     # 0. Get information from config.yml
     # If file does not exist, create a default config file
     if not os.path.exists(kwargs['config']):
         createConf(kwargs['config'], verbose)
+    import yaml
     try:
         with click.open_file(kwargs['config'], 'r') as cnf:
             conf = yaml.safe_load(cnf)
     except:
         pout("could not open config file: {file}".format(file=kwargs['config']), verbose, Level.ERROR)
 
-    if kwargs['zones']:
+    if kwargs.get('zones'):
         conf['output']['zonecsv'] = kwargs['zones']
         pass
-    if kwargs['rules']:
+    if kwargs.get('rules'):
         conf['output']['rulescsv'] = kwargs['rules']
         pass
-    if kwargs['xlsx']:
+    if kwargs.get('xlsx'):
         conf['output']['tzdataxls'] = kwargs['xlsx']
         pass
+    if kwargs.get('history'):
+        conf['output']['zonehistorycsv'] = kwargs['history']
+        pass
+    if kwargs.get('transitions'):
+        conf['output']['transitionscsv'] = kwargs['transitions']
+        pass
+    if kwargs.get('binary'):
+        conf['output']['binary'] = kwargs['binary']
+        pass
+    if kwargs.get('columnar'):
+        conf['output']['columnar'] = kwargs['columnar']
+        pass
+    if kwargs.get('columnar_format'):
+        conf['output']['columnarformat'] = kwargs['columnar_format']
+        pass
+    for name, fpath in kwargs.get('outputs') or ():
+        conf['output'][name] = fpath
+    if kwargs.get('jobs') is not None:
+        conf['jobs'] = kwargs['jobs']
+        pass
+    cconf = conf.get('cache') or {}
+    if kwargs.get('cache_dir'):
+        cconf['dir'] = kwargs['cache_dir']
+        pass
+    if kwargs.get('no_cache'):
+        cconf['dir'] = None
+        pass
+    conf['cache'] = cconf
 
     pout("Read config file:", verbose, Level.INFO)
-    pout(pformat(conf,depth=3,indent=4), verbose, Level.INFO)
+    pout(lambda: pformat(conf,depth=3,indent=4), verbose, Level.INFO)
+    return conf
+
+def loadDB(conf, tzdir, verbose, memo=None, stats=None):
+    """Read and join all input files of a tz database
+
+    Args:
+        conf (dict): configuration returned by readConf
+        tzdir (Str): directory or release archive of the database
+        verbose (Int): verbosity mode
+        memo (Dict): parsed files by content hash, see readTZDBs (default: {None})
+        stats (Stats): collector of the per phase statistics (default: {None})
+
+    Returns:
+        dict: parsed database with the countries, zinfos, links, aliases,
+            rules, zones and the countryZones index of the zones by iso3166
+            code
+    """
+    if stats is None:
+        stats = Stats(False)
+    cconf = conf.get('cache') or {}
+    cacheDir = cconf.get('dir')
+
+    # Read the input files out of the release archive in one pass
+    inputs = [conf['countrylist'], conf['zones']] + conf['tzdata']
+    if isArchive(tzdir):
+        with stats.phase("archive") as counts:
+            pout("Reading archive: {arc}".format(arc=tzdir), verbose, Level.INFO)
+            tzdir = readInputs(tzdir, inputs)
+            counts["files"] = len(tzdir)
+    else:
+        readInputs(tzdir, inputs)
 
     # 1. Parse iso3166.tab file
     #     * Hold the translation data in a Key-Value data.
-    pout("Processing contry list: {clist}".format(clist=conf['countrylist']), verbose, Level.INFO)
-    clist = getCountry(conf['countrylist'], kwargs['tzdir'], verbose)
+    with stats.phase("countries") as counts:
+        pout("Processing contry list: {clist}".format(clist=conf['countrylist']), verbose, Level.INFO)
+        clist = getCountry(conf['countrylist'], tzdir, verbose)
+        counts["countries"] = len(clist)
     #pout(pformat(clist, depth=2,indent=4), verbose, Level.DEBUG)
 
     # 2. Parse all zone list file for all Zones
     #     * Hold the Zone information data with Key=Zone name and Value containing all other Zone definition.
     # 3. Parse all zone list file for all Links
+    #     * Resolve the Links over the Zones of all files into an alias index.
     #     * Copy the Zone information of the linked zone to the defined zone.
     # 4. Parse all zone list file for all Rules
     #     * Can be parsed along with Zones and links
-    zinfos, rules = parseTZDBs(conf['tzdata'], kwargs['tzdir'], verbose)
+    with stats.phase("tzdata") as counts:
+        zinfos, zlinks, rules = readTZDBs(conf['tzdata'], tzdir, verbose, conf.get('jobs', 1), cacheDir, memo, stats)
+        if cacheDir:
+            try:
+                removed = cache.evict(cacheDir, cconf.get('maxage'), cconf.get('maxsize'))
+                pout("evicted {n} cache entries", verbose, Level.DEBUG, n=removed)
+            except OSError as e:
+                pout("could not evict cache entries of {dir}: {e}".format(dir=cacheDir, e=e), verbose, Level.WARNING)
+        counts.update(zones=len(zinfos), links=len(zlinks), rules=len(rules))
+    with stats.phase("links") as counts:
+        aliases = resolveLinks(zlinks, zinfos, verbose)
+        expandLinks(aliases, zinfos, verbose)
+        counts["aliases"] = len(aliases)
     pout("-------Final Zone Info List--------", verbose, Level.DEBUG)
-    pout(pformat(zinfos, depth=4, indent=4), verbose, Level.DEBUG)
+    pout(lambda: pformat(zinfos, depth=4, indent=4), verbose, Level.DEBUG)
     pout("-------Final Rule List--------", verbose, Level.DEBUG)
-    pout(pformat(rules, depth=2, indent=4,width=100), verbose, Level.DEBUG)
+    pout(lambda: pformat(rules, depth=2, indent=4,width=100), verbose, Level.DEBUG)
 
     # 5. Parse Zone.tab and construct the zones.csv file
-    pout("Processing zone list: {clist}".format(clist=conf['zones']), verbose, Level.INFO)
-    zlist = getZones(conf['zones'], kwargs['tzdir'], clist, verbose)
-    for zone in zlist:
-        zlist[zone]["Rule"] = zinfos[zone]["Rule"]
-        zlist[zone]["STDOFF"] = zinfos[zone]["STDOFF"]
+    with stats.phase("zones") as counts:
+        pout("Processing zone list: {clist}".format(clist=conf['zones']), verbose, Level.INFO)
+        zlist = getZones(conf['zones'], tzdir, clist, verbose)
+        for zone in zlist:
+            zlist[zone]["Rule"] = zinfos[zone]["Rule"]
+            zlist[zone]["STDOFF"] = zinfos[zone]["STDOFF"]
+        counts["zones"] = len(zlist)
+        countryZones = countryIndex(zlist)
     pout("-------Final Zone DB--------", verbose, Level.DEBUG)
-    pout(pformat(zlist, depth=3,indent=4), verbose, Level.DEBUG)
+    pout(lambda: pformat(zlist, depth=3,indent=4), verbose, Level.DEBUG)
 
-    # 6. output results
-    if kwargs["overwrite"]:
-        fmode = 'w'
-    else:
-        fmode = 'x'
+    return {
+        "countries": clist,
+        "zinfos": zinfos,
+        "links": zlinks,
+        "aliases": aliases,
+        "rules": rules,
+        "zones": zlist,
+        "countryZones": countryZones,
+    }
+
+def parse(kwargs):
+    """Parse the tz database files and emmit CSV
 
-    # 6.1 Output Rules
-    fpath = conf['output']['rulescsv']
+    With the profile argument, the whole run is profiled by cProfile and
+    the profile data is written to that file.  With the nearest argument,
+    the zones closest to that (latitude, longitude) are printed instead of
+    writing the outputs.  With the check argument, the database is only
+    checked by check.checkDB, and the problems found are returned with the
+    database left as None.
+
+    Args:
+        kwargs (dict): command line arguments parsed by Click library
+
+    Returns:
+        dict: parsed database with the zinfos, aliases, rules, zones, the
+            countryZones index, the transitions table (None unless
+            transitionscsv or columnar is set), the problems (None unless
+            checked) and the stats of the run
+    """
+    fpath = kwargs.get('profile')
+    if not fpath:
+        return runParse(kwargs)
+    import cProfile
+    prof = cProfile.Profile()
     try:
-        with click.open_file(fpath , mode=fmode, encoding="utf-8") as f:
-            pout("writing {file}".format(file=fpath), verbose, Level.INFO)
-            writer = csv.writer(f, delimiter='\t', lineterminator='\n')
-            writer.writerow(["NAME","FROM","TO","TYPE","IN","ON","AT","SAVE","LETTER/S"])
-            for rule in rules:
-                writer.writerow(rule)
-            pass
-    except FileExistsError:
-        pout("{file} already exists. use '-o' to overwrite".format(file=fpath), verbose, Level.ERROR)
-    except:
-        pout("Failed to write {file}".format(file=fpath), verbose, Level.ERROR)
+        return prof.runcall(runParse, kwargs)
+    finally:
+        pout("writing {file}".format(file=fpath), kwargs["verbose"], Level.INFO)
+        prof.dump_stats(fpath)
+
+def runParse(kwargs):
+    """Run the phases of parse
 
-    # 6.2 Output Time Zones
-    fpath = conf['output']['zonecsv']
+    Args:
+        kwargs (dict): command line arguments parsed by Click library
+
+    Returns:
+        dict: see parse
+    """
+    verbose = kwargs["verbose"]
+    stats = Stats(bool(kwargs.get('stats')))
+    db = dict.fromkeys(["zinfos", "aliases", "rules", "zones", "countryZones"])
+    table = problems = None
+    stats.start()
     try:
-        with click.open_file(fpath, mode=fmode, encoding="utf-8") as f:
-            pout("writing {file}".format(file=fpath), verbose, Level.INFO)
-            writer = csv.writer(f, delimiter='\t', lineterminator='\n')
-            writer.writerow(["Country","Zone","STDOFF","Rule","Coordinate","Comment"])
-            for zone in zlist:
-                for country in zlist[zone]["Countries"]:
-                    writer.writerow([
-                        country,
-                        zone,
-                        zlist[zone]["STDOFF"],
-                        zlist[zone]["Rule"],
-                        zlist[zone]["Coord"],
-                        zlist[zone]["Comment"]
-                    ])
-            pass
-    except FileExistsError:
-        pout("{file} already exists. use '-o' to overwrite".format(file=fpath), verbose, Level.ERROR)
-    except:
-        pout("Faild to write: {file}".format(file=fpath), verbose, Level.ERROR)
+        with stats.phase("config"):
+            conf = readConf(kwargs)
+        if kwargs.get('check'):
+            from tzparse.tzdata.check import checkDB
+            problems = checkDB(conf, kwargs['tzdir'], verbose, stats)
+        else:
+            db = loadDB(conf, kwargs['tzdir'], verbose, stats=stats)
+            if kwargs.get('nearest'):
+                printNearest(db, kwargs['nearest'], kwargs.get('count') or 1)
+            else:
+                table = writeOutputs(conf, db, kwargs["overwrite"], verbose, stats)
+    finally:
+        stats.stop()
+    if stats.enabled:
+        pout(stats.report(), verbose, Level.INFO)
+
+    return {
+        "zinfos": db["zinfos"],
+        "aliases": db["aliases"],
+        "rules": db["rules"],
+        "zones": db["zones"],
+        "countryZones": db["countryZones"],
+        "transitions": table,
+        "problems": problems,
+        "stats": stats,
+    }
+
+def printNearest(db, coord, count):
+    """Print the zones closest to a coordinate
+
+    Args:
+        db (dict): database returned by loadDB
+        coord (Tuple): (latitude, longitude) in degrees
+        count (Int): number of zones to print
+    """
+    zlist = db["zones"]
+    locator = ZoneLocator.fromZones(zlist)
+    for zone, km in locator.nearest(coord[0], coord[1], count):
+        click.echo("{zone}\t{km:.1f} km\t{countries}".format(
+            zone=zone, km=km, countries=", ".join(zlist[zone]["Countries"])
+        ))
+
+def saveCSV(fpath, fmode, header, rows):
+    """Write a tab separated CSV output atomically
+
+    Args:
+        fpath (Str): output file
+        fmode (Str): 'w' to overwrite or 'x' to fail on an existing file
+        header (Array): header row
+        rows (Iterable): rows to write
+
+    Raises:
+        FileExistsError: fpath exists and fmode is 'x'
+    """
+    with atomicFile(fpath, fmode, encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+# The outputs named in the output section of the config.  Each writer
+# gets the output file, 'w' or 'x' and the OutputData, and returns the
+# record counts of the output.
+
+@registerWriter("rulescsv")
+def writeRulesCSV(fpath, fmode, data):
+    """rules as tab separated CSV"""
+    saveCSV(fpath, fmode, RULE_HEADER, data.rows.rules)
+    return {"rows": len(data.rows.rules)}
 
-    # 6.3 Output Excel spreadsheet
-    fpath = conf['output']['tzdataxls']
-    if os.path.exists(fpath) and not kwargs['overwrite']:
-        pout("{file} already exists. use '-o' to overwrite".format(file=fpath), verbose, Level.ERROR)
+@registerWriter("zonecsv")
+def writeZonesCSV(fpath, fmode, data):
+    """zone list as tab separated CSV"""
+    saveCSV(fpath, fmode, ZONE_HEADER, data.rows.zones)
+    return {"rows": len(data.rows.zones)}
+
+@registerWriter("zonehistorycsv", needs=("history",))
+def writeHistoryCSV(fpath, fmode, data):
+    """zone history as tab separated CSV"""
+    saveCSV(fpath, fmode, HISTORY_HEADER, data.rows.history)
+    return {"rows": len(data.rows.history)}
+
+@registerWriter("transitionscsv", needs=("transitions",))
+def writeTransitionsCSV(fpath, fmode, data):
+    """UTC transitions as tab separated CSV"""
+    saveCSV(fpath, fmode, TRANSITION_HEADER, transitionRows(data.table))
+    return {"zones": len(data.table)}
+
+@registerWriter("binary")
+def writeBinaryOutput(fpath, fmode, data):
+    """zones, rules and countries in the binary format"""
+    writeBinary(fpath, data.rows.zones, data.db["rules"], data.db["countries"], fmode)
+    return {"zones": len(data.rows.zones), "rules": len(data.rows.rules)}
+
+@registerWriter("columnar", needs=("transitions",), options=("columnarformat",))
+def writeColumnarOutput(dpath, fmode, data):
+    """typed columns of every table, one file per table"""
+    fpaths = writeColumnar(dpath, data.db, data.table, data.options.get('columnarformat', 'arrow'), fmode == 'w')
+    return {"files": len(fpaths)}
+
+def recordTables(data):
+    """Get the tables of the JSON outputs
+
+    Args:
+        data (OutputData): rows of the outputs
+
+    Returns:
+        Array: (name, header, rows) of the zones, rules and history
+    """
+    return [
+        ("zones", ZONE_HEADER, data.rows.zones),
+        ("rules", RULE_HEADER, data.rows.rules),
+        ("history", HISTORY_HEADER, data.rows.history),
+    ]
+
+@registerWriter("json", needs=("history",))
+def writeJSONOutput(fpath, fmode, data):
+    """zones, rules and history as a JSON object of arrays"""
+    return writeJSON(fpath, fmode, recordTables(data))
+
+@registerWriter("ndjson", needs=("history",))
+def writeNDJSONOutput(fpath, fmode, data):
+    """zones, rules and history as one JSON object per line"""
+    return writeNDJSON(fpath, fmode, recordTables(data))
+
+@registerWriter("tzdataxls", options=("zonehistorycsv",))
+def writeWorkbook(fpath, fmode, data):
+    """Excel workbook of the zones, rules and, with zonehistorycsv, history"""
+    db = data.db
+    history = (db["zinfos"], db["aliases"]) if data.options.get('zonehistorycsv') else None
+    saveWB(fpath, fmode, db["zones"], db["rules"], history, data.rows)
+    return {"rows": len(data.rows.zones) + len(data.rows.rules) + (len(data.rows.history) if history else 0)}
+
+def writeOutputs(conf, db, overwrite, verbose, stats):
+    """Write the outputs named in the config
+
+    Every output with a file in the output section and a writer in
+    output.WRITERS is written.  The rows are generated once and shared by
+    the outputs, which are written concurrently by writeSinks, in threads
+    or in conf['jobs'] processes.
+    Each output file is written to a temporary file and renamed once
+    complete.
+
+    Args:
+        conf (dict): configuration returned by readConf
+        db (dict): database returned by loadDB
+        overwrite (Bool): overwrite existing files
+        verbose (Int): verbosity mode
+        stats (Stats): collector of the per phase statistics
+
+    Returns:
+        Dict: transitions table, None unless an output needs it
+    """
+    # 6. output results
+    if overwrite:
+        fmode = 'w'
     else:
-        pout("writing {file}".format(file=fpath), verbose, Level.INFO)
-        wb = createWB(zlist, rules, verbose)
-        wb.save(fpath)
+        fmode = 'x'
+    options = conf['output']
+    for key in unknownOutputs(options):
+        pout("unknown output {key} in the config".format(key=key), verbose, Level.WARNING)
+    writers = [writer for name, writer in WRITERS.items() if options.get(name)]
+    needs = set()
+    for writer in writers:
+        needs.update(writer.needs)
 
-    pass
+    # 6.1 Generate the rows of the outputs, and the UTC transitions
+    with stats.phase("rows") as counts:
+        rows = outputRows(db, "history" in needs)
+        counts.update(zones=len(rows.zones), rules=len(rows.rules))
+    table = None
+    if "transitions" in needs:
+        requireParsedRules(db["rules"])
+        with stats.phase("transitions") as counts:
+            tconf = conf.get('transitions') or {}
+            expander = RuleExpander.fromConf(db["rules"], tconf, verbose)
+            table = buildTransitions(
+                db["zinfos"], db["rules"], db["aliases"], tconf.get('start', 1970), tconf.get('end', 2037), expander
+            )
+            info = expander.cacheInfo()
+            counts.update(zones=len(table), hits=info.hits, misses=info.misses, evictions=info.evictions)
+
+    # 6.2 Write every output, e.g. the rules, zones, history and transitions
+    #     CSV, the binary, columnar and JSON outputs and the Excel workbook
+    data = OutputData(db, rows, table, options)
+    sinks = [
+        Sink(writer.name, options[writer.name], partial(writer.write, options[writer.name], fmode, data))
+        for writer in writers
+    ]
+    with stats.phase("outputs") as counts:
+        for sink in sinks:
+            pout("writing {file}".format(file=sink.path), verbose, Level.INFO)
+        written = 0
+        for sink, records, wall, cpu, error in writeSinks(sinks, conf.get('jobs', 1)):
+            if error is None:
+                written += 1
+                stats.addFile(sink.path, "written", wall, cpu, records)
+            elif isinstance(error, FileExistsError):
+                pout("{file} already exists. use '-o' to overwrite".format(file=error), verbose, Level.ERROR)
+            elif isinstance(error, ImportError) and sink.name == "columnar":
+                pout("pyarrow is required for the columnar output, install tzparse[arrow]", verbose, Level.ERROR)
+            else:
+                pout("Failed to write {file}: {e}".format(file=sink.path, e=error), verbose, Level.ERROR)
+        counts["files"] = written
+
+    return table
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Offset lookups over the UTC transition table"""
+
+# BSD 2-Clause License
+#
+# Copyright (c) 2019, Yasuhiro Okuno (Koma)
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from array import array
+from bisect import bisect_right
+
+from tzparse.tzdata.transitions import buildTransitions
+
+class TzIndex(object):
+    """UTC offset and abbreviation lookups by binary search over the
+    transition table of every zone.
+
+    Zones are addressed by name or by the integer id given by zoneId, links
+    resolving to the id of their zone.  Instants are seconds since the
+    epoch.  Instants before the range of the table get the first row of
+    the zone and instants after it the last one, so lookups are only exact
+    within the years the table was built for.
+    """
+
+    def __init__(self, table, aliases=None):
+        """Build the index from a transition table
+
+        Args:
+            table (Dict): zone name to ZoneTransitions, see buildTransitions
+            aliases (Dict): alias index from resolveLinks (default: {None})
+        """
+        self.names = sorted(table)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        if aliases is not None:
+            for name, zone in aliases.items():
+                if zone in self.ids:
+                    self.ids[name] = self.ids[zone]
+        self.zones = [table[name] for name in self.names]
+        self.walls = [None] * len(self.names)
+
+    @classmethod
+    def fromParse(cls, result, startYear=1970, endYear=2037):
+        """Build the index from the result of tzdata.parse
+
+        The transition table of the result is reused when it was written,
+        otherwise it is built for startYear to endYear.
+
+        Args:
+            result (Dict): value returned by tzdata.parse
+            startYear (Int): first year of the table (default: {1970})
+            endYear (Int): last year of the table (default: {2037})
+
+        Returns:
+            TzIndex: the index
+        """
+        table = result.get("transitions")
+        if table is None:
+            table = buildTransitions(result["zinfos"], result["rules"], result["aliases"], startYear, endYear)
+        return cls(table, result["aliases"])
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def zoneId(self, name):
+        """Get the id of a zone or link
+
+        Args:
+            name (Str): zone or link name
+
+        Returns:
+            Int: zone id
+
+        Raises:
+            KeyError: unknown zone
+        """
+        return self.ids[name]
+
+    def lookup(self, zone, instant):
+        """Get the offset in effect in a zone at an instant
+
+        Args:
+            zone (Str or Int): zone name or id
+            instant (Int): seconds since the epoch
+
+        Returns:
+            Tuple: (offset in seconds east of UTC, isdst, abbreviation)
+        """
+        if not isinstance(zone, int):
+            zone = self.ids[zone]
+        trans = self.zones[zone]
+        i = bisect_right(trans.instants, instant) - 1
+        if i < 0:
+            i = 0
+        return trans.offsets[i], bool(trans.isdst[i]), trans.abbrs[i]
+
+    def offset(self, zone, instant):
+        """Get the offset in effect in a zone at an instant
+
+        Args:
+            zone (Str or Int): zone name or id
+            instant (Int): seconds since the epoch
+
+        Returns:
+            Int: offset in seconds east of UTC
+        """
+        return self.lookup(zone, instant)[0]
+
+    def utcOf(self, zone, wall):
+        """Get the instant of a wall clock time in a zone
+
+        Like zoneinfo with fold=0, an ambiguous time resolves to its first
+        occurrence and a time skipped by a transition is read with the
+        offset in effect before it.
+
+        Args:
+            zone (Str or Int): zone name or id
+            wall (Int): local time as seconds since the epoch
+
+        Returns:
+            Int: seconds since the epoch
+        """
+        if not isinstance(zone, int):
+            zone = self.ids[zone]
+        trans = self.zones[zone]
+        walls = self.walls[zone]
+        if walls is None:
+            walls = self.walls[zone] = wallTimes(trans)
+        i = bisect_right(walls, wall) - 1
+        return wall - trans.offsets[i if i > 0 else 0]
+
+    def lookupMany(self, pairs):
+        """Look up many (zone id, instant) pairs at once
+
+        Each pair is bisected like lookup, at about the same rate, but the
+        results come back as columns ready for the array based outputs.
+
+        Args:
+            pairs (Iterable): (zone id, seconds since the epoch) pairs
+
+        Returns:
+            Tuple: (offsets array('i'), isdst array('b'), abbreviations list)
+                in the order of pairs
+        """
+        offsets = array('i')
+        isdst = array('b')
+        abbrs = []
+        zones = self.zones
+        addOffset = offsets.append
+        addDST = isdst.append
+        addAbbr = abbrs.append
+        for zone, instant in pairs:
+            trans = zones[zone]
+            i = bisect_right(trans.instants, instant) - 1
+            if i < 0:
+                i = 0
+            addOffset(trans.offsets[i])
+            addDST(trans.isdst[i])
+            addAbbr(trans.abbrs[i])
+        return offsets, isdst, abbrs
+
+    def offsetsOf(self, zones, instants):
+        """Get the offsets of parallel arrays of zone ids and instants
+
+        Args:
+            zones (Sequence): zone ids
+            instants (Sequence): seconds since the epoch
+
+        Returns:
+            array('i'): offsets in seconds east of UTC
+        """
+        return self.lookupMany(zip(zones, instants))[0]
+
+def wallTimes(trans):
+    """Get the local times from which each row of a zone is in effect
+
+    The local time of a transition is taken with the larger of the offsets
+    around it, the end of a gap or of an overlap.
+
+    Args:
+        trans (ZoneTransitions): transition table of the zone
+
+    Returns:
+        array('q'): local times in seconds, parallel to trans.instants
+    """
+    instants = trans.instants
+    offsets = trans.offsets
+    walls = array('q', instants)
+    if walls:
+        walls[0] += offsets[0]
+    for i in range(1, len(walls)):
+        walls[i] += max(offsets[i-1], offsets[i])
+    return walls